@@ -3,14 +3,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_bcrypt import Bcrypt
 from config import config
 import os
 
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
-bcrypt = Bcrypt()
 
 def create_app(config_name=None):
     if config_name is None:
@@ -22,7 +20,6 @@ def create_app(config_name=None):
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
-    bcrypt.init_app(app)
     
     CORS(app, resources={
         r"/api/*": {
@@ -35,20 +32,69 @@ def create_app(config_name=None):
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
     # Register blueprints
-    from app.routes import auth, jobs, ai
+    from app.routes import auth, jobs, ai, applications
     
     app.register_blueprint(auth.bp, url_prefix='/api/auth')
     app.register_blueprint(jobs.bp, url_prefix='/api/jobs')
     app.register_blueprint(ai.bp, url_prefix='/api/ai')
+    app.register_blueprint(applications.bp, url_prefix='/api/applications')
+    
+    from app.services.catalog_snapshot import catalog_snapshot
+    from app.services.search import job_search
+    from app.services.bitmap_index import bitmap_index
+    from app.services import listing
+    from app.services.counters import counters
+    from app.services.response_cache import job_responses
+    from app.services.fragments import job_fragments
+    from app.services.recommendations import recommendations
+    from app.services.skill_stats import skill_stats
+    from app.services.passwords import passwords
+    from app.services.identity import identity
+    from app.services.metrics import metrics
+    from app.services.application_scoring import application_scorer
+    # Imported for its flush listener keeping User.profile_completion current
+    from app.services import profiles
+    # Imported for their flush listeners recording application events, funnel
+    # counts and per-job application counters
+    from app.services import funnel, job_stats
+    catalog_snapshot.init_app(app)
+    job_search.init_app(app)
+    bitmap_index.init_app(app)
+    listing.init_app(app)
+    counters.init_app(app)
+    job_responses.init_app(app)
+    job_fragments.init_app(app)
+    recommendations.init_app(app)
+    skill_stats.init_app(app)
+    passwords.init_app(app)
+    identity.init_app(app)
+    metrics.init_app(app)
+    application_scorer.init_app(app)
+    
+    from app import commands
+    commands.init_app(app)
     
     @app.route('/health')
     def health_check():
         return {
             'status': 'healthy',
             'service': 'Smart Recruitment Portal API',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'caches': {
+                'job_responses': job_responses.stats(),
+                'job_fragments': job_fragments.stats(),
+                'job_totals': listing.job_totals.stats(),
+                'identities': identity.stats()
+            },
+            'passwords': passwords.stats()
         }
     
+    @app.route('/metrics', endpoint='metrics')
+    def metrics_endpoint():
+        if not metrics.enabled:
+            return {'error': 'Metrics are disabled'}, 404
+        return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    
     @app.route('/')
     def index():
         return {
@@ -0,0 +1,137 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('search-reindex')
+@with_appcontext
+def search_reindex():
+    """Rebuild the job full-text search index"""
+    from app.services.search import job_search
+    job_search.rebuild()
+    click.echo(f'Rebuilt {job_search.backend.name} job search index')
+
+
+@click.command('skill-demand-rebuild')
+@with_appcontext
+def skill_demand_rebuild():
+    """Recompute per-skill demand over the active catalog"""
+    from app.services import skill_demand
+    skill_demand.rebuild()
+    click.echo('Rebuilt skill demand')
+
+
+@click.command('skill-stats-reconcile')
+@with_appcontext
+def skill_stats_reconcile():
+    """Repair skill job/user counts and refresh trending scores and popular flags"""
+    from app.services.skill_stats import skill_stats
+    repaired = skill_stats.reconcile()
+    click.echo(f'Reconciled skill statistics, repaired {repaired} skills')
+
+
+@click.command('profile-completion-backfill')
+@click.option('--all', 'recompute', is_flag=True, help='Recompute users that already have a value')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def profile_completion_backfill(recompute, batch_size):
+    """Store profile completion for users that do not have it yet"""
+    from app.services import profiles
+    written = profiles.backfill(batch_size=batch_size, recompute=recompute)
+    click.echo(f'Stored profile completion for {written} users')
+
+
+@click.command('geohash-backfill')
+@click.option('--all', 'recompute', is_flag=True, help='Recompute jobs that already have a value')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def geohash_backfill(recompute, batch_size):
+    """Store the geohash of located jobs that do not have it yet"""
+    from app.services import geo
+    written = geo.backfill(batch_size=batch_size, recompute=recompute)
+    click.echo(f'Stored geohash for {written} jobs')
+
+
+@click.command('jobs-import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--employer-email', help='Employer the jobs belong to')
+@click.option('--employer-id', type=int, help='Employer the jobs belong to')
+@click.option('--format', 'format', type=click.Choice(['jsonl', 'csv']),
+              help='Feed format, guessed from the file extension by default')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--create-skills', is_flag=True, help='Add skills missing from the catalog')
+@with_appcontext
+def jobs_import(path, employer_email, employer_id, format, batch_size, create_skills):
+    """Create or update an employer's jobs from a JSONL or CSV feed, keyed by external_id"""
+    import json
+    from app.models import User
+    from app.services import ingest
+    if employer_id:
+        employer = User.query.get(employer_id)
+    elif employer_email:
+        employer = User.query.filter_by(email=employer_email).first()
+    else:
+        raise click.UsageError('Pass --employer-email or --employer-id')
+    if employer is None or employer.role != 'employer':
+        raise click.UsageError('No such employer')
+
+    format = format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    importer = ingest.JobImporter(employer, batch_size=batch_size, create_skills=create_skills)
+    with open(path, encoding='utf-8', newline='') as stream:
+        summary = importer.run(ingest.read_rows(stream, format))
+    click.echo(json.dumps(summary, indent=2))
+
+
+@click.command('applications-score')
+@click.option('--job-id', type=int, help='Only this job\'s applications')
+@click.option('--employer-id', type=int, help='Only this employer\'s applications')
+@click.option('--all', 'rescore', is_flag=True, help='Re-score applications whose inputs have not changed')
+@click.option('--workers', type=int, help='Scoring processes, SCORING_WORKERS by default')
+@click.option('--batch-size', type=int, help='Applications per batch, SCORING_BATCH_SIZE by default')
+@with_appcontext
+def applications_score(job_id, employer_id, rescore, workers, batch_size):
+    """Store AI match scores for applications not scored yet or whose job or applicant changed"""
+    from app.services.application_scoring import application_scorer
+    written = application_scorer.run(job_id=job_id, employer_id=employer_id, rescore=rescore,
+                                     workers=workers, batch_size=batch_size)
+    click.echo(f'Scored {written} applications')
+
+
+@click.command('funnel-rebuild')
+@with_appcontext
+def funnel_rebuild():
+    """Backfill missing application events and recompute hiring-funnel counts from the log"""
+    from app.services import funnel
+    backfilled = funnel.rebuild()
+    click.echo(f'Rebuilt hiring funnel, backfilled events for {backfilled} applications')
+
+
+@click.command('job-stats-reconcile')
+@with_appcontext
+def job_stats_reconcile():
+    """Recompute per-job application, unread and per-status counters in bulk"""
+    from app.services import funnel, job_stats
+    repaired = job_stats.reconcile()
+    funnel.rebuild()
+    click.echo(f'Reconciled job statistics, repaired {repaired} jobs and rebuilt status counts')
+
+
+@click.command('catalog-snapshot')
+@with_appcontext
+def catalog_snapshot_build():
+    """Write and publish a new version of the memory-mapped active catalog snapshot"""
+    from app.services.catalog_snapshot import catalog_snapshot
+    snapshot = catalog_snapshot.rebuild()
+    click.echo(f'Published catalog snapshot version {snapshot.version} with {snapshot.size} jobs to {snapshot.path}')
+
+
+def init_app(app):
+    app.cli.add_command(search_reindex)
+    app.cli.add_command(skill_demand_rebuild)
+    app.cli.add_command(skill_stats_reconcile)
+    app.cli.add_command(profile_completion_backfill)
+    app.cli.add_command(geohash_backfill)
+    app.cli.add_command(jobs_import)
+    app.cli.add_command(applications_score)
+    app.cli.add_command(funnel_rebuild)
+    app.cli.add_command(job_stats_reconcile)
+    app.cli.add_command(catalog_snapshot_build)
@@ -1,9 +1,13 @@
 from .user import User, UserSkill
-from .job import Job, JobSkill, Application
-from .skill import Skill, Training, TrainingSkill
+from .job import Job, JobSkill, Application, ApplicationEvent
+from .skill import Skill, SkillDemand, SkillTrendBucket, Training, TrainingSkill
+from .recommendation import JobRecommendation, RecommendationState
+from .funnel import FunnelStage, FunnelDuration
 
 __all__ = [
     'User', 'UserSkill',
-    'Job', 'JobSkill', 'Application',
-    'Skill', 'Training', 'TrainingSkill'
+    'Job', 'JobSkill', 'Application', 'ApplicationEvent',
+    'Skill', 'SkillDemand', 'SkillTrendBucket', 'Training', 'TrainingSkill',
+    'JobRecommendation', 'RecommendationState',
+    'FunnelStage', 'FunnelDuration'
 ]
@@ -0,0 +1,38 @@
+from app import db
+from datetime import datetime
+
+
+class FunnelStage(db.Model):
+    __tablename__ = 'funnel_stages'
+    
+    # scope is 'job' or 'employer', scope_id the job or employer id
+    scope = db.Column(db.String(20), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(50), primary_key=True)
+    
+    # Applications that ever reached the stage, have left it and are in it now
+    entered = db.Column(db.Integer, default=0, nullable=False)
+    exited = db.Column(db.Integer, default=0, nullable=False)
+    current = db.Column(db.Integer, default=0, nullable=False)
+    # Time spent in the stage by applications that left it
+    total_seconds = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FunnelStage {self.scope}={self.scope_id} {self.stage} current={self.current}>'
+
+
+class FunnelDuration(db.Model):
+    __tablename__ = 'funnel_durations'
+    
+    scope = db.Column(db.String(20), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(50), primary_key=True)
+    # Index into funnel.DURATION_BUCKETS; one past its end counts longer stays
+    bucket = db.Column(db.Integer, primary_key=True)
+    
+    count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<FunnelDuration {self.scope}={self.scope_id} {self.stage} bucket={self.bucket}>'
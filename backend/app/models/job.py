@@ -1,5 +1,7 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
+from app.services.counters import counters
 
 class Job(db.Model):
     __tablename__ = 'jobs'
@@ -8,6 +10,8 @@ class Job(db.Model):
     title = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     employer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    # The employer's own key for jobs imported from a feed, unique per employer
+    external_id = db.Column(db.String(100))
     company_name = db.Column(db.String(200), nullable=False)
     
     job_type = db.Column(db.String(50), nullable=False)
@@ -21,6 +25,8 @@ class Job(db.Model):
     country = db.Column(db.String(100), nullable=False)
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    # Derived from latitude/longitude by app.services.geo for radius searches
+    geohash = db.Column(db.String(12))
     allows_remote = db.Column(db.Boolean, default=False)
     
     salary_min = db.Column(db.Integer)
@@ -45,12 +51,15 @@ class Job(db.Model):
     urgent = db.Column(db.Boolean, default=False)
     
     views = db.Column(db.Integer, default=0)
+    # Maintained by app.services.job_stats as applications are created, viewed and removed
     applications_count = db.Column(db.Integer, default=0)
+    unread_applications_count = db.Column(db.Integer, default=0)
     
     matching_criteria = db.Column(db.JSON)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed for catching rankings up with jobs written after a catalog snapshot
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     published_at = db.Column(db.DateTime, index=True)
     closed_at = db.Column(db.DateTime)
     
@@ -58,9 +67,21 @@ class Job(db.Model):
     required_skills = db.relationship('JobSkill', back_populates='job', cascade='all, delete-orphan')
     applications = db.relationship('Application', back_populates='job', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Serves the public listing order and its keyset pagination
+        db.Index('ix_jobs_listing', 'status', 'visibility', 'featured', 'published_at', 'id'),
+        # Radius searches: one range scan per geohash prefix among active public jobs
+        db.Index('ix_jobs_nearby', 'status', 'visibility', 'geohash'),
+        # Bulk imports upsert by the employer's feed key
+        db.Index('ix_jobs_external_id', 'employer_id', 'external_id', unique=True),
+    )
+    
     def increment_views(self):
-        self.views += 1
-        db.session.commit()
+        counters.increment(Job, 'views', self.id)
+    
+    def total_views(self):
+        """Stored views plus increments still waiting in the write-behind buffer"""
+        return (self.views or 0) + counters.pending_delta(Job, 'views', self.id)
     
     def is_open(self):
         if self.status != 'active':
@@ -81,6 +102,16 @@ class Job(db.Model):
         delta = self.application_deadline - datetime.utcnow()
         return max(0, delta.days)
     
+    @staticmethod
+    def load_options(include_employer=True, include_skills=True):
+        """Loader options that batch-fetch everything to_dict touches for the same shape"""
+        options = []
+        if include_employer:
+            options.append(joinedload(Job.employer))
+        if include_skills:
+            options.append(selectinload(Job.required_skills).joinedload(JobSkill.skill))
+        return options
+    
     def to_dict(self, include_employer=True, include_skills=True):
         data = {
             'id': self.id,
@@ -96,6 +127,8 @@ class Job(db.Model):
                 'city': self.city,
                 'state': self.state,
                 'country': self.country,
+                'latitude': self.latitude,
+                'longitude': self.longitude,
                 'allows_remote': self.allows_remote
             },
             'salary': {
@@ -114,7 +147,7 @@ class Job(db.Model):
             'visibility': self.visibility,
             'featured': self.featured,
             'urgent': self.urgent,
-            'views': self.views,
+            'views': self.total_views(),
             'applications_count': self.applications_count,
             'is_open': self.is_open(),
             'days_since_posted': self.days_since_posted(),
@@ -184,10 +217,16 @@ class Application(db.Model):
     screening_answers = db.Column(db.JSON)
     
     status = db.Column(db.String(50), default='submitted', index=True)
+    # Legacy per-row transition list; transitions are recorded as ApplicationEvent rows
     status_history = db.Column(db.JSON)
+    status_changed_at = db.Column(db.DateTime)
     
     ai_match_score = db.Column(db.Float, index=True)
     ai_analysis = db.Column(db.JSON)
+    # When the stored score's inputs were read, and when the job's or
+    # applicant's skills or match fields last changed after a score
+    ai_scored_at = db.Column(db.DateTime)
+    ai_inputs_changed_at = db.Column(db.DateTime)
     
     interviews = db.Column(db.JSON)
     employer_notes = db.Column(db.JSON)
@@ -205,6 +244,8 @@ class Application(db.Model):
                                 foreign_keys=[applicant_id])
     employer = db.relationship('User', back_populates='applications_received',
                               foreign_keys=[employer_id])
+    events = db.relationship('ApplicationEvent', back_populates='application', lazy='dynamic',
+                             cascade='all, delete-orphan', order_by='ApplicationEvent.id')
     
     __table_args__ = (
         db.UniqueConstraint('job_id', 'applicant_id', name='unique_job_application'),
@@ -215,21 +256,26 @@ class Application(db.Model):
         return delta.days
     
     def update_status(self, new_status, changed_by_id, notes=''):
-        if not self.status_history:
-            self.status_history = []
-        
-        self.status_history.append({
-            'status': new_status,
-            'changed_at': datetime.utcnow().isoformat(),
-            'changed_by': changed_by_id,
-            'notes': notes
-        })
+        now = datetime.utcnow()
+        entered_at = self.status_changed_at or self.created_at or now
+        self.events.append(ApplicationEvent(
+            job_id=self.job_id,
+            employer_id=self.employer_id,
+            from_status=self.status,
+            to_status=new_status,
+            changed_by_id=changed_by_id,
+            notes=notes,
+            # Time the application spent in the stage it is leaving
+            duration_seconds=max(int((now - entered_at).total_seconds()), 0),
+            created_at=now
+        ))
         
         self.status = new_status
+        self.status_changed_at = now
         
         if new_status != 'submitted' and not self.is_viewed:
             self.is_viewed = True
-            self.viewed_at = datetime.utcnow()
+            self.viewed_at = now
     
     def to_dict(self, include_job=True, include_applicant=True):
         data = {
@@ -263,3 +309,45 @@ class Application(db.Model):
     
     def __repr__(self):
         return f'<Application job={self.job_id} applicant={self.applicant_id}>'
+
+
+class ApplicationEvent(db.Model):
+    """One status transition of an application; rows are only ever appended"""
+    __tablename__ = 'application_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id', ondelete='CASCADE'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False)
+    employer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # from_status is empty for the event recording the application itself
+    from_status = db.Column(db.String(50))
+    to_status = db.Column(db.String(50), nullable=False)
+    changed_by_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    notes = db.Column(db.Text)
+    duration_seconds = db.Column(db.Integer)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    application = db.relationship('Application', back_populates='events')
+    
+    __table_args__ = (
+        db.Index('ix_application_events_application', 'application_id', 'id'),
+        db.Index('ix_application_events_job', 'job_id', 'created_at'),
+        db.Index('ix_application_events_employer', 'employer_id', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'application_id': self.application_id,
+            'from_status': self.from_status,
+            'to_status': self.to_status,
+            'changed_by': self.changed_by_id,
+            'notes': self.notes,
+            'duration_seconds': self.duration_seconds,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<ApplicationEvent application={self.application_id} {self.from_status}->{self.to_status}>'
@@ -0,0 +1,37 @@
+from app import db
+from datetime import datetime
+
+
+class JobRecommendation(db.Model):
+    __tablename__ = 'job_recommendations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'job_id', name='unique_user_recommendation'),
+        db.Index('ix_job_recommendations_ranking', 'user_id', 'score', 'job_id'),
+    )
+    
+    def __repr__(self):
+        return f'<JobRecommendation user={self.user_id} job={self.job_id} score={self.score}>'
+
+
+class RecommendationState(db.Model):
+    __tablename__ = 'recommendation_states'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    
+    # Positive matches across the catalog, and how many of the best are stored
+    total = db.Column(db.Integer, default=0, nullable=False)
+    stored = db.Column(db.Integer, default=0, nullable=False)
+    # Lowest stored score at the last full refresh; jobs scoring above it are always stored
+    floor = db.Column(db.Integer, default=0, nullable=False)
+    
+    stale = db.Column(db.Boolean, default=False, nullable=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<RecommendationState user={self.user_id} stored={self.stored}>'
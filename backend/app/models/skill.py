@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON, ARRAY
+from app.services.counters import counters
 
 class Skill(db.Model):
     __tablename__ = 'skills'
@@ -51,6 +52,33 @@ class Skill(db.Model):
         return f'<Skill {self.display_name}>'
 
 
+class SkillDemand(db.Model):
+    __tablename__ = 'skill_demand'
+    
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
+    # Active public jobs requiring the skill, maintained on job publish/close and skill edits
+    active_jobs = db.Column(db.Integer, default=0, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    skill = db.relationship('Skill')
+    
+    def __repr__(self):
+        return f'<SkillDemand skill={self.skill_id} active_jobs={self.active_jobs}>'
+
+
+class SkillTrendBucket(db.Model):
+    __tablename__ = 'skill_trend_buckets'
+    
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
+    # UTC day the demand was recorded in
+    day = db.Column(db.Date, primary_key=True, index=True)
+    # Job skill links created that day
+    demand = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<SkillTrendBucket skill={self.skill_id} day={self.day} demand={self.demand}>'
+
+
 class Training(db.Model):
     __tablename__ = 'trainings'
     
@@ -100,6 +128,12 @@ class Training(db.Model):
     
     skills = db.relationship('TrainingSkill', back_populates='training', cascade='all, delete-orphan')
     
+    def increment_views(self):
+        counters.increment(Training, 'views', self.id)
+    
+    def increment_clicks(self):
+        counters.increment(Training, 'clicks', self.id)
+    
     def to_dict(self, include_skills=True):
         data = {
             'id': self.id,
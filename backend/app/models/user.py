@@ -1,6 +1,9 @@
-from app import db, bcrypt
+from app import db
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON, ARRAY
+from sqlalchemy.orm import joinedload, selectinload
+from app.services.counters import counters
+from app.services.passwords import passwords
 import jwt
 from time import time
 from flask import current_app
@@ -37,6 +40,8 @@ class User(db.Model):
     email_verification_token = db.Column(db.String(255))
     
     profile_views = db.Column(db.Integer, default=0)
+    # Denormalized get_profile_completion(), kept current by app.services.profiles
+    profile_completion = db.Column(db.Integer)
     last_login = db.Column(db.DateTime)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -49,11 +54,20 @@ class User(db.Model):
     applications_received = db.relationship('Application', back_populates='employer',
                                            foreign_keys='Application.employer_id')
     
+    # Columns get_profile_completion() reads, besides whether the user has skills
+    PROFILE_COMPLETION_COLUMNS = (
+        'first_name', 'last_name', 'email', 'phone', 'city', 'bio',
+        'role', 'job_seeker_profile', 'employer_profile'
+    )
+    
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = passwords.hash(password)
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return passwords.check(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return passwords.needs_rehash(self.password_hash)
     
     def generate_auth_token(self, expires_in=3600):
         return jwt.encode(
@@ -80,20 +94,28 @@ class User(db.Model):
             return None
     
     def get_profile_completion(self):
+        return User.compute_profile_completion(
+            {column: getattr(self, column) for column in User.PROFILE_COMPLETION_COLUMNS},
+            lambda: len(self.skills) > 0
+        )
+    
+    @staticmethod
+    def compute_profile_completion(values, has_skills):
+        """Completion percentage from column values; has_skills is only called when it counts"""
         completed = 0
         total = 0
         
         basic_fields = [
-            self.first_name, self.last_name, self.email, 
-            self.phone, self.city, self.bio
+            values['first_name'], values['last_name'], values['email'],
+            values['phone'], values['city'], values['bio']
         ]
         for field in basic_fields:
             total += 1
             if field:
                 completed += 1
         
-        if self.role == 'jobseeker' and self.job_seeker_profile:
-            profile = self.job_seeker_profile
+        if values['role'] == 'jobseeker' and values['job_seeker_profile']:
+            profile = values['job_seeker_profile']
             jobseeker_fields = [
                 profile.get('current_job_title'),
                 profile.get('experience'),
@@ -106,10 +128,10 @@ class User(db.Model):
                 if field:
                     completed += 1
             total += 1
-            if len(self.skills) > 0:
+            if has_skills():
                 completed += 1
-        elif self.role == 'employer' and self.employer_profile:
-            profile = self.employer_profile
+        elif values['role'] == 'employer' and values['employer_profile']:
+            profile = values['employer_profile']
             employer_fields = [
                 profile.get('company_name'),
                 profile.get('industry'),
@@ -123,10 +145,25 @@ class User(db.Model):
         
         return round((completed / total) * 100) if total > 0 else 0
     
+    def record_login(self):
+        counters.touch(User, 'last_login', self.id, datetime.utcnow())
+    
+    def latest_login(self):
+        """Last login including one still waiting in the write-behind buffer"""
+        return counters.pending_value(User, 'last_login', self.id) or self.last_login
+    
+    def increment_profile_views(self):
+        counters.increment(User, 'profile_views', self.id)
+    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
     
+    @staticmethod
+    def load_options():
+        """Loader options that batch-fetch the skills to_dict and profile completion touch"""
+        return [selectinload(User.skills).joinedload(UserSkill.skill)]
+    
     def to_dict(self, include_sensitive=False):
         data = {
             'id': self.id,
@@ -146,7 +183,8 @@ class User(db.Model):
             },
             'is_active': self.is_active,
             'is_email_verified': self.is_email_verified,
-            'profile_completion': self.get_profile_completion(),
+            'profile_completion': self.profile_completion if self.profile_completion is not None
+            else self.get_profile_completion(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -159,7 +197,8 @@ class User(db.Model):
         
         if include_sensitive:
             data['preferences'] = self.preferences
-            data['last_login'] = self.last_login.isoformat() if self.last_login else None
+            last_login = self.latest_login()
+            data['last_login'] = last_login.isoformat() if last_login else None
         
         return data
     
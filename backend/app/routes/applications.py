@@ -0,0 +1,84 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import Job
+from app.services import exports, funnel
+from app.services.identity import identity
+from datetime import datetime
+
+bp = Blueprint('applications', __name__)
+
+@bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_applications():
+    """Stream all of the employer's applications as NDJSON or CSV
+    
+    `format` is ndjson (default) or csv; `job_id`, `status` and `since`
+    (ISO date) narrow the export. Rows come straight from a server-side
+    cursor over one joined query, so memory use does not grow with the
+    number of applications.
+    """
+    try:
+        user, _ = identity.load(get_jwt_identity())
+        
+        if not user or user.role != 'employer':
+            return jsonify({'error': 'Only employers can export applications'}), 403
+        
+        format = request.args.get('format', 'ndjson')
+        if format not in exports.FORMATS:
+            return jsonify({'error': f'format must be one of {", ".join(exports.FORMATS)}'}), 400
+        
+        since = request.args.get('since')
+        try:
+            since = datetime.fromisoformat(since) if since else None
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO date'}), 400
+        
+        query = exports.export_query(
+            user.id,
+            job_id=request.args.get('job_id', type=int),
+            status=request.args.get('status'),
+            since=since
+        )
+        
+        filename = f'applications-{datetime.utcnow():%Y%m%d}.{format}'
+        return Response(
+            stream_with_context(exports.export_chunks(format, query)),
+            mimetype=exports.FORMATS[format],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/funnel', methods=['GET'])
+@jwt_required()
+def get_funnel():
+    """Hiring funnel of the employer, or of one of their jobs with `job_id`
+    
+    Stage counts, conversion from submitted and time-in-stage histograms
+    come from tables maintained as applications move, so the cost does not
+    depend on how many applications there are.
+    """
+    try:
+        user, _ = identity.load(get_jwt_identity())
+        
+        if not user or user.role != 'employer':
+            return jsonify({'error': 'Only employers can view their funnel'}), 403
+        
+        job_id = request.args.get('job_id', type=int)
+        if job_id is not None:
+            job = Job.query.get(job_id)
+            if not job or job.employer_id != user.id:
+                return jsonify({'error': 'Job not found'}), 404
+            scope, scope_id = 'job', job_id
+        else:
+            scope, scope_id = 'employer', user.id
+        
+        return jsonify({
+            'scope': scope,
+            'id': scope_id,
+            'stages': funnel.report(scope, scope_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
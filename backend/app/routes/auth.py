@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app import db
 from app.models import User
+from app.services.identity import identity
+from app.services.passwords import PasswordPoolBusy
 from datetime import timedelta
 
 bp = Blueprint('auth', __name__)
@@ -52,6 +54,10 @@ def register():
             'user': user.to_dict()
         }), 201
 
+    except PasswordPoolBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please retry shortly'}), 503, {'Retry-After': '1'}
+
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -66,7 +72,7 @@ def login():
         if not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Email and password required'}), 400
 
-        user = User.query.filter_by(email=data['email']).first()
+        user = User.query.filter_by(email=data['email']).options(*User.load_options()).first()
 
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
@@ -74,9 +80,12 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 403
 
-        from datetime import datetime
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        if user.password_needs_rehash():
+            # Work factor changed since the hash was stored
+            user.set_password(data['password'])
+            db.session.commit()
+
+        user.record_login()
 
         access_token = create_access_token(
             identity=str(user.id),
@@ -89,6 +98,10 @@ def login():
             'user': user.to_dict()
         }), 200
 
+    except PasswordPoolBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please retry shortly'}), 503, {'Retry-After': '1'}
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -98,12 +111,14 @@ def login():
 def get_current_user():
     """Get current logged-in user"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user, _ = identity.load(get_jwt_identity())
 
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
+        if user.role == 'jobseeker':
+            identity.load_skills(user)
+
         return jsonify(user.to_dict(include_sensitive=True)), 200
 
     except Exception as e:
@@ -125,7 +140,7 @@ def update_profile():
 
         allowed_fields = [
             'first_name', 'last_name', 'phone', 'bio',
-            'city', 'state', 'country', 'zip_code',
+            'city', 'state', 'country', 'zip_code', 'latitude', 'longitude',
             'job_seeker_profile', 'employer_profile', 'preferences'
         ]
 
@@ -1,66 +1,201 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Job, User
+from app.services import ingest, job_stats, listing
+from app.services.bitmap_index import bitmap_index
+from app.services.facets import facet_index, parse_facets
+from app.services.identity import identity
+from app.services.response_cache import job_responses
+from app.services.fragments import job_fragments, json_response
+import io
 
 bp = Blueprint('jobs', __name__)
 
 @bp.route('', methods=['GET'])  # Changed from '/' to ''
 def get_jobs():
-    """Get all jobs with optional filters"""
+    """Get all jobs with optional filters
+    
+    Pass `near=lat,lng` with an optional `radius_km` (default 25) to keep
+    jobs within that distance, and `skills` (comma-separated skill ids) to
+    keep jobs requiring all of them, or any with `skill_match=any`. Choice
+    filters take comma-separated alternatives. Without search or near,
+    filters are answered by the in-process bitmap index and only the page
+    is loaded from the database. Pass `cursor` (empty for the first page) for
+    keyset pagination; the response then carries `next_cursor` instead of
+    page numbers. Pass `facets` (comma-separated, or `all`) for value counts
+    of job_type, work_mode, experience_level, industry, category and city
+    under the other active filters. Responses are cached per normalized
+    query and support If-None-Match.
+    """
     try:
+        cache_key = job_responses.key_for(request.args)
+        entry = job_responses.get(cache_key)
+        if entry is not None:
+            return job_responses.respond(entry, request)
+        
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        search = request.args.get('search', '')
-        job_type = request.args.get('job_type', '')
-        work_mode = request.args.get('work_mode', '')
-        experience_level = request.args.get('experience_level', '')
-        city = request.args.get('city', '')
+        cursor = request.args.get('cursor')
+        if per_page < 1:
+            per_page = 20
+        filters = listing.parse_filters(request.args)
         
-        # Build query
-        query = Job.query.filter_by(status='active', visibility='public')
+        facets = None
+        if request.args.get('facets'):
+            try:
+                facets = facet_index.counts(filters, parse_facets(request.args['facets']))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        # Apply filters
-        if search:
-            query = query.filter(
-                (Job.title.ilike(f'%{search}%')) | 
-                (Job.company_name.ilike(f'%{search}%')) |
-                (Job.description.ilike(f'%{search}%'))
-            )
+        if bitmap_index.covers(filters):
+            page = max(page, 1)
+            try:
+                job_ids, total, has_next = bitmap_index.page(
+                    filters, per_page, offset=(page - 1) * per_page if cursor is None else 0, cursor=cursor
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            items = listing.load_page(job_ids)
+            
+            payload = {'jobs': [job_fragments.render(job) for job in items], 'total': total, 'per_page': per_page}
+            if cursor is not None:
+                payload['has_next'] = has_next
+                payload['next_cursor'] = listing.encode_cursor(items[-1]) if has_next and items else None
+            else:
+                pages = -(-total // per_page)
+                payload.update(pages=pages, current_page=page, has_next=page < pages, has_prev=page > 1)
+            if facets is not None:
+                payload['facets'] = facets
+            entry = job_responses.store(cache_key, payload, items)
+            return job_responses.respond(entry, request)
         
-        if job_type:
-            query = query.filter_by(job_type=job_type)
+        # Build query
+        try:
+            query = listing.filtered_query(filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if work_mode:
-            query = query.filter_by(work_mode=work_mode)
+        # Totals are cached per filter combination instead of counted per page
+        total = listing.cached_total(filters, query)
         
-        if experience_level:
-            query = query.filter_by(experience_level=experience_level)
+        # Order by featured first, then by date
+        query = listing.order_listing(query)
         
-        if city:
-            query = query.filter(Job.city.ilike(f'%{city}%'))
+        # Batch-load the relationships to_dict serializes
+        query = query.options(*Job.load_options())
         
-        # Order by featured first, then by date
-        query = query.order_by(Job.featured.desc(), Job.published_at.desc())
+        if cursor is not None:
+            if filters['search']:
+                return jsonify({'error': 'cursor pagination is not supported with search'}), 400
+            
+            if cursor:
+                try:
+                    query = listing.after_cursor(query, cursor)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            
+            # Seek directly to the page, fetching one extra row to detect a next page
+            items = query.limit(per_page + 1).all()
+            has_next = len(items) > per_page
+            items = items[:per_page]
+            
+            payload = {
+                'jobs': [job_fragments.render(job) for job in items],
+                'total': total,
+                'per_page': per_page,
+                'has_next': has_next,
+                'next_cursor': listing.encode_cursor(items[-1]) if has_next else None
+            }
+            if facets is not None:
+                payload['facets'] = facets
+            entry = job_responses.store(cache_key, payload, items)
+            return job_responses.respond(entry, request)
         
         # Paginate
         pagination = query.paginate(
             page=page, 
             per_page=per_page, 
-            error_out=False
+            error_out=False,
+            count=False
         )
+        pages = -(-total // pagination.per_page)
         
-        jobs = [job.to_dict() for job in pagination.items]
+        jobs = [job_fragments.render(job) for job in pagination.items]
         
-        return jsonify({
+        payload = {
             'jobs': jobs,
-            'total': pagination.total,
-            'pages': pagination.pages,
+            'total': total,
+            'pages': pages,
+            'current_page': pagination.page,
+            'per_page': pagination.per_page,
+            'has_next': pagination.page < pages,
+            'has_prev': pagination.page > 1
+        }
+        if facets is not None:
+            payload['facets'] = facets
+        entry = job_responses.store(cache_key, payload, pagination.items)
+        return job_responses.respond(entry, request)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/mine', methods=['GET'])
+@jwt_required()
+def get_my_jobs():
+    """List the employer's postings with their application counters (employer only)
+    
+    Counts by status, unread and total applications and views come from
+    counters maintained as applications are created, viewed and moved, so
+    a page costs the same few queries however many postings it holds.
+    Pass `status` to keep one job status; `per_page` goes up to 200.
+    """
+    try:
+        user, _ = identity.load(get_jwt_identity())
+        
+        if not user or user.role != 'employer':
+            return jsonify({'error': 'Only employers have postings'}), 403
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+        
+        query = Job.query.filter(Job.employer_id == user.id)
+        if request.args.get('status'):
+            query = query.filter(Job.status == request.args['status'])
+        
+        totals = query.with_entities(
+            db.func.count(Job.id),
+            db.func.coalesce(db.func.sum(Job.applications_count), 0),
+            db.func.coalesce(db.func.sum(Job.unread_applications_count), 0),
+            db.func.coalesce(db.func.sum(Job.views), 0)
+        ).one()
+        jobs = query.order_by(Job.created_at.desc(), Job.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        counts = job_stats.status_counts([job.id for job in jobs])
+        
+        return jsonify({
+            'jobs': [{
+                'id': job.id,
+                'title': job.title,
+                'status': job.status,
+                'visibility': job.visibility,
+                'city': job.city,
+                'created_at': job.created_at.isoformat(),
+                'published_at': job.published_at.isoformat() if job.published_at else None,
+                'views': job.total_views(),
+                'applications_count': job.applications_count or 0,
+                'unread_count': job.unread_applications_count or 0,
+                'status_counts': counts[job.id]
+            } for job in jobs],
+            'totals': {
+                'jobs': totals[0],
+                'applications': int(totals[1]),
+                'unread': int(totals[2]),
+                'views': int(totals[3])
+            },
             'current_page': page,
             'per_page': per_page,
-            'has_next': pagination.has_next,
-            'has_prev': pagination.has_prev
+            'has_next': page * per_page < totals[0]
         }), 200
         
     except Exception as e:
@@ -70,15 +205,15 @@ def get_jobs():
 def get_job(id):
     """Get a single job by ID"""
     try:
-        job = Job.query.get(id)
+        job = Job.query.options(*Job.load_options()).get(id)
         
         if not job:
             return jsonify({'error': 'Job not found'}), 404
         
-        # Increment view count
+        # Increment view count (buffered, flushed in batches)
         job.increment_views()
         
-        return jsonify(job.to_dict()), 200
+        return json_response(job_fragments.render(job))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -89,7 +224,7 @@ def create_job():
     """Create a new job (employer only)"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user, _ = identity.load(user_id)
         
         if not user or user.role != 'employer':
             return jsonify({'error': 'Only employers can create jobs'}), 403
@@ -110,6 +245,8 @@ def create_job():
             city=data.get('city'),
             state=data.get('state'),
             country=data.get('country'),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
             allows_remote=data.get('allows_remote', False),
             salary_min=data.get('salary_min'),
             salary_max=data.get('salary_max'),
@@ -134,3 +271,45 @@ def create_job():
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_import_jobs():
+    """Create or update many jobs from a JSONL or CSV feed (employer only)
+    
+    Rows are upserted by their `external_id`. The body is read as a stream,
+    as application/x-ndjson or text/csv (or `?format=jsonl|csv`); pass
+    `create_skills=true` to add skills the catalog does not know. Rows
+    that fail validation are listed in the response without stopping the
+    import.
+    """
+    try:
+        user_id = get_jwt_identity()
+        user, _ = identity.load(user_id)
+        
+        if not user or user.role != 'employer':
+            return jsonify({'error': 'Only employers can import jobs'}), 403
+        
+        format = request.args.get('format')
+        if not format:
+            format = 'csv' if request.mimetype == 'text/csv' else 'jsonl'
+        if format not in ingest.FORMATS:
+            return jsonify({'error': f'format must be one of {", ".join(ingest.FORMATS)}'}), 400
+        
+        importer = ingest.JobImporter(
+            user,
+            batch_size=current_app.config['BULK_INGEST_BATCH_SIZE'],
+            create_skills=request.args.get('create_skills', '').lower() in ('1', 'true', 'yes')
+        )
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        summary = importer.run(
+            ingest.read_rows(stream, format),
+            max_rows=current_app.config['MAX_BULK_ROWS']
+        )
+        
+        return jsonify(summary), 200
+        
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Body must be UTF-8 text'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,188 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from app import db
+from app.models import Application, Job, JobSkill, Skill, User, UserSkill
+from app.services.changes import on_commit
+from app.services.matching import MATCH_COLUMNS, MAX_SCORE, load_profiles, score_components
+from app.services.recommendations import PROFILE_COLUMNS
+from datetime import datetime
+from sqlalchemy import and_, bindparam, or_, select, update
+import multiprocessing
+import os
+
+# Bumped whenever score_components changes, so old analyses can be told apart
+SCORE_VERSION = 1
+
+# Ids per IN list when marking applications whose inputs changed
+MARK_CHUNK = 500
+
+JobFacts = namedtuple('JobFacts', ['id', 'experience_level', 'city', 'latitude', 'longitude',
+                                   'allows_remote', 'work_mode'])
+
+
+def score_applications(tasks):
+    """Score [(job, job_skills, skill_names, [(application_id, profile), ...]), ...]
+
+    Runs in pool processes, so it only sees plain data and returns
+    [(application_id, score, analysis), ...].
+    """
+    results = []
+    for job, job_skills, skill_names, applications in tasks:
+        profiles = [profile for _, profile in applications]
+        components = score_components(job, job_skills, profiles)
+        scores = sum(components.values())
+        for row, (application_id, profile) in enumerate(applications):
+            held = [skill_id for skill_id, _, _ in job_skills if skill_id in profile.skill_levels]
+            missing = [skill_id for skill_id, _, _ in job_skills if skill_id not in profile.skill_levels]
+            results.append((application_id, float(min(int(scores[row]), MAX_SCORE)), {
+                'version': SCORE_VERSION,
+                'components': {name: int(points[row]) for name, points in components.items()},
+                'matched_skills': [skill_names.get(skill_id) for skill_id in held],
+                'missing_skills': [skill_names.get(skill_id) for skill_id in missing]
+            }))
+    return results
+
+
+class ApplicationScorer:
+    """Batch AI scoring of applications into ai_match_score and ai_analysis
+
+    Applications are read in id order SCORING_BATCH_SIZE at a time, grouped
+    by job and scored with the same components as the match ranking across
+    SCORING_WORKERS processes (0 or 1 scores inline); each batch is written
+    back with one executemany update. A commit that changes a job's match
+    fields or skills, or an applicant's profile or skills, stamps
+    ai_inputs_changed_at on their scored applications, so a run only picks
+    up applications never scored or changed since their score was read.
+    """
+
+    def __init__(self, app=None):
+        self.workers = os.cpu_count() or 1
+        self.batch_size = 2000
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config.get('SCORING_WORKERS', self.workers)
+        self.batch_size = app.config.get('SCORING_BATCH_SIZE', self.batch_size)
+
+    def run(self, job_id=None, employer_id=None, rescore=False, workers=None, batch_size=None):
+        """Score pending applications, or all matching ones with `rescore`; returns how many were written"""
+        workers = self.workers if workers is None else workers
+        batch_size = batch_size or self.batch_size
+        query = select(Application.id, Application.job_id, Application.applicant_id)
+        if job_id is not None:
+            query = query.where(Application.job_id == job_id)
+        if employer_id is not None:
+            query = query.where(Application.employer_id == employer_id)
+        if not rescore:
+            query = query.where(or_(
+                Application.ai_scored_at.is_(None),
+                and_(Application.ai_inputs_changed_at.isnot(None),
+                     Application.ai_inputs_changed_at > Application.ai_scored_at)
+            ))
+
+        executor = None
+        if workers > 1:
+            # Children only run numpy over plain data; spawn would re-import
+            # unguarded entry scripts
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            written, last_id = 0, 0
+            while True:
+                # Anything committed after this read is newer than the stored score
+                read_at = datetime.utcnow()
+                with db.engine.connect() as connection:
+                    batch = connection.execute(
+                        query.where(Application.id > last_id).order_by(Application.id).limit(batch_size)
+                    ).all()
+                    if not batch:
+                        break
+                    last_id = batch[-1].id
+                    tasks = self._tasks(connection, batch)
+                if executor is not None:
+                    chunks = [tasks[i::workers] for i in range(workers)]
+                    results = [row for part in executor.map(score_applications, chunks) for row in part]
+                else:
+                    results = score_applications(tasks)
+                written += self._write(results, read_at)
+            return written
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _tasks(self, connection, batch):
+        job_ids = {row.job_id for row in batch}
+        jobs = {row.id: JobFacts(*row) for row in connection.execute(
+            select(Job.id, Job.experience_level, Job.city, Job.latitude, Job.longitude,
+                   Job.allows_remote, Job.work_mode).where(Job.id.in_(job_ids))
+        )}
+        job_skills, skill_names = {}, {}
+        for job_id, skill_id, weight, level, name in connection.execute(
+            select(JobSkill.job_id, JobSkill.skill_id, JobSkill.weight, JobSkill.proficiency_level, Skill.name)
+            .join(Skill, Skill.id == JobSkill.skill_id).where(JobSkill.job_id.in_(job_ids))
+            .order_by(JobSkill.job_id, JobSkill.id)
+        ):
+            job_skills.setdefault(job_id, []).append((skill_id, weight, level))
+            skill_names[skill_id] = name
+        # Only skills some job of the batch asks for can change a score
+        profiles = load_profiles(connection, list({row.applicant_id for row in batch}), skill_ids=list(skill_names))
+
+        by_job = {}
+        for row in batch:
+            if row.job_id in jobs and row.applicant_id in profiles:
+                by_job.setdefault(row.job_id, []).append((row.id, profiles[row.applicant_id]))
+        return [
+            (jobs[job_id], job_skills.get(job_id, []),
+             {skill_id: skill_names[skill_id] for skill_id, _, _ in job_skills.get(job_id, [])}, applications)
+            for job_id, applications in by_job.items()
+        ]
+
+    def _write(self, results, read_at):
+        if not results:
+            return 0
+        scored_at = read_at.isoformat()
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(Application)
+                .where(Application.id == bindparam('_id'))
+                .values(ai_match_score=bindparam('_score'), ai_analysis=bindparam('_analysis'),
+                        ai_scored_at=read_at, updated_at=Application.updated_at),
+                [{'_id': application_id, '_score': score, '_analysis': dict(analysis, scored_at=scored_at)}
+                 for application_id, score, analysis in results]
+            )
+        return len(results)
+
+    def mark_changed(self, job_ids=(), user_ids=()):
+        """Stamp scored applications of these jobs and applicants as needing a re-score"""
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            for column, ids in ((Application.job_id, list(job_ids)), (Application.applicant_id, list(user_ids))):
+                for start in range(0, len(ids), MARK_CHUNK):
+                    connection.execute(
+                        update(Application)
+                        .where(column.in_(ids[start:start + MARK_CHUNK]), Application.ai_scored_at.isnot(None))
+                        .values(ai_inputs_changed_at=now, updated_at=Application.updated_at)
+                    )
+
+
+application_scorer = ApplicationScorer()
+
+
+@on_commit(Job, JobSkill, User, UserSkill)
+def _mark_applications_changed(changes):
+    job_ids, user_ids = set(), set()
+    for change in changes:
+        if change.model is Job and change.op == 'dirty' and change.changed & MATCH_COLUMNS:
+            job_ids.add(change.id)
+        elif change.model is JobSkill:
+            job_ids.add(change.values.get('job_id'))
+        elif change.model is User and change.op == 'dirty' and change.changed & PROFILE_COLUMNS:
+            user_ids.add(change.id)
+        elif change.model is UserSkill:
+            user_ids.add(change.values.get('user_id'))
+    job_ids.discard(None)
+    user_ids.discard(None)
+    if job_ids or user_ids:
+        application_scorer.mark_changed(job_ids, user_ids)
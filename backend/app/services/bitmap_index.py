@@ -0,0 +1,269 @@
+from app import db
+from app.models import Job, JobSkill
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.changes import on_commit
+from app.services.listing import CHOICE_FILTERS, choices, decode_cursor, parse_skills
+from datetime import datetime
+from sqlalchemy import select
+import numpy as np
+import threading
+
+# Job columns held as bitmaps, one per distinct value
+ATTRIBUTES = CHOICE_FILTERS + ('city',)
+
+# Job columns whose change moves a job into, out of or within the index
+INDEX_COLUMNS = set(ATTRIBUTES) | {'status', 'visibility', 'featured', 'published_at'}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _published_key(published_at):
+    # Microseconds, with missing dates below every real one so they sort last
+    return int((published_at - _EPOCH).total_seconds() * 1_000_000) if published_at else -1
+
+
+def _bit(slot):
+    return 1 << slot
+
+
+class BitmapIndex:
+    """Bitsets over the active public catalog answering listing filters in process
+
+    Every listed job holds a slot. Each attribute value and each required
+    skill id owns a Python int whose set bits are the slots having it, so a
+    filter combination is a few bitwise ANDs and ORs (ORs across a choice
+    filter's alternatives and a city substring's matching values, ANDs
+    across filters and, by default, across skills) and the total is a
+    popcount. Status and visibility need no bitmaps: only active public
+    jobs get a slot. The listing order is applied to the matching slots
+    from in-memory sort keys, so only the final page is read from the
+    database.
+
+    Commits in this process update just the touched jobs' slots; commits
+    touching more than BITMAP_INDEX_BULK_THRESHOLD jobs mark it stale for a
+    full rebuild. Other workers' writes are picked up by a full rebuild
+    whenever catalog_snapshot publishes a new version, which costs one
+    stat per read to notice.
+    """
+
+    def __init__(self, app=None):
+        self.bulk_threshold = 500
+        self._version = None
+        self._stale = True
+        self._lock = threading.RLock()
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.bulk_threshold = app.config.get('BITMAP_INDEX_BULK_THRESHOLD', self.bulk_threshold)
+
+    def _reset(self):
+        self._slots = {}
+        self._entries = []
+        self._free = []
+        self._all = 0
+        self._values = {attribute: {} for attribute in ATTRIBUTES}
+        self._skills = {}
+        self._job_ids = np.zeros(0, dtype=np.int64)
+        self._featured = np.zeros(0, dtype=np.int8)
+        self._published = np.zeros(0, dtype=np.int64)
+
+    def invalidate(self):
+        self._stale = True
+
+    def covers(self, filters):
+        """Whether the index can answer these filters; search and radius filters stay in SQL"""
+        return not filters['search'] and not filters['near']
+
+    def _current(self):
+        # Read before rebuilding, so the index is at least as new as this version
+        version = catalog_snapshot.current.version
+        if self._stale or version != self._version:
+            with self._lock:
+                if self._stale or version != self._version:
+                    # Cleared before reading so commits during the rebuild mark it
+                    # stale again; a failed rebuild leaves it stale for the next read
+                    self._stale = False
+                    try:
+                        self._rebuild()
+                    except BaseException:
+                        self._stale = True
+                        raise
+                    self._version = version
+
+    def _rebuild(self):
+        with db.engine.connect() as connection:
+            rows, skills = self._load(connection, None)
+        self._reset()
+        capacity = len(rows)
+        self._job_ids = np.zeros(capacity, dtype=np.int64)
+        self._featured = np.zeros(capacity, dtype=np.int8)
+        self._published = np.zeros(capacity, dtype=np.int64)
+        for row in rows:
+            self._add(row, skills.get(row.id, ()))
+
+    def _load(self, connection, job_ids):
+        query = select(Job.id, Job.featured, Job.published_at, *(getattr(Job, name) for name in ATTRIBUTES)).where(
+            Job.status == 'active', Job.visibility == 'public'
+        )
+        links = select(JobSkill.job_id, JobSkill.skill_id).join(Job, Job.id == JobSkill.job_id).where(
+            Job.status == 'active', Job.visibility == 'public'
+        )
+        if job_ids is not None:
+            query = query.where(Job.id.in_(job_ids))
+            links = links.where(JobSkill.job_id.in_(job_ids))
+        skills = {}
+        for job_id, skill_id in connection.execute(links):
+            skills.setdefault(job_id, set()).add(skill_id)
+        return connection.execute(query.order_by(Job.id)).all(), skills
+
+    def _add(self, row, skill_ids):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._entries)
+            self._entries.append(None)
+            if slot >= len(self._job_ids):
+                grow = max(len(self._job_ids), 1024)
+                self._job_ids = np.concatenate([self._job_ids, np.zeros(grow, dtype=np.int64)])
+                self._featured = np.concatenate([self._featured, np.zeros(grow, dtype=np.int8)])
+                self._published = np.concatenate([self._published, np.zeros(grow, dtype=np.int64)])
+        bit = _bit(slot)
+        values = tuple(getattr(row, name) for name in ATTRIBUTES)
+        skill_ids = frozenset(skill_ids)
+        for name, value in zip(ATTRIBUTES, values):
+            if value:
+                bitmaps = self._values[name]
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        for skill_id in skill_ids:
+            self._skills[skill_id] = self._skills.get(skill_id, 0) | bit
+        self._all |= bit
+        self._slots[row.id] = slot
+        self._entries[slot] = (values, skill_ids)
+        self._job_ids[slot] = row.id
+        self._featured[slot] = 1 if row.featured else 0
+        self._published[slot] = _published_key(row.published_at)
+
+    def _remove(self, job_id):
+        slot = self._slots.pop(job_id, None)
+        if slot is None:
+            return
+        clear = ~_bit(slot)
+        values, skill_ids = self._entries[slot]
+        for name, value in zip(ATTRIBUTES, values):
+            if value:
+                bitmaps = self._values[name]
+                bitmaps[value] &= clear
+                if not bitmaps[value]:
+                    del bitmaps[value]
+        for skill_id in skill_ids:
+            self._skills[skill_id] &= clear
+            if not self._skills[skill_id]:
+                del self._skills[skill_id]
+        self._all &= clear
+        self._entries[slot] = None
+        self._free.append(slot)
+
+    def refresh(self, job_ids):
+        """Re-read these jobs and move their bits; jobs no longer listed lose their slot"""
+        if self._stale:
+            return
+        with db.engine.connect() as connection:
+            rows, skills = self._load(connection, list(job_ids))
+        with self._lock:
+            if self._stale:
+                return
+            for job_id in job_ids:
+                self._remove(job_id)
+            for row in rows:
+                self._add(row, skills.get(row.id, ()))
+
+    def match(self, filters):
+        """Bitmap of the slots matching the listing filters; raises ValueError like filtered_query"""
+        skill_ids, match_all = parse_skills(filters)
+        self._current()
+        with self._lock:
+            result = self._all
+            for name in CHOICE_FILTERS:
+                if filters[name]:
+                    bitmaps = self._values[name]
+                    union = 0
+                    for value in choices(filters[name]):
+                        union |= bitmaps.get(value, 0)
+                    result &= union
+            if filters['city']:
+                # The listing matches cities by case-insensitive substring
+                needle = filters['city'].lower()
+                union = 0
+                for city, bitmap in self._values['city'].items():
+                    if needle in city.lower():
+                        union |= bitmap
+                result &= union
+            if skill_ids and match_all:
+                for skill_id in skill_ids:
+                    result &= self._skills.get(skill_id, 0)
+            elif skill_ids:
+                union = 0
+                for skill_id in skill_ids:
+                    union |= self._skills.get(skill_id, 0)
+                result &= union
+            return result
+
+    def page(self, filters, limit, offset=0, cursor=None):
+        """Return (job ids of one page in listing order, total matches, has next page)
+
+        `cursor` continues after an encoded listing cursor instead of
+        skipping `offset` rows. Raises ValueError for malformed filters or
+        cursors.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        bitmap = self.match(filters)
+        total = bitmap.bit_count()
+        with self._lock:
+            slots = self._positions(bitmap)
+            job_ids = self._job_ids[slots]
+            featured = self._featured[slots]
+            published = self._published[slots]
+        if after is not None:
+            after_featured, after_published, after_id = after
+            after_featured, after_published = int(after_featured), _published_key(after_published)
+            keep = (featured < after_featured) | (featured == after_featured) & (
+                (published < after_published) | (published == after_published) & (job_ids < after_id)
+            )
+            job_ids, featured, published = job_ids[keep], featured[keep], published[keep]
+
+        # Featured first, then newest, then highest id, as listing.order_listing
+        order = np.lexsort((-job_ids, -published, -featured))
+        page = [int(job_id) for job_id in job_ids[order[offset:offset + limit]]]
+        return page, total, len(order) > offset + limit
+
+    @staticmethod
+    def _positions(bitmap):
+        if not bitmap:
+            return np.zeros(0, dtype=np.int64)
+        raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+
+    def stats(self):
+        return {'jobs': len(self._slots), 'values': {name: len(bitmaps) for name, bitmaps in self._values.items()},
+                'skills': len(self._skills), 'version': self._version, 'stale': self._stale}
+
+
+bitmap_index = BitmapIndex()
+
+
+@on_commit(Job, JobSkill)
+def _refresh_bitmaps(changes):
+    job_ids = set()
+    for change in changes:
+        if change.model is Job:
+            if change.op != 'dirty' or change.changed & INDEX_COLUMNS:
+                job_ids.add(change.id)
+        else:
+            job_ids.add(change.values.get('job_id'))
+    job_ids.discard(None)
+    if len(job_ids) > bitmap_index.bulk_threshold:
+        bitmap_index.invalidate()
+    elif job_ids:
+        bitmap_index.refresh(job_ids)
@@ -0,0 +1,344 @@
+from app import db
+from app.models import Job, JobSkill, Skill
+from app.services.changes import on_commit
+from datetime import datetime
+from sqlalchemy import select
+import hashlib
+import json
+import logging
+import mmap
+import numpy as np
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Enum-coded job columns: rows store an index into the column's vocabulary, -1 for no value
+CATEGORIES = (
+    'job_type', 'work_mode', 'experience_level', 'industry', 'category', 'country', 'city',
+    'salary_currency', 'salary_period'
+)
+
+# Job columns whose change alters the snapshot or a job's membership in it
+SNAPSHOT_COLUMNS = set(CATEGORIES) | {
+    'status', 'visibility', 'featured', 'published_at', 'allows_remote', 'salary_min', 'salary_max',
+    'latitude', 'longitude'
+}
+
+DEFAULT_SKILL_WEIGHT = 5
+
+MAGIC = b'JOBCAT01'
+
+# Arrays start on cache-line boundaries
+ALIGNMENT = 64
+
+POINTER = 'catalog.current'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _float(value):
+    return value if value is not None else np.nan
+
+
+def build_columns(connection):
+    """Read the active public catalog into ({name: array}, {category: [values]})
+
+    Jobs are rows ordered by id. Skills are CSR-encoded: the required
+    skills of row i are skill_ids[skill_offsets[i]:skill_offsets[i + 1]]
+    with their weights and levels as the matcher reads them alongside.
+    """
+    active = (Job.status == 'active', Job.visibility == 'public')
+    rows = connection.execute(
+        select(Job.id, Job.featured, Job.published_at, Job.allows_remote, Job.salary_min, Job.salary_max,
+               Job.latitude, Job.longitude, *(getattr(Job, name) for name in CATEGORIES))
+        .where(*active).order_by(Job.id)
+    ).all()
+    links = connection.execute(
+        select(JobSkill.job_id, JobSkill.skill_id, JobSkill.weight, JobSkill.proficiency_level)
+        .join(Skill, Skill.id == JobSkill.skill_id).join(Job, Job.id == JobSkill.job_id)
+        .where(*active).order_by(JobSkill.job_id, JobSkill.id)
+    ).all()
+
+    job_ids = np.array([row.id for row in rows], dtype=np.int64)
+    columns = {
+        'job_id': job_ids,
+        'featured': np.array([bool(row.featured) for row in rows], dtype=bool),
+        # Microseconds since the epoch, -1 for unpublished
+        'published_at': np.array(
+            [int((row.published_at - _EPOCH).total_seconds() * 1_000_000) if row.published_at else -1
+             for row in rows],
+            dtype=np.int64
+        ),
+        'allows_remote': np.array([bool(row.allows_remote) for row in rows], dtype=bool),
+        'salary_min': np.array([_float(row.salary_min) for row in rows], dtype=np.float64),
+        'salary_max': np.array([_float(row.salary_max) for row in rows], dtype=np.float64),
+        'latitude': np.array([_float(row.latitude) for row in rows], dtype=np.float64),
+        'longitude': np.array([_float(row.longitude) for row in rows], dtype=np.float64),
+    }
+    vocabularies = {}
+    for position, name in enumerate(CATEGORIES, start=8):
+        vocabulary = {}
+        columns[name] = np.array(
+            [vocabulary.setdefault(row[position], len(vocabulary)) if row[position] else -1 for row in rows],
+            dtype=np.int32
+        )
+        vocabularies[name] = list(vocabulary)
+
+    link_rows = np.searchsorted(job_ids, np.array([link.job_id for link in links], dtype=np.int64))
+    columns['skill_offsets'] = np.concatenate(
+        [[0], np.cumsum(np.bincount(link_rows, minlength=len(rows)))]
+    ).astype(np.int64)
+    columns['skill_ids'] = np.array([link.skill_id for link in links], dtype=np.int64)
+    columns['skill_weights'] = np.array(
+        [max(link.weight, 0) if link.weight is not None else DEFAULT_SKILL_WEIGHT for link in links],
+        dtype=np.float64
+    )
+    columns['skill_levels'] = np.array(
+        [link.proficiency_level if link.proficiency_level else np.nan for link in links], dtype=np.float64
+    )
+    return columns, vocabularies
+
+
+def write_snapshot(path, columns, vocabularies, version, built_at):
+    """Write a snapshot file: magic, header length, JSON header, then aligned raw arrays
+
+    `built_at` is the epoch time the columns were read at.
+    """
+    arrays, offset = {}, 0
+    for name, array in columns.items():
+        arrays[name] = {'dtype': array.dtype.str, 'length': len(array), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({
+        'version': version,
+        'built_at': built_at,
+        'size': len(columns['job_id']),
+        'vocabularies': vocabularies,
+        'arrays': arrays
+    }).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for name, array in columns.items():
+            f.seek(data_start + arrays[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class CatalogSnapshot:
+    """One snapshot file mapped read-only
+
+    Columns are numpy views straight onto the mapping, so every process
+    mapping the same file shares its pages through the OS page cache
+    instead of holding a private copy.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot')
+        length = int.from_bytes(self._map[len(MAGIC):len(MAGIC) + 8], 'little')
+        header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        data_start = _aligned(len(MAGIC) + 8 + length)
+
+        self.path = path
+        self.version = header['version']
+        self.built_at = header['built_at']
+        self.size = header['size']
+        self.vocabularies = header['vocabularies']
+        self.columns = {
+            name: np.frombuffer(self._map, dtype=np.dtype(spec['dtype']), count=spec['length'],
+                                offset=data_start + spec['offset'])
+            for name, spec in header['arrays'].items()
+        }
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def skills(self, row):
+        """Skill ids required by one row"""
+        offsets = self.columns['skill_offsets']
+        return self.columns['skill_ids'][offsets[row]:offsets[row + 1]]
+
+
+class CatalogStore:
+    """Versioned snapshot files of the active catalog shared by every worker
+
+    A rebuild writes catalog-<version>.snap under a temporary name, renames
+    it into place and then atomically replaces the catalog.current pointer,
+    so readers only ever see complete files. Each process maps the file the
+    pointer names and notices a new version with one stat per access;
+    superseded mappings stay valid until dropped, as the previous file is
+    kept and older ones are unlinked.
+
+    Commits in this process that touch catalog columns or job skills mark
+    the snapshot stale. A stale snapshot, or one older than
+    CATALOG_SNAPSHOT_TTL seconds, keeps being served while a background
+    thread in the worker reading it rebuilds it, one at a time per worker;
+    a file lock keeps the other workers serving the current version
+    meanwhile. Only a worker finding no snapshot at all waits for one.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.directory = None
+        self.ttl = 300
+        self._snapshot = None
+        self._pointer_stat = None
+        self._stale = False
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._rebuilding = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config.get('CATALOG_SNAPSHOT_DIR')
+        if not self.directory:
+            # One directory per database, so apps on different databases never share files
+            database = hashlib.sha1(app.config['SQLALCHEMY_DATABASE_URI'].encode()).hexdigest()[:12]
+            self.directory = os.path.join(app.instance_path, 'catalog', database)
+        self.ttl = app.config.get('CATALOG_SNAPSHOT_TTL', self.ttl)
+
+    def invalidate(self):
+        self._stale = True
+
+    @property
+    def current(self):
+        """The latest mapped snapshot, building it first when there is none
+
+        A stale or expired snapshot is returned as is and rebuilt in the
+        background.
+        """
+        snapshot = self._follow_pointer()
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._follow_pointer() or self._rebuild_shared(wait=True)
+        elif self._stale or time.time() - snapshot.built_at > self.ttl:
+            self._rebuild_in_background()
+        return snapshot
+
+    def refresh(self):
+        """Mark the snapshot stale and wait for a rebuilt version, returning it"""
+        self.invalidate()
+        with self._lock:
+            return self._rebuild_shared(wait=True)
+
+    def _rebuild_in_background(self):
+        with self._thread_lock:
+            # A thread started before a fork does not exist in the child
+            if self._rebuilding == os.getpid() or self.app is None:
+                return
+            self._rebuilding = os.getpid()
+        threading.Thread(target=self._run_rebuild, name='catalog-snapshot', daemon=True).start()
+
+    def _run_rebuild(self):
+        try:
+            with self.app.app_context():
+                self._rebuild_shared(wait=False)
+        except Exception:
+            # Retried by the next read; readers keep the previous version meanwhile
+            self._stale = True
+            logger.exception('Catalog snapshot rebuild failed, serving the previous version')
+        finally:
+            self._rebuilding = None
+
+    def _follow_pointer(self):
+        try:
+            stat = os.stat(os.path.join(self.directory, POINTER))
+        except FileNotFoundError:
+            return self._snapshot
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self._pointer_stat:
+            with open(os.path.join(self.directory, POINTER)) as f:
+                name = f.read().strip()
+            self._snapshot = CatalogSnapshot(os.path.join(self.directory, name))
+            self._pointer_stat = key
+        return self._snapshot
+
+    def _rebuild_shared(self, wait):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'catalog.lock'), 'a') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Another worker is rebuilding; keep serving the current version
+                    return None
+            try:
+                # The worker holding the lock before us may have just published
+                previous = self._follow_pointer()
+                if previous is not None and not self._stale and time.time() - previous.built_at <= self.ttl:
+                    return previous
+                return self.rebuild()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def rebuild(self):
+        """Build and publish a new snapshot version, returning it mapped"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._stale = False
+        built_at = time.time()
+        with db.engine.connect() as connection:
+            columns, vocabularies = build_columns(connection)
+        previous = self._follow_pointer()
+        version = previous.version + 1 if previous is not None else 1
+        name = f'catalog-{version:06d}.snap'
+
+        temporary = os.path.join(self.directory, f'.{name}.{os.getpid()}')
+        write_snapshot(temporary, columns, vocabularies, version, built_at)
+        os.replace(temporary, os.path.join(self.directory, name))
+        with open(temporary, 'w') as f:
+            f.write(name)
+        os.replace(temporary, os.path.join(self.directory, POINTER))
+
+        self._prune(keep={name, previous and os.path.basename(previous.path)})
+        return self._follow_pointer()
+
+    def _prune(self, keep):
+        for entry in os.listdir(self.directory):
+            if entry.startswith('catalog-') and entry.endswith('.snap') and entry not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, entry))
+                except OSError:
+                    # Still mapped on platforms that forbid removing open files
+                    pass
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'version': None}
+        return {'version': snapshot.version, 'jobs': snapshot.size, 'bytes': len(snapshot._map),
+                'age': round(time.time() - snapshot.built_at, 1), 'stale': self._stale}
+
+
+catalog_snapshot = CatalogStore()
+
+
+@on_commit(Job, JobSkill, Skill)
+def _invalidate_snapshot(changes):
+    for change in changes:
+        if change.model is Job and change.op == 'dirty' and not change.changed & SNAPSHOT_COLUMNS:
+            continue
+        if change.model is Skill and change.op != 'deleted':
+            continue
+        catalog_snapshot.invalidate()
+        return
@@ -0,0 +1,86 @@
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One row change: op is 'new', 'dirty' or 'deleted', values holds the column
+# values loaded at flush time, changed the column keys that moved and
+# previous their values before the change
+Change = namedtuple('Change', ['op', 'model', 'id', 'values', 'changed', 'previous'])
+
+_listeners = []
+_flush_listeners = []
+
+
+def on_commit(*models):
+    """Register a callback receiving the committed changes for the given models"""
+    def decorator(fn):
+        _listeners.append((models, fn))
+        return fn
+    return decorator
+
+
+def on_flush(*models):
+    """Register a callback(session, changes) run inside the flushing transaction
+
+    Use it for derived rows that must commit or roll back together with the
+    change, such as counters; the callback writes through session.connection().
+    """
+    def decorator(fn):
+        _flush_listeners.append((models, fn))
+        return fn
+    return decorator
+
+
+def notify(changes):
+    """Dispatch changes made outside the ORM unit of work (bulk statements)"""
+    for models, fn in _listeners:
+        relevant = [c for c in changes if c.model in models]
+        if relevant:
+            try:
+                fn(relevant)
+            except Exception:
+                logger.exception('Commit listener %s failed', fn.__name__)
+
+
+def _snapshot(op, obj):
+    state = inspect(obj)
+    columns = state.mapper.column_attrs
+    values = {attr.key: state.dict[attr.key] for attr in columns if attr.key in state.dict}
+    changed = set()
+    previous = {}
+    if op == 'dirty':
+        for attr in columns:
+            history = state.attrs[attr.key].history
+            if history.has_changes():
+                changed.add(attr.key)
+                previous[attr.key] = history.deleted[0] if history.deleted else None
+    return Change(op, type(obj), values.get('id'), values, changed, previous)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    flushed = []
+    for op, objs in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objs:
+            flushed.append(_snapshot(op, obj))
+    session.info.setdefault('pending_changes', []).extend(flushed)
+
+    for models, fn in _flush_listeners:
+        relevant = [c for c in flushed if c.model in models]
+        if relevant:
+            fn(session, relevant)
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    pending = session.info.pop('pending_changes', None)
+    if pending:
+        notify(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('pending_changes', None)
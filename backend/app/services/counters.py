@@ -0,0 +1,160 @@
+from app import db
+from sqlalchemy import bindparam, func, update
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Write-behind buffer for hot counters and timestamps
+
+    Increments are summed per (table, column, row id) and timestamps keep
+    the latest value, so a burst of page views costs one UPDATE per row at
+    flush time instead of one commit per request. A background thread
+    flushes every COUNTER_FLUSH_INTERVAL seconds, or sooner once
+    COUNTER_FLUSH_THRESHOLD rows are pending, and the buffer is flushed at
+    interpreter exit. A crash loses at most one interval of increments; a
+    failed flush is merged back and retried, and anything beyond
+    COUNTER_MAX_PENDING rows is dropped with a warning.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.interval = 5
+        self.threshold = 500
+        self.max_pending = 100000
+        self._deltas = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('COUNTER_FLUSH_INTERVAL', self.interval)
+        self.threshold = app.config.get('COUNTER_FLUSH_THRESHOLD', self.threshold)
+        self.max_pending = app.config.get('COUNTER_MAX_PENDING', self.max_pending)
+        atexit.register(self.shutdown)
+
+    def increment(self, model, column, row_id, amount=1):
+        key = (model.__table__, column)
+        with self._lock:
+            rows = self._deltas.setdefault(key, {})
+            rows[row_id] = rows.get(row_id, 0) + amount
+            size = self._size()
+        self._after_write(size)
+
+    def touch(self, model, column, row_id, value):
+        key = (model.__table__, column)
+        with self._lock:
+            rows = self._stamps.setdefault(key, {})
+            if rows.get(row_id) is None or rows[row_id] < value:
+                rows[row_id] = value
+            size = self._size()
+        self._after_write(size)
+
+    def pending_delta(self, model, column, row_id):
+        """Increment not yet written for a row, to overlay on the stored value"""
+        rows = self._deltas.get((model.__table__, column))
+        return rows.get(row_id, 0) if rows else 0
+
+    def pending_value(self, model, column, row_id):
+        """Timestamp not yet written for a row, or None"""
+        rows = self._stamps.get((model.__table__, column))
+        return rows.get(row_id) if rows else None
+
+    def _size(self):
+        return sum(len(rows) for rows in self._deltas.values()) + \
+            sum(len(rows) for rows in self._stamps.values())
+
+    def _after_write(self, size):
+        self._ensure_thread()
+        if size >= self.threshold:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._pid == os.getpid() or self.app is None:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='counter-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all pending increments and timestamps in batched UPDATEs"""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            stamps, self._stamps = self._stamps, {}
+        if not deltas and not stamps:
+            return
+
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self._write(deltas, stamps)
+            else:
+                self._write(deltas, stamps)
+        except Exception:
+            logger.exception('Counter flush failed, keeping increments for retry')
+            self._restore(deltas, stamps)
+
+    def _write(self, deltas, stamps):
+        with db.engine.begin() as connection:
+            for (table, column), rows in deltas.items():
+                target = table.c[column]
+                connection.execute(
+                    self._update(table).values({column: func.coalesce(target, 0) + bindparam('_delta')}),
+                    [{'_id': row_id, '_delta': delta} for row_id, delta in rows.items()]
+                )
+            for (table, column), rows in stamps.items():
+                connection.execute(
+                    self._update(table).values({column: bindparam('_value')}),
+                    [{'_id': row_id, '_value': value} for row_id, value in rows.items()]
+                )
+
+    def _update(self, table):
+        statement = update(table).where(table.c.id == bindparam('_id'))
+        if 'updated_at' in table.c:
+            # Counters are not edits, so keep onupdate from bumping updated_at
+            statement = statement.values(updated_at=table.c.updated_at)
+        return statement
+
+    def _restore(self, deltas, stamps):
+        with self._lock:
+            for key, rows in deltas.items():
+                current = self._deltas.setdefault(key, {})
+                for row_id, delta in rows.items():
+                    current[row_id] = current.get(row_id, 0) + delta
+            for key, rows in stamps.items():
+                current = self._stamps.setdefault(key, {})
+                for row_id, value in rows.items():
+                    if current.get(row_id) is None or current[row_id] < value:
+                        current[row_id] = value
+            overflow = self._size() - self.max_pending
+            if overflow > 0:
+                logger.warning('Counter buffer over capacity, dropping %d pending rows', overflow)
+                for buffer in (self._deltas, self._stamps):
+                    for rows in buffer.values():
+                        while rows and overflow > 0:
+                            rows.pop(next(iter(rows)))
+                            overflow -= 1
+
+    def shutdown(self):
+        self.flush()
+
+
+counters = CounterBuffer()
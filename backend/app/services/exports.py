@@ -0,0 +1,105 @@
+from app import db
+from app.models import Application, Job, User
+from datetime import date, datetime
+from sqlalchemy import select
+import csv
+import io
+import json
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Rows fetched from the cursor at a time, and bytes gathered before a chunk is sent
+FETCH_SIZE = 1000
+CHUNK_BYTES = 64 * 1024
+
+# Exported (name, column) pairs: the application, its job and its applicant
+EXPORT_COLUMNS = (
+    ('application_id', Application.id),
+    ('status', Application.status),
+    ('applied_at', Application.created_at),
+    ('updated_at', Application.updated_at),
+    ('is_viewed', Application.is_viewed),
+    ('viewed_at', Application.viewed_at),
+    ('is_favorite', Application.is_favorite),
+    ('ai_match_score', Application.ai_match_score),
+    ('employer_rating', Application.employer_rating),
+    ('resume_url', Application.resume_url),
+    ('job_id', Job.id),
+    ('job_title', Job.title),
+    ('job_status', Job.status),
+    ('job_city', Job.city),
+    ('applicant_id', User.id),
+    ('applicant_first_name', User.first_name),
+    ('applicant_last_name', User.last_name),
+    ('applicant_email', User.email),
+    ('applicant_phone', User.phone),
+    ('applicant_city', User.city),
+)
+EXPORT_FIELDS = tuple(name for name, _ in EXPORT_COLUMNS)
+
+
+def export_query(employer_id, job_id=None, status=None, since=None):
+    """One joined projection of an employer's applications in id order"""
+    query = select(*(column.label(name) for name, column in EXPORT_COLUMNS)).select_from(Application).join(
+        Job, Job.id == Application.job_id
+    ).join(
+        User, User.id == Application.applicant_id
+    ).where(Application.employer_id == employer_id)
+    if job_id is not None:
+        query = query.where(Application.job_id == job_id)
+    if status:
+        query = query.where(Application.status == status)
+    if since is not None:
+        query = query.where(Application.created_at >= since)
+    return query.order_by(Application.id)
+
+
+def stream_rows(query):
+    """Yield result rows through a server-side cursor, FETCH_SIZE at a time
+
+    Uses its own connection, so the export neither holds the request's
+    session nor keeps rows it has already passed on.
+    """
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(query)
+        for partition in result.partitions():
+            yield from partition
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(rows):
+    parts, size = [], 0
+    for row in rows:
+        line = json.dumps({name: _plain(value) for name, value in zip(EXPORT_FIELDS, row)},
+                          separators=(',', ':')) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_chunks(format, query):
+    """Encoded chunks of the export; memory stays flat however many rows match"""
+    rows = stream_rows(query)
+    return csv_chunks(rows) if format == 'csv' else ndjson_chunks(rows)
@@ -0,0 +1,136 @@
+from app.models import Job
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.listing import choices, filtered_query
+import numpy as np
+import threading
+
+# Listing filters that are also facets, in the order they are reported
+FACETS = ('job_type', 'work_mode', 'experience_level', 'industry', 'category', 'city')
+
+# Most frequent values returned per facet
+FACET_VALUE_LIMIT = 50
+
+
+def parse_facets(value):
+    """Facet names requested by `facets=a,b` (`all` for every one); raises ValueError for unknown names"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if names == ['all']:
+        return list(FACETS)
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValueError(f'Unknown facets: {", ".join(unknown)}; expected {", ".join(FACETS)}')
+    return names
+
+
+class FacetTable:
+    """Active public jobs as sorted ids plus one integer code array per facet
+
+    Each facet's distinct values form a small vocabulary and rows store an
+    index into it (-1 for no value), so a filter is a comparison over one
+    array and counting is a bincount.
+    """
+
+    def __init__(self, job_ids, codes, values, version=None):
+        self.version = version
+        self.job_ids = job_ids
+        self.codes = codes
+        self.values = values
+        self.size = len(job_ids)
+        # Alphabetical rank of each code, so equal counts are reported by value
+        self.ranks = {facet: np.argsort(np.argsort(np.array(vocabulary, dtype=object))) if vocabulary
+                      else np.zeros(0, dtype=np.int64) for facet, vocabulary in values.items()}
+
+    @classmethod
+    def load(cls, snapshot):
+        """Table over a catalog snapshot's columns, which share its encoding"""
+        return cls(snapshot['job_id'], {facet: snapshot[facet] for facet in FACETS},
+                   {facet: snapshot.vocabularies[facet] for facet in FACETS}, snapshot.version)
+
+    def mask(self, facet, value):
+        """Rows passing one listing filter, with the same semantics as listing.filtered_query"""
+        if facet == 'city':
+            # The listing matches cities by case-insensitive substring
+            needle = value.lower()
+            matching = [code for code, city in enumerate(self.values[facet]) if needle in city.lower()]
+            return np.isin(self.codes[facet], matching)
+        wanted = set(choices(value))
+        return np.isin(self.codes[facet], [code for code, item in enumerate(self.values[facet]) if item in wanted])
+
+    def rows_of(self, job_ids):
+        """Mask of the rows holding any of `job_ids`"""
+        ids = np.fromiter(job_ids, dtype=np.int64)
+        positions = np.searchsorted(self.job_ids, ids)
+        found = positions < self.size
+        found[found] &= self.job_ids[positions[found]] == ids[found]
+        rows = np.zeros(self.size, dtype=bool)
+        rows[positions[found]] = True
+        return rows
+
+    def counts(self, filters, facets, within=None):
+        """{facet: [(value, count), ...]} where each facet ignores its own filter
+
+        Every row gets the number of active facet filters it fails in one
+        pass. Rows failing none count for every facet, and rows failing
+        exactly one count only for the facet whose filter they fail.
+        """
+        scope = within if within is not None else np.ones(self.size, dtype=bool)
+        masks = {facet: self.mask(facet, filters[facet]) for facet in FACETS if filters.get(facet)}
+        failed = np.zeros(self.size, dtype=np.int8)
+        for mask in masks.values():
+            failed += ~mask
+        passing = scope & (failed == 0)
+        near_miss = scope & (failed == 1)
+
+        result = {}
+        for facet in facets:
+            rows = passing | (near_miss & ~masks[facet]) if facet in masks else passing
+            counts = np.bincount(self.codes[facet][rows] + 1, minlength=len(self.values[facet]) + 1)[1:]
+            top = np.flatnonzero(counts)
+            top = top[np.lexsort((self.ranks[facet][top], -counts[top]))][:FACET_VALUE_LIMIT]
+            result[facet] = [(self.values[facet][code], int(counts[code])) for code in top]
+        return result
+
+
+class FacetIndex:
+    """Process-wide FacetTable over the current shared catalog snapshot
+
+    The table is rebuilt whenever catalog_snapshot publishes a new version,
+    which also carries invalidation on catalog changes.
+    """
+
+    def __init__(self):
+        self._table = None
+        self._lock = threading.Lock()
+
+    @property
+    def table(self):
+        snapshot = catalog_snapshot.current
+        if self._table is None or self._table.version != snapshot.version:
+            with self._lock:
+                if self._table is None or self._table.version != snapshot.version:
+                    self._table = FacetTable.load(snapshot)
+        return self._table
+
+    def counts(self, filters, facets):
+        """Facet counts for a listing's filters, as {facet: [{'value', 'count'}, ...]}
+
+        Search, radius and skill filters are resolved to job ids by the
+        listing's own SQL and intersected with the table; the facet filters
+        are evaluated in memory. Raises ValueError like filtered_query.
+        """
+        table = self.table
+        within = None
+        if filters['search'] or filters['near'] or filters['skills']:
+            unfaceted = dict(filters, **{facet: '' for facet in FACETS})
+            # Keeps the relevance order: without it SQLite drives the join from
+            # jobs and probes the full-text table once per row
+            job_ids = filtered_query(unfaceted).with_entities(Job.id)
+            within = table.rows_of(job_id for job_id, in job_ids)
+        return {
+            facet: [{'value': value, 'count': count} for value, count in values]
+            for facet, values in table.counts(filters, facets, within).items()
+        }
+
+
+facet_index = FacetIndex()
+
@@ -0,0 +1,130 @@
+from app.models import Job, JobSkill, Skill, User
+from app.services.changes import on_commit
+from collections import OrderedDict
+from flask import Response
+import json
+import threading
+import time
+
+
+class RawJSON(str):
+    """Already-encoded JSON spliced verbatim by dumps()"""
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def dumps(value):
+    """Encode value as JSON, emitting RawJSON parts without re-encoding them"""
+    if isinstance(value, RawJSON):
+        return value
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{_encode(str(key))}:{dumps(item)}' for key, item in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(dumps(item) for item in value) + ']'
+    return _encode(value)
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+class JobFragments:
+    """Per-job cache of the encoded static part of Job.to_dict
+
+    Entries are keyed by job id and serialization shape and are valid while
+    the job's updated_at is unchanged; employer and skill edits, which do not
+    touch updated_at, evict the affected entries explicitly in the committing
+    worker and reach other workers once entries expire after the TTL. The
+    volatile fields are recomputed and appended to the cached prefix on
+    every render.
+    """
+
+    VOLATILE_FIELDS = ('is_open', 'days_since_posted', 'days_until_deadline', 'views', 'applications_count')
+
+    def __init__(self, app=None):
+        self.maxsize = 5000
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('JOB_FRAGMENT_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('JOB_FRAGMENT_CACHE_TTL', self.ttl)
+
+    def render(self, job, include_employer=True, include_skills=True):
+        """Return the job as RawJSON, equivalent to to_dict with the same flags"""
+        key = (job.id, include_employer, include_skills)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['updated_at'] == job.updated_at \
+                    and entry['expires_at'] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                prefix = entry['prefix']
+            else:
+                prefix = None
+                self.misses += 1
+
+        if prefix is None:
+            data = job.to_dict(include_employer=include_employer, include_skills=include_skills)
+            for field in self.VOLATILE_FIELDS:
+                data.pop(field)
+            prefix = dumps(data)[:-1]
+            entry = {
+                'updated_at': job.updated_at,
+                'expires_at': time.monotonic() + self.ttl,
+                'prefix': prefix,
+                'employer_id': job.employer_id,
+                'skill_ids': {js.skill_id for js in job.required_skills} if include_skills else set()
+            }
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        volatile = {
+            'is_open': job.is_open(),
+            'days_since_posted': job.days_since_posted(),
+            'days_until_deadline': job.days_until_deadline(),
+            'views': job.total_views(),
+            # Maintained without touching updated_at, so never part of the cached prefix
+            'applications_count': job.applications_count
+        }
+        separator = ',' if len(prefix) > 1 else ''
+        return RawJSON(prefix + separator + dumps(volatile)[1:])
+
+    def evict(self, predicate):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if predicate(key, entry)]:
+                del self._entries[key]
+
+    def stats(self):
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses}
+
+
+job_fragments = JobFragments()
+
+
+@on_commit(Job, JobSkill, Skill, User)
+def _evict_fragments(changes):
+    job_ids, employer_ids, skill_ids = set(), set(), set()
+    for change in changes:
+        if change.model is Job and change.op == 'deleted':
+            job_ids.add(change.id)
+        elif change.model is JobSkill:
+            job_ids.add(change.values.get('job_id'))
+        elif change.model is Skill:
+            skill_ids.add(change.id)
+        elif change.model is User:
+            employer_ids.add(change.id)
+    if job_ids or employer_ids or skill_ids:
+        job_fragments.evict(lambda key, entry: key[0] in job_ids
+                            or entry['employer_id'] in employer_ids
+                            or entry['skill_ids'] & skill_ids)
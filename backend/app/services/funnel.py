@@ -0,0 +1,322 @@
+from app import db
+from app.models import Application, ApplicationEvent, FunnelDuration, FunnelStage
+from app.services.changes import on_flush
+from bisect import bisect_left
+from datetime import datetime
+from sqlalchemy import and_, bindparam, case, cast, delete, exists, func, insert, literal, null, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Pipeline order stages are reported in; unknown statuses follow alphabetically
+STAGES = ('submitted', 'reviewed', 'shortlisted', 'interview', 'offered', 'hired', 'rejected', 'withdrawn')
+
+# Upper bounds in seconds of the time-in-stage histogram buckets
+DURATION_BUCKETS = (3600, 86400, 3 * 86400, 7 * 86400, 14 * 86400, 30 * 86400)
+
+SCOPES = (('job', 'job_id'), ('employer', 'employer_id'))
+
+BACKFILL_CHUNK = 5000
+
+
+def bucket_for(seconds):
+    return bisect_left(DURATION_BUCKETS, seconds)
+
+
+class _Deltas:
+    """Stage and duration changes of one flush or batch, keyed per scope"""
+
+    def __init__(self):
+        self.stages = {}
+        self.durations = {}
+
+    def _stage(self, job_id, employer_id, stage, entered=0, exited=0, current=0, seconds=0):
+        for scope, scope_id in (('job', job_id), ('employer', employer_id)):
+            totals = self.stages.setdefault((scope, scope_id, stage), [0, 0, 0, 0])
+            totals[0] += entered
+            totals[1] += exited
+            totals[2] += current
+            totals[3] += seconds
+
+    def created(self, job_id, employer_id, status):
+        self._stage(job_id, employer_id, status, entered=1, current=1)
+
+    def removed(self, job_id, employer_id, status):
+        self._stage(job_id, employer_id, status, current=-1)
+
+    def moved(self, job_id, employer_id, from_status, to_status, duration_seconds, sign=1):
+        self._stage(job_id, employer_id, from_status, exited=sign, current=-sign,
+                    seconds=sign * (duration_seconds or 0))
+        self._stage(job_id, employer_id, to_status, entered=sign, current=sign)
+        if duration_seconds is not None:
+            for scope, scope_id in (('job', job_id), ('employer', employer_id)):
+                key = (scope, scope_id, from_status, bucket_for(duration_seconds))
+                self.durations[key] = self.durations.get(key, 0) + sign
+
+    def forgotten(self, job_id, employer_id, from_status, to_status, duration_seconds):
+        """Take back a deleted event's entries and exits; current moves with the application row"""
+        if from_status is None:
+            self._stage(job_id, employer_id, to_status, entered=-1)
+            return
+        self.moved(job_id, employer_id, from_status, to_status, duration_seconds, sign=-1)
+        self._stage(job_id, employer_id, from_status, current=-1)
+        self._stage(job_id, employer_id, to_status, current=1)
+
+
+def _existing(connection, model, keys):
+    """Primary keys of `keys` that already have a row, looked up per scope"""
+    conditions = []
+    for scope, _ in SCOPES:
+        scope_ids = {key[1] for key in keys if key[0] == scope}
+        if scope_ids:
+            conditions.append(and_(model.scope == scope, model.scope_id.in_(scope_ids)))
+    columns = [column for column in model.__table__.primary_key.columns]
+    return {tuple(row) for row in connection.execute(select(*columns).where(or_(*conditions)))} & set(keys)
+
+
+def _add(connection, model, rows, **values):
+    """Add each row's counter deltas, keyed by its primary key columns, creating missing rows
+
+    A missing row starts from its deltas floored at zero. PostgreSQL and
+    SQLite upsert, so two transactions first reaching a stage both count;
+    other dialects look existing rows up first.
+    """
+    keys = [column.name for column in model.__table__.primary_key.columns]
+    counters = [name for name in rows[0] if name not in keys]
+    created = [{**row, **{name: max(row[name], 0) for name in counters}, **values} for row in rows]
+    increments = {name: getattr(model, name) + bindparam(f'_{name}') for name in counters}
+
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(model)
+        connection.execute(
+            statement.on_conflict_do_update(index_elements=keys, set_={**increments, **values}),
+            [{**row, **{f'_{name}': delta[name] for name in counters}} for row, delta in zip(created, rows)]
+        )
+        return
+
+    existing = _existing(connection, model, [tuple(row[name] for name in keys) for row in rows])
+    if existing:
+        connection.execute(
+            update(model)
+            .where(*(getattr(model, name) == bindparam(f'_{name}') for name in keys))
+            .values(**increments, **values),
+            [{f'_{name}': value for name, value in row.items()} for row in rows
+             if tuple(row[name] for name in keys) in existing]
+        )
+    missing = [row for row, delta in zip(created, rows) if tuple(delta[name] for name in keys) not in existing]
+    if missing:
+        connection.execute(insert(model), missing)
+
+
+def apply(connection, deltas):
+    """Add a _Deltas to the stage and duration tables, creating missing rows"""
+    stages = [
+        {'scope': scope, 'scope_id': scope_id, 'stage': stage, 'entered': totals[0], 'exited': totals[1],
+         'current': totals[2], 'total_seconds': totals[3]}
+        for (scope, scope_id, stage), totals in deltas.stages.items() if any(totals)
+    ]
+    if stages:
+        _add(connection, FunnelStage, stages, updated_at=datetime.utcnow())
+    durations = [
+        {'scope': scope, 'scope_id': scope_id, 'stage': stage, 'bucket': bucket, 'count': count}
+        for (scope, scope_id, stage, bucket), count in deltas.durations.items() if count
+    ]
+    if durations:
+        _add(connection, FunnelDuration, durations)
+
+
+def _ordered(stages):
+    known = [stage for stage in STAGES if stage in stages]
+    return known + sorted(stage for stage in stages if stage not in STAGES)
+
+
+def report(scope, scope_id):
+    """Per-stage funnel of one job or employer, read from the maintained tables"""
+    stages = {row.stage: row for row in db.session.execute(
+        select(FunnelStage).where(FunnelStage.scope == scope, FunnelStage.scope_id == scope_id)
+    ).scalars()}
+    histograms = {}
+    for stage, bucket, count in db.session.execute(
+        select(FunnelDuration.stage, FunnelDuration.bucket, FunnelDuration.count)
+        .where(FunnelDuration.scope == scope, FunnelDuration.scope_id == scope_id)
+    ):
+        histograms.setdefault(stage, [0] * (len(DURATION_BUCKETS) + 1))[bucket] = count
+
+    first = stages['submitted'].entered if 'submitted' in stages else 0
+    result = []
+    for name in _ordered(stages):
+        row = stages[name]
+        counts = histograms.get(name, [0] * (len(DURATION_BUCKETS) + 1))
+        timed = sum(counts)
+        result.append({
+            'stage': name,
+            'entered': row.entered,
+            'exited': row.exited,
+            'current': row.current,
+            'conversion_rate': round(row.entered / first * 100, 1) if first else None,
+            'average_hours_in_stage': round(row.total_seconds / timed / 3600, 1) if timed else None,
+            'durations': [
+                {'le_hours': bound / 3600 if bound is not None else None, 'count': count}
+                for bound, count in zip(list(DURATION_BUCKETS) + [None], counts)
+            ]
+        })
+    return result
+
+
+def _empty_history():
+    return or_(Application.status_history.is_(None),
+               cast(Application.status_history, db.Text).in_(['[]', 'null']))
+
+
+def backfill_events(connection):
+    """Record events for applications that have none yet; returns how many applications were backfilled
+
+    The application itself becomes a submitted event at created_at. Rows
+    with a legacy status_history replay it with measured durations; rows
+    without one that moved past submitted get a single transition of
+    unknown duration.
+    """
+    has_events = exists().where(ApplicationEvent.application_id == Application.id)
+    backfilled = 0
+
+    # Legacy histories are replayed in Python; they are rare and small
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(Application.id, Application.job_id, Application.employer_id, Application.status,
+                   Application.status_history, Application.created_at)
+            .where(Application.id > last_id, ~has_events, ~_empty_history())
+            .order_by(Application.id).limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        events = []
+        for row in rows:
+            previous, entered_at = 'submitted', row.created_at
+            events.append({'application_id': row.id, 'job_id': row.job_id, 'employer_id': row.employer_id,
+                           'from_status': None, 'to_status': previous, 'changed_by_id': None, 'notes': None,
+                           'duration_seconds': None, 'created_at': entered_at})
+            for entry in row.status_history:
+                try:
+                    changed_at = datetime.fromisoformat(entry['changed_at'])
+                except (KeyError, TypeError, ValueError):
+                    changed_at = entered_at
+                events.append({
+                    'application_id': row.id, 'job_id': row.job_id, 'employer_id': row.employer_id,
+                    'from_status': previous, 'to_status': entry.get('status') or previous,
+                    'changed_by_id': entry.get('changed_by'), 'notes': entry.get('notes'),
+                    'duration_seconds': max(int((changed_at - entered_at).total_seconds()), 0),
+                    'created_at': changed_at
+                })
+                previous, entered_at = events[-1]['to_status'], changed_at
+        connection.execute(insert(ApplicationEvent), events)
+        backfilled += len(rows)
+
+    # Everything else in two set-based statements: the submission, then the
+    # jump to the current status for rows past submitted
+    backfilled += connection.execute(
+        insert(ApplicationEvent).from_select(
+            ['application_id', 'job_id', 'employer_id', 'from_status', 'to_status', 'created_at'],
+            select(Application.id, Application.job_id, Application.employer_id, null(), literal('submitted'),
+                   Application.created_at).where(~has_events)
+        )
+    ).rowcount
+    only_submitted = and_(
+        exists().where(ApplicationEvent.application_id == Application.id, ApplicationEvent.from_status.is_(None),
+                       ApplicationEvent.to_status == 'submitted'),
+        ~exists().where(ApplicationEvent.application_id == Application.id, ApplicationEvent.from_status.isnot(None))
+    )
+    connection.execute(
+        insert(ApplicationEvent).from_select(
+            ['application_id', 'job_id', 'employer_id', 'from_status', 'to_status', 'created_at'],
+            select(Application.id, Application.job_id, Application.employer_id, literal('submitted'),
+                   Application.status, func.coalesce(Application.status_changed_at, Application.updated_at,
+                                                     Application.created_at))
+            .where(Application.status != 'submitted', only_submitted)
+        )
+    )
+    return backfilled
+
+
+def rebuild(connection=None):
+    """Backfill missing events, then recompute every stage count and histogram from the log"""
+    def run(conn):
+        backfilled = backfill_events(conn)
+        conn.execute(delete(FunnelStage))
+        conn.execute(delete(FunnelDuration))
+
+        bucket = case(*((ApplicationEvent.duration_seconds <= bound, index)
+                        for index, bound in enumerate(DURATION_BUCKETS)), else_=len(DURATION_BUCKETS))
+        now = datetime.utcnow()
+        stages, durations = {}, []
+        for scope, column in SCOPES:
+            event_key = getattr(ApplicationEvent, column)
+            for scope_id, stage, count in conn.execute(
+                select(event_key, ApplicationEvent.to_status, func.count()).group_by(event_key, ApplicationEvent.to_status)
+            ):
+                stages.setdefault((scope, scope_id, stage), [0, 0, 0, 0])[0] = count
+            for scope_id, stage, count, seconds in conn.execute(
+                select(event_key, ApplicationEvent.from_status, func.count(),
+                       func.coalesce(func.sum(ApplicationEvent.duration_seconds), 0))
+                .where(ApplicationEvent.from_status.isnot(None))
+                .group_by(event_key, ApplicationEvent.from_status)
+            ):
+                totals = stages.setdefault((scope, scope_id, stage), [0, 0, 0, 0])
+                totals[1], totals[3] = count, int(seconds)
+            application_key = getattr(Application, column)
+            for scope_id, stage, count in conn.execute(
+                select(application_key, Application.status, func.count()).group_by(application_key, Application.status)
+            ):
+                stages.setdefault((scope, scope_id, stage), [0, 0, 0, 0])[2] = count
+            durations.extend(
+                {'scope': scope, 'scope_id': scope_id, 'stage': stage, 'bucket': index, 'count': count}
+                for scope_id, stage, index, count in conn.execute(
+                    select(event_key, ApplicationEvent.from_status, bucket, func.count())
+                    .where(ApplicationEvent.duration_seconds.isnot(None))
+                    .group_by(event_key, ApplicationEvent.from_status, bucket)
+                )
+            )
+        rows = [{'scope': scope, 'scope_id': scope_id, 'stage': stage, 'entered': totals[0], 'exited': totals[1],
+                 'current': totals[2], 'total_seconds': totals[3], 'updated_at': now}
+                for (scope, scope_id, stage), totals in stages.items()]
+        for start in range(0, len(rows), BACKFILL_CHUNK):
+            conn.execute(insert(FunnelStage), rows[start:start + BACKFILL_CHUNK])
+        for start in range(0, len(durations), BACKFILL_CHUNK):
+            conn.execute(insert(FunnelDuration), durations[start:start + BACKFILL_CHUNK])
+        return backfilled
+
+    if connection is not None:
+        return run(connection)
+    with db.engine.begin() as conn:
+        return run(conn)
+
+
+@on_flush(Application, ApplicationEvent)
+def _apply_funnel_changes(session, changes):
+    deltas = _Deltas()
+    submitted = []
+    for change in changes:
+        values = change.values
+        if change.model is Application:
+            if change.op == 'new':
+                status = values.get('status') or 'submitted'
+                deltas.created(values.get('job_id'), values.get('employer_id'), status)
+                submitted.append({'application_id': change.id, 'job_id': values.get('job_id'),
+                                  'employer_id': values.get('employer_id'), 'from_status': None,
+                                  'to_status': status, 'created_at': values.get('created_at') or datetime.utcnow()})
+            elif change.op == 'deleted':
+                deltas.removed(values.get('job_id'), values.get('employer_id'), values.get('status'))
+        elif change.model is ApplicationEvent and change.op == 'new':
+            if values.get('from_status') is None:
+                deltas.created(values.get('job_id'), values.get('employer_id'), values.get('to_status'))
+            else:
+                deltas.moved(values.get('job_id'), values.get('employer_id'), values.get('from_status'),
+                             values.get('to_status'), values.get('duration_seconds'))
+        elif change.model is ApplicationEvent and change.op == 'deleted':
+            # Only goes with deleting its application, whose history leaves the funnel with it
+            deltas.forgotten(values.get('job_id'), values.get('employer_id'), values.get('from_status'),
+                             values.get('to_status'), values.get('duration_seconds'))
+    connection = session.connection()
+    if submitted:
+        connection.execute(insert(ApplicationEvent), submitted)
+    apply(connection, deltas)
@@ -0,0 +1,175 @@
+from app import db
+from app.models import Job
+from sqlalchemy import and_, bindparam, event, inspect, or_, select, update
+from sqlalchemy.orm import Session
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Stored geohash length, about 1.2 x 0.6 km cells
+GEOHASH_PRECISION = 6
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+# Most prefix ranges a radius search turns into
+MAX_COVER_CELLS = 16
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point; nearby points share long prefixes"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a cell in degrees at a geohash precision"""
+    total = precision * 5
+    lng_bits = (total + 1) // 2
+    return 180.0 / 2 ** (total - lng_bits), 360.0 / 2 ** lng_bits
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells together cover the circle, or None when too many are needed
+
+    Walks the circle's bounding box at the finest precision that needs at
+    most MAX_COVER_CELLS cells, so each prefix is one index range scan.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    south, north = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if cos_lat <= 0:
+        return None
+    lng_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    if lng_delta >= 180:
+        return None
+    west, east = longitude - lng_delta, longitude + lng_delta
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * columns > MAX_COVER_CELLS:
+            continue
+        # Samples one cell apart hit every cell the box overlaps
+        latitudes = [min(south + i * height, north) for i in range(math.ceil((north - south) / height) + 1)]
+        longitudes = [min(west + i * width, east) for i in range(math.ceil((east - west) / width) + 1)]
+        return {encode(lat, (lng + 180) % 360 - 180, precision) for lat in latitudes for lng in longitudes}
+    return None
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance; accepts scalars or numpy arrays"""
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def parse_near(near, radius_km):
+    """Return (latitude, longitude, radius_km) from query parameters, raising ValueError if invalid"""
+    try:
+        latitude, longitude = (float(part) for part in near.split(','))
+        radius = float(radius_km) if radius_km else DEFAULT_RADIUS_KM
+    except ValueError:
+        raise ValueError('near must be "lat,lng" and radius_km a number')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('near is out of range')
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValueError(f'radius_km must be between 0 and {MAX_RADIUS_KM}')
+    return latitude, longitude, radius
+
+
+def apply_near(query, latitude, longitude, radius_km, within=()):
+    """Restrict a Job query to jobs within radius_km of a point
+
+    Each geohash prefix becomes an index range scan. The `within`
+    conditions are applied inside every range rather than beside them, so
+    the planner seeks an index that starts with them once per prefix
+    instead of scanning all rows they match. The equirectangular
+    distance test that follows is plain arithmetic, so it runs on any
+    database and is accurate to well under 1% at these radii.
+    """
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells:
+        query = query.filter(or_(*(
+            and_(*within, Job.geohash >= cell, Job.geohash < cell + '~') for cell in sorted(cells)
+        )))
+    else:
+        query = query.filter(*within, Job.geohash.isnot(None))
+
+    # Longitude wraps, so compare the shortest way around
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lat_km = (Job.latitude - latitude) * KM_PER_DEGREE
+    d_lng = Job.longitude - longitude
+    if abs(longitude) + radius_km / (KM_PER_DEGREE * cos_lat) > 180:
+        return query.filter(or_(*(
+            (lat_km * lat_km + ((d_lng + shift) * KM_PER_DEGREE * cos_lat) *
+             ((d_lng + shift) * KM_PER_DEGREE * cos_lat) <= radius_km * radius_km)
+            for shift in (-360, 0, 360)
+        )))
+    lng_km = d_lng * KM_PER_DEGREE * cos_lat
+    return query.filter(lat_km * lat_km + lng_km * lng_km <= radius_km * radius_km)
+
+
+def job_geohash(job):
+    if job.latitude is None or job.longitude is None:
+        return None
+    return encode(job.latitude, job.longitude)
+
+
+def backfill(batch_size=1000, recompute=False):
+    """Store geohash for located jobs in id-ordered batches; returns the number of jobs written"""
+    written = 0
+    last_id = 0
+    while True:
+        with db.engine.begin() as connection:
+            where = Job.id > last_id
+            if not recompute:
+                where = where & Job.geohash.is_(None) & Job.latitude.isnot(None) & Job.longitude.isnot(None)
+            rows = connection.execute(
+                select(Job.id, Job.latitude, Job.longitude).where(where).order_by(Job.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return written
+            connection.execute(
+                update(Job)
+                .where(Job.id == bindparam('_id'))
+                # Derived data, not an edit of the posting
+                .values(geohash=bindparam('_geohash'), updated_at=Job.updated_at),
+                [{'_id': row.id, '_geohash': job_geohash(row)} for row in rows]
+            )
+            written += len(rows)
+            last_id = rows[-1].id
+
+
+@event.listens_for(Session, 'before_flush')
+def _index_job_locations(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, Job):
+            obj.geohash = job_geohash(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Job):
+            state = inspect(obj)
+            if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+                obj.geohash = job_geohash(obj)
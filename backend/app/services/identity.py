@@ -0,0 +1,115 @@
+from app import db
+from app.models import User, UserSkill
+from app.services.cache import TTLCache
+from app.services.changes import on_commit, on_flush
+from app.services.matching import load_user_skills
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+# A detached User snapshot plus its (name, skill_id, proficiency_level) rows,
+# with the updated_at and is_active they were read at
+Identity = namedtuple('Identity', ['version', 'user', 'skills'])
+
+
+class IdentityCache:
+    """Short-lived per-worker cache of authenticated users and their skills
+
+    JWT routes load the current user and usually their skills on every
+    request. Entries hold a detached User that is merged into the request
+    session without SQL, so lazy relationships keep working. The version is
+    the user's updated_at and is_active, which live in the database and so
+    are shared by every worker: each hit re-reads them with one primary-key
+    lookup and reloads the entry when they moved. Skill changes bump the
+    user's updated_at for this, so another worker's edit, skill change or
+    deactivation is seen on the next request, not after IDENTITY_CACHE_TTL.
+    Only writes that bypass the ORM without touching updated_at go unseen
+    until the entry expires.
+    """
+
+    def __init__(self, app=None):
+        self.entries = TTLCache(maxsize=4096, ttl=30)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.entries = TTLCache(
+            maxsize=app.config.get('IDENTITY_CACHE_SIZE', self.entries.maxsize),
+            ttl=app.config.get('IDENTITY_CACHE_TTL', self.entries.ttl)
+        )
+
+    def load(self, user_id):
+        """Return (user, skill rows) for a JWT identity, or (None, []) if the user is gone"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None, []
+
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            version = db.session.execute(
+                select(User.updated_at, User.is_active).where(User.id == user_id)
+            ).first()
+            if version is None:
+                self.entries.pop(user_id)
+                return None, []
+            if tuple(version) == entry.version:
+                return db.session.merge(entry.user, load=False), entry.skills
+
+        if db.session.identity_map.get(db.session.identity_key(User, user_id)) is not None:
+            # Already part of this request's unit of work, do not detach it
+            return db.session.get(User, user_id), load_user_skills(user_id)
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None, []
+        skills = load_user_skills(user_id)
+        db.session.expunge(user)
+        self.entries.set(user_id, Identity((user.updated_at, user.is_active), user, skills))
+        return db.session.merge(user, load=False), skills
+
+    def load_skills(self, user):
+        """Populate user.skills with their Skill rows in one query"""
+        rows = UserSkill.query.options(joinedload(UserSkill.skill)).filter_by(user_id=user.id).all()
+        set_committed_value(user, 'skills', rows)
+        return rows
+
+    def invalidate(self, user_ids):
+        for user_id in user_ids:
+            self.entries.pop(user_id)
+
+    def stats(self):
+        return self.entries.stats()
+
+
+identity = IdentityCache()
+
+
+@on_flush(UserSkill)
+def _touch_skill_owners(session, changes):
+    # Skills are part of the cached identity, so their owners' version moves too
+    user_ids = set()
+    for change in changes:
+        user_ids.add(change.values.get('user_id'))
+        if 'user_id' in change.changed:
+            user_ids.add(change.previous['user_id'])
+    user_ids.discard(None)
+    if user_ids:
+        session.connection().execute(
+            update(User).where(User.id.in_(list(user_ids))).values(updated_at=datetime.utcnow())
+        )
+
+
+@on_commit(User, UserSkill)
+def _invalidate_identities(changes):
+    user_ids = set()
+    for change in changes:
+        if change.model is User:
+            user_ids.add(change.id)
+        else:
+            user_ids.add(change.values.get('user_id'))
+    user_ids.discard(None)
+    if user_ids:
+        identity.invalidate(user_ids)
@@ -0,0 +1,466 @@
+from app import db
+from app.models import Job, JobSkill, Skill
+from app.services import geo, skill_demand
+from app.services.changes import Change, notify
+from app.services.skill_stats import skill_stats
+from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+import csv
+import json
+
+FORMATS = ('jsonl', 'csv')
+
+JOB_STATUSES = ('draft', 'active', 'paused', 'closed', 'filled')
+JOB_VISIBILITIES = ('public', 'private')
+
+REQUIRED_FIELDS = ('external_id', 'title', 'description', 'job_type', 'experience_level',
+                   'industry', 'category', 'country')
+TEXT_FIELDS = REQUIRED_FIELDS[1:] + ('company_name', 'work_mode', 'city', 'state',
+                                     'salary_currency', 'salary_period')
+TEXT_LIMITS = {field: Job.__table__.c[field].type.length for field in TEXT_FIELDS
+               if getattr(Job.__table__.c[field].type, 'length', None)}
+BOOL_FIELDS = ('allows_remote', 'show_salary', 'urgent')
+LIST_FIELDS = ('benefits', 'responsibilities')
+
+# Job columns a feed row sets; a row is the whole posting, so omitted
+# optional fields take these defaults on update as well as on insert
+FEED_DEFAULTS = {
+    'title': None, 'description': None, 'company_name': None, 'job_type': None,
+    'work_mode': 'onsite', 'experience_level': None, 'industry': None, 'category': None,
+    'city': None, 'state': None, 'country': None, 'latitude': None, 'longitude': None,
+    'allows_remote': False, 'salary_min': None, 'salary_max': None,
+    'salary_currency': 'USD', 'salary_period': 'year', 'show_salary': True,
+    'benefits': [], 'responsibilities': [], 'requirements': {},
+    'application_deadline': None, 'number_of_openings': 1,
+    'status': 'active', 'visibility': 'public', 'urgent': False
+}
+FEED_COLUMNS = tuple(FEED_DEFAULTS)
+
+DEFAULT_SKILL_WEIGHT = 5
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+
+def read_rows(stream, format):
+    """Yield (row_number, row) from a JSONL or CSV text stream without reading it all
+
+    A JSONL line that does not parse yields the ValueError in place of the row.
+    """
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, {key.strip(): value for key, value in row.items() if key}
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f'Invalid JSON: {e}')
+            continue
+        yield number, row if isinstance(row, dict) else ValueError('Each line must be a JSON object')
+
+
+def _split(value):
+    """CSV cells hold lists as semicolon-separated items"""
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(';') if item.strip()]
+    return value
+
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    limit = TEXT_LIMITS.get(field)
+    if limit and len(value) > limit:
+        raise ValueError(f'{field} is longer than {limit} characters')
+    return value
+
+
+def _number(row, field, kind, low=None, high=None):
+    value = row.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a number')
+    if isinstance(value, bool) or (kind is int and isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{field} must be a whole number')
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise ValueError(f'{field} must be between {low} and {high}')
+    return number
+
+
+def _flag(row, field):
+    value = row.get(field)
+    if value is None or value == '' or isinstance(value, bool):
+        return None if value == '' else value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'{field} must be true or false')
+
+
+def _skills(row):
+    """Return [(name, weight, proficiency_level, required), ...] from `skills`
+
+    JSONL gives names or objects with name/weight/proficiency_level/required;
+    CSV gives "name" or "name:weight" items.
+    """
+    skills = []
+    for item in _split(row.get('skills')) or []:
+        if isinstance(item, str):
+            name, _, weight = item.partition(':')
+            item = {'name': name, 'weight': weight.strip() or None}
+        if not isinstance(item, dict) or not str(item.get('name') or '').strip():
+            raise ValueError('skills must be names or objects with a name')
+        skills.append((
+            str(item['name']).strip(),
+            _number(item, 'weight', int, 1, 10) or DEFAULT_SKILL_WEIGHT,
+            _number(item, 'proficiency_level', int, 1, 5),
+            True if item.get('required') is None else _flag(item, 'required')
+        ))
+    return skills
+
+
+def validate(row):
+    """Return (external_id, job values, skills) for a feed row, raising ValueError if invalid"""
+    values = dict(FEED_DEFAULTS)
+    for field in TEXT_FIELDS:
+        values[field] = _text(row, field)
+    external_id = str(row.get('external_id') or '').strip()
+    missing = [field for field in REQUIRED_FIELDS if not (external_id if field == 'external_id' else values[field])]
+    if missing:
+        raise ValueError(f'Missing required fields: {", ".join(missing)}')
+    if len(external_id) > Job.__table__.c.external_id.type.length:
+        raise ValueError('external_id is too long')
+    values['work_mode'] = values['work_mode'] or FEED_DEFAULTS['work_mode']
+    values['salary_currency'] = values['salary_currency'] or FEED_DEFAULTS['salary_currency']
+    values['salary_period'] = values['salary_period'] or FEED_DEFAULTS['salary_period']
+
+    values['latitude'] = _number(row, 'latitude', float, -90, 90)
+    values['longitude'] = _number(row, 'longitude', float, -180, 180)
+    if (values['latitude'] is None) != (values['longitude'] is None):
+        raise ValueError('latitude and longitude must be given together')
+
+    values['salary_min'] = _number(row, 'salary_min', int, 0)
+    values['salary_max'] = _number(row, 'salary_max', int, 0)
+    if values['salary_min'] is not None and values['salary_max'] is not None \
+            and values['salary_min'] > values['salary_max']:
+        raise ValueError('salary_min is greater than salary_max')
+    values['number_of_openings'] = _number(row, 'number_of_openings', int, 1) or 1
+
+    for field in BOOL_FIELDS:
+        flag = _flag(row, field)
+        values[field] = FEED_DEFAULTS[field] if flag is None else flag
+
+    for field in LIST_FIELDS:
+        items = _split(row.get(field)) or []
+        if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+            raise ValueError(f'{field} must be a list of strings')
+        values[field] = items
+
+    requirements = row.get('requirements') or {}
+    if isinstance(requirements, str):
+        try:
+            requirements = json.loads(requirements)
+        except ValueError:
+            raise ValueError('requirements must be a JSON object')
+    if not isinstance(requirements, dict):
+        raise ValueError('requirements must be a JSON object')
+    values['requirements'] = requirements
+
+    deadline = row.get('application_deadline')
+    if deadline:
+        try:
+            values['application_deadline'] = datetime.fromisoformat(str(deadline).strip())
+        except ValueError:
+            raise ValueError('application_deadline must be an ISO date')
+
+    values['status'] = (_text(row, 'status') or FEED_DEFAULTS['status']).lower()
+    if values['status'] not in JOB_STATUSES:
+        raise ValueError(f'status must be one of {", ".join(JOB_STATUSES)}')
+    values['visibility'] = (_text(row, 'visibility') or FEED_DEFAULTS['visibility']).lower()
+    if values['visibility'] not in JOB_VISIBILITIES:
+        raise ValueError(f'visibility must be one of {", ".join(JOB_VISIBILITIES)}')
+
+    return external_id, values, _skills(row)
+
+
+class SkillResolver:
+    """Maps skill names, display names and synonyms to ids from one catalog load
+
+    With create=True unknown names are inserted as new unverified skills;
+    otherwise they are reported as row errors.
+    """
+
+    def __init__(self, create=False):
+        self.create = create
+        self.ids = None
+
+    def load(self, connection):
+        self.ids = {}
+        rows = connection.execute(select(Skill.id, Skill.name, Skill.display_name, Skill.synonyms)).all()
+        # Canonical names win over another skill's synonym
+        for skill_id, name, display_name, synonyms in rows:
+            for synonym in synonyms or []:
+                self.ids.setdefault(str(synonym).strip().lower(), skill_id)
+        for skill_id, name, display_name, synonyms in rows:
+            self.ids[display_name.strip().lower()] = skill_id
+        for skill_id, name, display_name, synonyms in rows:
+            self.ids[name.strip().lower()] = skill_id
+
+    def unknown(self, names):
+        return [name for name in names if name.lower() not in self.ids]
+
+    def resolve(self, connection, names):
+        """Return {lowercased name: skill_id}, creating missing skills if allowed"""
+        if self.ids is None:
+            self.load(connection)
+        missing = {name.lower(): name for name in self.unknown(names)}
+        if missing and self.create:
+            now = datetime.utcnow()
+            created = connection.execute(
+                insert(Skill).returning(Skill.id, Skill.name, sort_by_parameter_order=True),
+                [{'name': key, 'display_name': name, 'category': 'other',
+                  'created_at': now, 'updated_at': now} for key, name in missing.items()]
+            ).all()
+            self.ids.update({name: skill_id for skill_id, name in created})
+        return {name.lower(): self.ids[name.lower()] for name in names if name.lower() in self.ids}
+
+
+class JobImporter:
+    """Upserts job feed rows for one employer, keyed by (employer_id, external_id)
+
+    Rows are validated one by one and written in batches: existing jobs are
+    read with one query per batch, new ones inserted and changed ones
+    updated with executemany statements, and skill links diffed so only
+    added, removed or re-weighted links are written. Rows whose values and
+    skills already match are counted as unchanged without a write. Skill
+    demand and counts are kept in step inside each batch's transaction and
+    commit listeners (search, caches, recommendations) are notified after
+    it commits. A bad row is reported and skipped; the rest of its batch
+    still goes in.
+    """
+
+    def __init__(self, employer, batch_size=500, create_skills=False, max_errors=100):
+        self.employer_id = employer.id
+        self.company_name = (employer.employer_profile or {}).get('company_name') or ''
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.skills = SkillResolver(create=create_skills)
+        self.seen = set()
+        self.summary = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0,
+                        'errors': [], 'errors_truncated': False}
+
+    def run(self, rows, max_rows=None):
+        """Import (row_number, row) pairs; stops reading after max_rows and returns the summary"""
+        batch = []
+        for count, (number, row) in enumerate(rows, start=1):
+            if max_rows is not None and count > max_rows:
+                self.summary['limit_reached'] = True
+                break
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                external_id, values, skills = validate(row)
+                if external_id in self.seen:
+                    raise ValueError('Duplicate external_id in this feed')
+                self.seen.add(external_id)
+                values['company_name'] = values['company_name'] or self.company_name
+            except ValueError as e:
+                raw_id = row.get('external_id') if isinstance(row, dict) else None
+                self._fail(number, raw_id, str(e))
+                continue
+            batch.append((number, external_id, values, skills))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        self.summary['errors'].sort(key=lambda error: error['row'])
+        return self.summary
+
+    def _fail(self, number, external_id, error):
+        self.summary['failed'] += 1
+        if len(self.summary['errors']) < self.max_errors:
+            self.summary['errors'].append({'row': number, 'external_id': external_id, 'error': error})
+        else:
+            self.summary['errors_truncated'] = True
+
+    def _flush(self, batch):
+        try:
+            with db.engine.begin() as connection:
+                changes, counts = self._write(connection, batch)
+        except SQLAlchemyError as e:
+            for number, external_id, _, _ in batch:
+                self._fail(number, external_id, f'Batch failed: {e.__class__.__name__}: {e}')
+            return
+        for key, count in counts.items():
+            self.summary[key] += count
+        notify(changes)
+
+    def _write(self, connection, batch):
+        now = datetime.utcnow()
+        feed_columns = [getattr(Job, column) for column in FEED_COLUMNS]
+        existing = {row.external_id: row for row in connection.execute(
+            select(Job.id, Job.external_id, Job.published_at, Job.closed_at, *feed_columns)
+            .where(Job.employer_id == self.employer_id,
+                   Job.external_id.in_([external_id for _, external_id, _, _ in batch]))
+        )}
+        current_links = {}
+        if existing:
+            for link in connection.execute(
+                select(JobSkill.id, JobSkill.job_id, JobSkill.skill_id, JobSkill.weight,
+                       JobSkill.proficiency_level, JobSkill.required)
+                .where(JobSkill.job_id.in_([row.id for row in existing.values()]))
+            ):
+                current_links.setdefault(link.job_id, {})[link.skill_id] = link
+
+        names = {name for _, _, _, skills in batch for name, _, _, _ in skills}
+        skill_ids = self.skills.resolve(connection, names)
+
+        inserts, updates, wanted_links = [], [], {}
+        changes, counts = [], {'created': 0, 'updated': 0, 'unchanged': 0}
+        for number, external_id, values, skills in batch:
+            unknown = self.skills.unknown(name for name, _, _, _ in skills)
+            if unknown:
+                self._fail(number, external_id, f'Unknown skills: {", ".join(sorted(unknown))}')
+                continue
+            links = {}
+            for name, weight, level, required in skills:
+                links.setdefault(skill_ids[name.lower()], (weight, level, required))
+
+            current = existing.get(external_id)
+            if current is None:
+                inserts.append((external_id, values, links))
+                continue
+            changed = {column for column in FEED_COLUMNS if getattr(current, column) != values[column]}
+            old_links = {skill_id: (link.weight, link.proficiency_level, link.required)
+                         for skill_id, link in current_links.get(current.id, {}).items()}
+            if not changed and old_links == links:
+                counts['unchanged'] += 1
+                continue
+            updates.append((current, values, changed))
+            wanted_links[current.id] = links
+
+        before = skill_demand.job_states(connection, [current.id for current, _, _ in updates])
+
+        if inserts:
+            connection.execute(
+                insert(Job),
+                [dict(values, employer_id=self.employer_id, external_id=external_id,
+                      geohash=self._geohash(values), created_at=now, updated_at=now,
+                      published_at=now if values['status'] == 'active' else None,
+                      closed_at=now if values['status'] == 'closed' else None)
+                 for external_id, values, _ in inserts]
+            )
+            # A plain executemany is far cheaper than RETURNING row by row; the feed key finds the ids
+            created = dict(connection.execute(
+                select(Job.external_id, Job.id).where(
+                    Job.employer_id == self.employer_id,
+                    Job.external_id.in_([external_id for external_id, _, _ in inserts])
+                )
+            ).all())
+            for external_id, values, links in inserts:
+                job_id = created[external_id]
+                wanted_links[job_id] = links
+                values = dict(values, id=job_id, employer_id=self.employer_id, external_id=external_id)
+                changes.append(Change('new', Job, job_id, values, set(), {}))
+            counts['created'] = len(created)
+
+        if updates:
+            params = []
+            for current, values, changed in updates:
+                published_at = current.published_at
+                if values['status'] == 'active' and published_at is None:
+                    published_at = now
+                closed_at = current.closed_at
+                if values['status'] == 'closed' and closed_at is None:
+                    closed_at = now
+                params.append(dict(
+                    {f'_{column}': values[column] for column in FEED_COLUMNS},
+                    _id=current.id, _geohash=self._geohash(values),
+                    _published_at=published_at, _closed_at=closed_at
+                ))
+                changed = changed | {'updated_at'}
+                if published_at != current.published_at:
+                    changed.add('published_at')
+                changes.append(Change('dirty', Job, current.id, dict(values, id=current.id), changed,
+                                      {column: getattr(current, column) for column in changed
+                                       if column in current._fields}))
+            connection.execute(
+                update(Job).where(Job.id == bindparam('_id')).values(
+                    {column: bindparam(f'_{column}') for column in FEED_COLUMNS},
+                ).values(
+                    geohash=bindparam('_geohash'), published_at=bindparam('_published_at'),
+                    closed_at=bindparam('_closed_at'), updated_at=now
+                ),
+                params
+            )
+            counts['updated'] = len(updates)
+
+        changes.extend(self._write_links(connection, current_links, wanted_links))
+        skill_demand.sync_jobs(connection, before, set(wanted_links))
+        return changes, counts
+
+    def _write_links(self, connection, current_links, wanted_links):
+        """Bring job skill links to the wanted {job_id: {skill_id: (weight, level, required)}}"""
+        added, removed, changed = [], [], []
+        for job_id, links in wanted_links.items():
+            current = current_links.get(job_id, {})
+            for skill_id, link in current.items():
+                if skill_id not in links:
+                    removed.append(link)
+                elif links[skill_id] != (link.weight, link.proficiency_level, link.required):
+                    changed.append((link, links[skill_id]))
+            for skill_id, (weight, level, required) in links.items():
+                if skill_id not in current:
+                    added.append({'job_id': job_id, 'skill_id': skill_id, 'weight': weight,
+                                  'proficiency_level': level, 'required': required})
+
+        if removed:
+            connection.execute(delete(JobSkill).where(JobSkill.id.in_([link.id for link in removed])))
+        if changed:
+            connection.execute(
+                update(JobSkill).where(JobSkill.id == bindparam('_id')).values(
+                    weight=bindparam('_weight'), proficiency_level=bindparam('_level'),
+                    required=bindparam('_required')
+                ),
+                [{'_id': link.id, '_weight': weight, '_level': level, '_required': required}
+                 for link, (weight, level, required) in changed]
+            )
+        if added:
+            connection.execute(insert(JobSkill), added)
+
+        job_deltas, demand = {}, {}
+        for values in added:
+            job_deltas[values['skill_id']] = job_deltas.get(values['skill_id'], 0) + 1
+            demand[values['skill_id']] = demand.get(values['skill_id'], 0) + 1
+        for link in removed:
+            job_deltas[link.skill_id] = job_deltas.get(link.skill_id, 0) - 1
+        skill_stats.apply(connection, job_deltas, {}, demand)
+
+        changes = [Change('new', JobSkill, None, values, set(), {}) for values in added]
+        changes += [Change('deleted', JobSkill, link.id, dict(link._mapping), set(), {}) for link in removed]
+        changes += [Change('dirty', JobSkill, link.id,
+                           {'id': link.id, 'job_id': link.job_id, 'skill_id': link.skill_id, 'weight': weight,
+                            'proficiency_level': level, 'required': required},
+                           {'weight', 'proficiency_level', 'required'}, {}) for link, (weight, level, required) in changed]
+        return changes
+
+    @staticmethod
+    def _geohash(values):
+        if values['latitude'] is None or values['longitude'] is None:
+            return None
+        return geo.encode(values['latitude'], values['longitude'])
@@ -0,0 +1,84 @@
+from app import db
+from app.models import Application, FunnelStage, Job
+from app.services.changes import on_flush
+from sqlalchemy import bindparam, case, func, select, update
+
+
+def apply(connection, deltas):
+    """Add {job_id: (applications, unread)} to the job counters"""
+    deltas = {job_id: delta for job_id, delta in deltas.items() if job_id is not None and any(delta)}
+    if not deltas:
+        return
+    connection.execute(
+        update(Job)
+        .where(Job.id == bindparam('_id'))
+        .values(
+            applications_count=func.coalesce(Job.applications_count, 0) + bindparam('_applications'),
+            unread_applications_count=func.coalesce(Job.unread_applications_count, 0) + bindparam('_unread'),
+            # Counters are not edits of the posting itself
+            updated_at=Job.updated_at
+        ),
+        [{'_id': job_id, '_applications': applications, '_unread': unread}
+         for job_id, (applications, unread) in deltas.items()]
+    )
+
+
+def status_counts(job_ids):
+    """{job_id: {status: applications currently in it}} from the maintained funnel stages"""
+    counts = {job_id: {} for job_id in job_ids}
+    if job_ids:
+        for job_id, stage, current in db.session.execute(
+            select(FunnelStage.scope_id, FunnelStage.stage, FunnelStage.current)
+            .where(FunnelStage.scope == 'job', FunnelStage.scope_id.in_(job_ids), FunnelStage.current > 0)
+        ):
+            counts[job_id][stage] = current
+    return counts
+
+
+def reconcile():
+    """Recompute every job's application and unread counts in bulk; returns repaired job count"""
+    with db.engine.begin() as connection:
+        actual = {
+            job_id: (applications, int(unread or 0))
+            for job_id, applications, unread in connection.execute(
+                select(Application.job_id, func.count(Application.id),
+                       func.sum(case((Application.is_viewed.is_(True), 0), else_=1)))
+                .group_by(Application.job_id)
+            )
+        }
+        repairs = [
+            {'_id': job_id, '_applications': actual.get(job_id, (0, 0))[0], '_unread': actual.get(job_id, (0, 0))[1]}
+            for job_id, applications, unread in connection.execute(
+                select(Job.id, Job.applications_count, Job.unread_applications_count)
+            )
+            if (applications, unread) != actual.get(job_id, (0, 0))
+        ]
+        if repairs:
+            connection.execute(
+                update(Job)
+                .where(Job.id == bindparam('_id'))
+                .values(applications_count=bindparam('_applications'), unread_applications_count=bindparam('_unread'),
+                        updated_at=Job.updated_at),
+                repairs
+            )
+    return len(repairs)
+
+
+@on_flush(Application)
+def _apply_application_counts(session, changes):
+    deltas = {}
+
+    def add(job_id, applications, unread):
+        total = deltas.get(job_id, (0, 0))
+        deltas[job_id] = (total[0] + applications, total[1] + unread)
+
+    for change in changes:
+        job_id = change.values.get('job_id')
+        unread = 0 if change.values.get('is_viewed') else 1
+        if change.op == 'new':
+            add(job_id, 1, unread)
+        elif change.op == 'deleted':
+            add(job_id, -1, -unread)
+        elif 'is_viewed' in change.changed:
+            add(job_id, 0, unread - (0 if change.previous.get('is_viewed') else 1))
+    apply(session.connection(), deltas)
@@ -0,0 +1,152 @@
+from app.models import Job, JobSkill
+from app.services.cache import TTLCache
+from app.services import geo
+from app.services.changes import on_commit
+from app.services.search import job_search
+from datetime import datetime
+from sqlalchemy import and_, false, or_, select
+import base64
+import binascii
+import json
+
+FILTER_PARAMS = (
+    'search', 'job_type', 'work_mode', 'experience_level', 'industry', 'category', 'city', 'near', 'radius_km',
+    'skills', 'skill_match'
+)
+
+# Exact-match filters; a comma-separated value matches any of its parts
+CHOICE_FILTERS = ('job_type', 'work_mode', 'experience_level', 'industry', 'category')
+
+# Job columns that decide which jobs a listing matches and in what order
+LISTING_COLUMNS = {
+    'status', 'visibility', 'job_type', 'work_mode', 'experience_level', 'industry', 'category', 'city',
+    'latitude', 'longitude', 'featured', 'published_at', 'title', 'company_name', 'description'
+}
+
+job_totals = TTLCache(maxsize=1024, ttl=60)
+
+
+def init_app(app):
+    job_totals.ttl = app.config.get('JOB_TOTAL_CACHE_TTL', job_totals.ttl)
+
+
+def parse_filters(args):
+    """Normalize listing filters so equivalent query strings share cache entries"""
+    return {name: args.get(name, '').strip() for name in FILTER_PARAMS}
+
+
+def choices(value):
+    """The alternatives of a choice filter value"""
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def parse_skills(filters):
+    """Return (skill ids, match all) from the skills filters; raises ValueError when malformed"""
+    try:
+        skill_ids = sorted({int(part) for part in choices(filters['skills'])})
+    except ValueError:
+        raise ValueError('skills must be comma-separated skill ids')
+    if filters['skill_match'] not in ('', 'all', 'any'):
+        raise ValueError('skill_match must be all or any')
+    return skill_ids, filters['skill_match'] != 'any'
+
+
+def filtered_query(filters):
+    """Build the active public job query for a set of listing filters
+
+    Raises ValueError for a malformed near/radius_km or skills filter.
+    """
+    active = (Job.status == 'active', Job.visibility == 'public')
+    if filters['near']:
+        latitude, longitude, radius_km = geo.parse_near(filters['near'], filters['radius_km'])
+        query = geo.apply_near(Job.query, latitude, longitude, radius_km, within=active)
+    else:
+        query = Job.query.filter(*active)
+
+    if filters['search']:
+        # Full-text match, ordered by relevance ahead of the default order
+        query = job_search.apply(query, filters['search'])
+
+    for name in CHOICE_FILTERS:
+        if filters[name]:
+            query = query.filter(getattr(Job, name).in_(choices(filters[name])))
+
+    if filters['city']:
+        query = query.filter(Job.city.ilike(f"%{filters['city']}%"))
+
+    skill_ids, match_all = parse_skills(filters)
+    if skill_ids and match_all:
+        for skill_id in skill_ids:
+            query = query.filter(Job.id.in_(select(JobSkill.job_id).where(JobSkill.skill_id == skill_id)))
+    elif skill_ids:
+        query = query.filter(Job.id.in_(select(JobSkill.job_id).where(JobSkill.skill_id.in_(skill_ids))))
+
+    return query
+
+
+def order_listing(query):
+    """Featured first, then newest, with id as a unique tiebreaker for keyset paging"""
+    return query.order_by(Job.featured.desc(), Job.published_at.desc().nulls_last(), Job.id.desc())
+
+
+def encode_cursor(job):
+    key = [bool(job.featured), job.published_at.isoformat() if job.published_at else None, job.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (featured, published_at, id) from a cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        featured, published_at, job_id = json.loads(base64.urlsafe_b64decode(padded))
+        published_at = datetime.fromisoformat(published_at) if published_at else None
+        return bool(featured), published_at, int(job_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def after_cursor(query, cursor):
+    """Seek past the cursor row in (featured desc, published_at desc nulls last, id desc) order"""
+    featured, published_at, job_id = decode_cursor(cursor)
+    featured_after = Job.featured.is_(False) if featured else false()
+    if published_at is None:
+        published_after = false()
+        same_published = Job.published_at.is_(None)
+    else:
+        published_after = or_(Job.published_at < published_at, Job.published_at.is_(None))
+        same_published = Job.published_at == published_at
+    return query.filter(or_(
+        featured_after,
+        and_(Job.featured == featured, published_after),
+        and_(Job.featured == featured, same_published, Job.id < job_id)
+    ))
+
+
+def load_page(job_ids):
+    """Jobs with the given ids in that order, relationships batch-loaded for to_dict"""
+    if not job_ids:
+        return []
+    # Ids can come from an index that lags other workers' writes, so closed
+    # or hidden jobs are dropped here rather than shown
+    jobs = {job.id: job for job in Job.query.options(*Job.load_options()).filter(
+        Job.id.in_(job_ids), Job.status == 'active', Job.visibility == 'public'
+    )}
+    return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+def cached_total(filters, query):
+    """Count of jobs matching `filters`, served from a short-lived cache"""
+    key = tuple(sorted(filters.items()))
+    total = job_totals.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        job_totals.set(key, total)
+    return total
+
+
+@on_commit(Job)
+def _invalidate_totals(changes):
+    for change in changes:
+        if change.op != 'dirty' or change.changed & LISTING_COLUMNS:
+            job_totals.clear()
+            return
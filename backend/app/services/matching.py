@@ -0,0 +1,331 @@
+from collections import namedtuple
+from app import db
+from app.models import Skill, User, UserSkill
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.geo import haversine_km
+import numpy as np
+import threading
+
+# Score components, kept identical to the original per-job scorer
+EXPERIENCE_POINTS = 30
+SKILL_POINTS = 50
+LOCATION_POINTS = 10
+REMOTE_POINTS = 10
+MAX_SCORE = 100
+
+DEFAULT_SKILL_WEIGHT = 5
+
+# Location points halve every this many km between user and job coordinates;
+# without coordinates on both sides an exact city match earns full points
+LOCATION_HALF_DISTANCE_KM = 25
+
+# Job columns whose change moves a job's score or its membership in the catalog
+MATCH_COLUMNS = {
+    'status', 'visibility', 'experience_level', 'city', 'latitude', 'longitude', 'allows_remote', 'work_mode'
+}
+
+MatchProfile = namedtuple('MatchProfile', ['skill_levels', 'experience_levels', 'city', 'latitude', 'longitude'])
+
+
+def get_experience_levels(user_experience):
+    """Map years of experience to the job experience levels that fit them"""
+    if user_experience < 2:
+        return ['entry', 'junior']
+    elif user_experience < 5:
+        return ['junior', 'mid']
+    elif user_experience < 8:
+        return ['mid', 'senior']
+    return ['senior', 'lead']
+
+
+def get_user_experience(user):
+    if user.job_seeker_profile and 'experience' in user.job_seeker_profile:
+        return user.job_seeker_profile.get('experience', 0)
+    return 0
+
+
+def load_user_skills(user_id):
+    """Return (name, skill_id, proficiency_level) rows for a user in one query"""
+    return db.session.query(Skill.name, UserSkill.skill_id, UserSkill.proficiency_level).join(
+        Skill, Skill.id == UserSkill.skill_id
+    ).filter(UserSkill.user_id == user_id).all()
+
+
+def load_profiles(connection, user_ids, skill_ids=None):
+    """Build {user_id: MatchProfile} with Core queries on an explicit connection
+
+    `user_ids` may be a list or a select of ids; `skill_ids` restricts the
+    loaded skills when only one job's skills matter.
+    """
+    users = connection.execute(
+        db.select(User.id, User.city, User.latitude, User.longitude, User.job_seeker_profile)
+        .where(User.id.in_(user_ids))
+    ).all()
+    skills = db.select(UserSkill.user_id, UserSkill.skill_id, UserSkill.proficiency_level).join(
+        Skill, Skill.id == UserSkill.skill_id
+    ).where(UserSkill.user_id.in_(user_ids))
+    if skill_ids is not None:
+        skills = skills.where(UserSkill.skill_id.in_(skill_ids))
+    skill_levels = {}
+    for user_id, skill_id, level in connection.execute(skills):
+        skill_levels.setdefault(user_id, {})[skill_id] = level
+    return {
+        user.id: MatchProfile(
+            skill_levels=skill_levels.get(user.id, {}),
+            experience_levels=get_experience_levels(get_user_experience(user)),
+            city=user.city.lower() if user.city else None,
+            latitude=user.latitude,
+            longitude=user.longitude
+        )
+        for user in users
+    }
+
+
+def build_profile(user, user_skills=None):
+    if user_skills is None:
+        user_skills = load_user_skills(user.id)
+    return MatchProfile(
+        skill_levels={skill_id: level for _, skill_id, level in user_skills},
+        experience_levels=get_experience_levels(get_user_experience(user)),
+        city=user.city.lower() if user.city else None,
+        latitude=user.latitude,
+        longitude=user.longitude
+    )
+
+
+def _skill_weight(weight):
+    return max(weight, 0) if weight is not None else DEFAULT_SKILL_WEIGHT
+
+
+def _skill_level(level):
+    return level if level else np.nan
+
+
+def _skill_ratio(matched_weights, total_weights, matched_counts, skill_counts):
+    """Weighted share of required skills matched; all-zero-weight jobs fall back to a count ratio"""
+    weighted = total_weights > 0
+    ratio = np.zeros(len(total_weights))
+    np.divide(matched_weights, total_weights, out=ratio, where=weighted)
+    unweighted = ~weighted & (skill_counts > 0)
+    np.divide(matched_counts, skill_counts, out=ratio, where=unweighted)
+    return ratio
+
+
+def _credit(user_levels, required_levels):
+    """Full credit for a held skill, scaled down when below the required proficiency"""
+    credit = np.minimum(user_levels / required_levels, 1.0)
+    return np.where(np.isnan(credit), 1.0, credit)
+
+
+def _location_points(distance_km):
+    """Distance-decayed location points; NaN distances (unknown coordinates) earn none"""
+    points = np.floor(LOCATION_POINTS * 0.5 ** (distance_km / LOCATION_HALF_DISTANCE_KM))
+    return np.where(np.isnan(points), 0, points).astype(np.int64)
+
+
+def _coordinate(value):
+    return value if value is not None else np.nan
+
+
+def score_components(job, job_skills, profiles):
+    """Points each component gives one job against many MatchProfiles, as {component: int array}
+
+    The same components as CatalogMatrix.score. `job` needs
+    experience_level, city, latitude, longitude, allows_remote and
+    work_mode; `job_skills` holds (skill_id, weight, proficiency_level)
+    rows.
+    """
+    size = len(profiles)
+    components = {}
+
+    # Experience level match
+    components['experience'] = np.array(
+        [job.experience_level in p.experience_levels for p in profiles], dtype=bool
+    ) * EXPERIENCE_POINTS
+
+    # Skills match
+    components['skills'] = np.zeros(size, dtype=np.int64)
+    if job_skills:
+        weights = np.array([_skill_weight(weight) for _, weight, _ in job_skills], dtype=np.float64)
+        required_levels = np.array([_skill_level(level) for _, _, level in job_skills], dtype=np.float64)
+        held = np.zeros((size, len(job_skills)), dtype=bool)
+        user_levels = np.full((size, len(job_skills)), np.nan)
+        for row, profile in enumerate(profiles):
+            for column, (skill_id, _, _) in enumerate(job_skills):
+                if skill_id in profile.skill_levels:
+                    held[row, column] = True
+                    if profile.skill_levels[skill_id]:
+                        user_levels[row, column] = profile.skill_levels[skill_id]
+        credit = held * _credit(user_levels, required_levels)
+        ratio = _skill_ratio(
+            (credit * weights).sum(axis=1),
+            np.full(size, weights.sum()),
+            credit.sum(axis=1),
+            np.full(size, len(job_skills))
+        )
+        components['skills'] = (ratio * SKILL_POINTS).astype(np.int64)
+
+    # Location match: decayed by distance where both sides have coordinates,
+    # exact city otherwise
+    distances = haversine_km(
+        np.array([_coordinate(p.latitude) for p in profiles], dtype=np.float64),
+        np.array([_coordinate(p.longitude) for p in profiles], dtype=np.float64),
+        _coordinate(job.latitude),
+        _coordinate(job.longitude)
+    )
+    components['location'] = _location_points(distances)
+    if job.city:
+        city = job.city.lower()
+        components['location'] = components['location'] + (
+            np.isnan(distances) & np.array([p.city == city for p in profiles], dtype=bool)
+        ) * LOCATION_POINTS
+
+    # Remote work
+    remote = job.allows_remote or job.work_mode == 'remote'
+    components['remote'] = np.full(size, REMOTE_POINTS if remote else 0, dtype=np.int64)
+
+    return components
+
+
+def score_job(job, job_skills, profiles):
+    """Score one job against many MatchProfiles; the capped sum of score_components"""
+    return np.minimum(sum(score_components(job, job_skills, profiles).values()), MAX_SCORE)
+
+
+class CatalogMatrix:
+    """Scoring view over a mapped catalog snapshot
+
+    Jobs are rows ordered by id and required skills are the snapshot's CSR
+    lists, so a user can be scored against every job with a handful of
+    array ops. Only the per-job skill totals are computed here; everything
+    else is read from the shared mapping.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        self.size = snapshot.size
+        self.job_ids = snapshot['job_id']
+
+        self.experience_vocab = {
+            level: code for code, level in enumerate(snapshot.vocabularies['experience_level'])
+        }
+        # Profiles carry lower-cased cities, which may cover several stored spellings
+        self.city_vocab = {}
+        for code, city in enumerate(snapshot.vocabularies['city']):
+            self.city_vocab.setdefault(city.lower(), []).append(code)
+        work_modes = snapshot.vocabularies['work_mode']
+        self.remote_code = work_modes.index('remote') if 'remote' in work_modes else -2
+
+        self.skill_offsets = snapshot['skill_offsets']
+        self.skill_ids = snapshot['skill_ids']
+        self.skill_weights = snapshot['skill_weights']
+        self.skill_levels = snapshot['skill_levels']
+        self.skill_space = int(self.skill_ids.max()) + 1 if len(self.skill_ids) else 0
+
+        self.skill_counts = np.diff(self.skill_offsets)
+        self.total_weights = self.row_sums(self.skill_weights)
+
+    def row_sums(self, values):
+        """Sum a value per required skill into one total per job"""
+        if not self.size:
+            return np.zeros(0)
+        # The trailing zero keeps every offset a valid index, even past the last skill
+        sums = np.add.reduceat(np.append(values, 0.0), self.skill_offsets[:-1])
+        sums[self.skill_counts == 0] = 0
+        return sums
+
+    def score(self, profile):
+        """Score a MatchProfile against every job, returning an int array aligned with job_ids"""
+        scores = np.zeros(self.size, dtype=np.int64)
+
+        # Experience level match
+        codes = [self.experience_vocab[level] for level in profile.experience_levels
+                 if level in self.experience_vocab]
+        if codes:
+            scores += np.isin(self.snapshot['experience_level'], codes) * EXPERIENCE_POINTS
+
+        # Skills match, weighted by JobSkill.weight and scaled down where the
+        # user is below the required proficiency level
+        if len(self.skill_ids):
+            has_skill = np.zeros(self.skill_space, dtype=bool)
+            user_levels = np.full(self.skill_space, np.nan)
+            for skill_id, level in profile.skill_levels.items():
+                if skill_id < self.skill_space:
+                    has_skill[skill_id] = True
+                    if level:
+                        user_levels[skill_id] = level
+
+            credit = has_skill[self.skill_ids] * _credit(user_levels[self.skill_ids], self.skill_levels)
+            ratio = _skill_ratio(
+                self.row_sums(credit * self.skill_weights),
+                self.total_weights,
+                self.row_sums(credit),
+                self.skill_counts
+            )
+            scores += (ratio * SKILL_POINTS).astype(np.int64)
+
+        # Location match: decayed by distance where both sides have coordinates,
+        # exact city otherwise
+        distances = haversine_km(
+            _coordinate(profile.latitude), _coordinate(profile.longitude),
+            self.snapshot['latitude'], self.snapshot['longitude']
+        )
+        scores += _location_points(distances)
+        if profile.city and profile.city in self.city_vocab:
+            scores += (np.isnan(distances) & np.isin(self.snapshot['city'], self.city_vocab[profile.city])) \
+                * LOCATION_POINTS
+
+        # Remote work
+        scores += (self.snapshot['allows_remote'] | (self.snapshot['work_mode'] == self.remote_code)) \
+            * REMOTE_POINTS
+
+        return np.minimum(scores, MAX_SCORE)
+
+    def top(self, scores, k):
+        """Return the row indices of the k best positive scores, best first
+
+        Rows are ordered by job id, so a single integer key orders by score
+        descending then id ascending. argpartition selects the k winners in
+        linear time and only those k are sorted.
+        """
+        positive = np.flatnonzero(scores > 0)
+        if k <= 0 or not len(positive):
+            return positive[:0]
+        keys = (MAX_SCORE - scores[positive]) * self.size + positive
+        if k < len(positive):
+            winners = np.argpartition(keys, k - 1)[:k]
+            return positive[winners[np.argsort(keys[winners])]]
+        return positive[np.argsort(keys)]
+
+
+class JobMatchEngine:
+    """Process-wide CatalogMatrix over the current shared catalog snapshot
+
+    The matrix is rebuilt whenever catalog_snapshot publishes a new
+    version, which also carries invalidation on catalog changes.
+    """
+
+    def __init__(self):
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    @property
+    def matrix(self):
+        snapshot = catalog_snapshot.current
+        if self._matrix is None or self._matrix.version != snapshot.version:
+            with self._lock:
+                if self._matrix is None or self._matrix.version != snapshot.version:
+                    self._matrix = CatalogMatrix(snapshot)
+        return self._matrix
+
+    def top_matches(self, profile, limit=10, offset=0):
+        """Return ([(job_id, score), ...] for one page of the ranking, total positive matches)"""
+        matrix = self.matrix
+        scores = matrix.score(profile)
+        rows = matrix.top(scores, offset + limit)[offset:]
+        top = [(int(matrix.job_ids[row]), int(scores[row])) for row in rows]
+        return top, int(np.count_nonzero(scores > 0))
+
+
+match_engine = JobMatchEngine()
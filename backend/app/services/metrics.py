@@ -0,0 +1,192 @@
+from contextvars import ContextVar
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# A parenthesized run of bind placeholders, as expanded IN lists produce
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_PLACEHOLDER_LIST = re.compile(rf'\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)')
+
+# Statements of the request running in this thread or task
+_current = ContextVar('request_metrics', default=None)
+
+
+def statement_shape(statement):
+    """Statement text with IN lists collapsed, so only the parameters differ between repeats"""
+    return _PLACEHOLDER_LIST.sub('(...)', statement)
+
+
+class _RequestState:
+    __slots__ = ('started', 'statements', 'sql_seconds', 'shapes', 'pending')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.shapes = {}
+        self.pending = {}
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+
+class RequestMetrics:
+    """Per-endpoint request latency and SQL cost, exported in Prometheus text format
+
+    Flask request hooks time each request; engine cursor events count
+    the statements it issues and the time spent in them. A request that
+    runs one statement shape more than METRICS_N_PLUS_ONE_THRESHOLD times
+    is counted as a likely N+1 and its shape logged once per endpoint.
+    Nothing is hooked unless METRICS_ENABLED is set, so disabled metrics
+    cost nothing. Figures are per process: scrape each worker, or sum
+    across workers in the query.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.n_plus_one_threshold = 10
+        self._lock = threading.Lock()
+        self._latency = _Histogram(LATENCY_BUCKETS)
+        self._statements = _Histogram(STATEMENT_BUCKETS)
+        self._sql_seconds = {}
+        self._n_plus_one = {}
+        self._reported = set()
+        self._engine_hooked = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', self.enabled)
+        self.n_plus_one_threshold = app.config.get('METRICS_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        if not self.enabled:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._clear)
+        if not self._engine_hooked:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor)
+            self._engine_hooked = True
+
+    def _start(self):
+        _current.set(_RequestState())
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        state = _current.get()
+        if state is not None:
+            state.pending[id(cursor)] = time.perf_counter()
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        state = _current.get()
+        if state is None:
+            return
+        started = state.pending.pop(id(cursor), None)
+        if started is not None:
+            state.sql_seconds += time.perf_counter() - started
+        state.statements += 1
+        state.shapes[statement] = state.shapes.get(statement, 0) + 1
+
+    def _finish(self, response):
+        state = _current.get()
+        endpoint = request.endpoint or 'unmatched'
+        if state is None or endpoint == 'metrics':
+            return response
+        elapsed = time.perf_counter() - state.started
+
+        repeated = None
+        if state.statements > self.n_plus_one_threshold:
+            shapes = {}
+            for statement, count in state.shapes.items():
+                shape = statement_shape(statement)
+                shapes[shape] = shapes.get(shape, 0) + count
+            shape, count = max(shapes.items(), key=lambda item: item[1])
+            if count > self.n_plus_one_threshold:
+                repeated = (shape, count)
+
+        with self._lock:
+            self._latency.observe((endpoint, request.method, str(response.status_code)), elapsed)
+            self._statements.observe((endpoint,), state.statements)
+            self._sql_seconds[endpoint] = self._sql_seconds.get(endpoint, 0.0) + state.sql_seconds
+            if repeated:
+                self._n_plus_one[endpoint] = self._n_plus_one.get(endpoint, 0) + 1
+                first_report = (endpoint, repeated[0]) not in self._reported
+                if first_report:
+                    self._reported.add((endpoint, repeated[0]))
+        if repeated and first_report:
+            logger.warning('Possible N+1 in %s: statement ran %d times in one request: %s',
+                           endpoint, repeated[1], repeated[0][:300])
+        return response
+
+    def _clear(self, exc=None):
+        _current.set(None)
+
+    def render(self):
+        """All series in Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            self._render_histogram(lines, 'http_request_duration_seconds',
+                                   'Request latency by endpoint, method and status',
+                                   ('endpoint', 'method', 'status'), self._latency)
+            self._render_histogram(lines, 'db_statements_per_request', 'SQL statements issued per request',
+                                   ('endpoint',), self._statements)
+            self._render_counter(lines, 'db_statement_seconds_total', 'Time spent executing SQL',
+                                 self._sql_seconds)
+            self._render_counter(lines, 'db_n_plus_one_requests_total',
+                                 'Requests repeating one statement shape past the N+1 threshold',
+                                 self._n_plus_one)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(names, values, extra=''):
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}'
+
+    def _render_histogram(self, lines, name, help, label_names, histogram):
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, (counts, total, count) in sorted(histogram.series.items()):
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                bucket = self._labels(label_names, labels, 'le="%s"' % bound)
+                lines.append(f'{name}_bucket{bucket} {bucket_count}')
+            bucket = self._labels(label_names, labels, 'le="+Inf"')
+            lines.append(f'{name}_bucket{bucket} {count}')
+            lines.append(f'{name}_sum{self._labels(label_names, labels)} {total:.6f}')
+            lines.append(f'{name}_count{self._labels(label_names, labels)} {count}')
+
+    def _render_counter(self, lines, name, help, values):
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} counter')
+        for endpoint, value in sorted(values.items()):
+            lines.append(f'{name}{self._labels(("endpoint",), (endpoint,))} {value:g}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = RequestMetrics()
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import bcrypt
+import hmac
+import multiprocessing
+import os
+import threading
+
+# bcrypt only reads the first 72 bytes; longer inputs are cut as they always were
+MAX_PASSWORD_BYTES = 72
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when password work is shed because the pool queue is full or too slow"""
+
+
+def _encode(password):
+    return password.encode('utf-8')[:MAX_PASSWORD_BYTES]
+
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_password(password_hash, password):
+    password_hash = password_hash.encode('utf-8')
+    return hmac.compare_digest(bcrypt.hashpw(_encode(password), password_hash), password_hash)
+
+
+def hash_rounds(password_hash):
+    """Work factor a stored hash was created with, or None if it is not bcrypt"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt in a small per-worker process pool with load shedding
+
+    bcrypt is deliberately slow, so inline it pins a request thread for the
+    whole hash. Work goes to PASSWORD_POOL_SIZE processes instead, at most
+    PASSWORD_QUEUE_LIMIT more calls may wait behind them, and anything past
+    that, or not finished within PASSWORD_TIMEOUT seconds, raises
+    PasswordPoolBusy so the route can answer 503 at once. Pair it with
+    threaded gunicorn workers so other requests keep being served while a
+    login waits. A pool size of 0 hashes inline.
+    """
+
+    def __init__(self, app=None):
+        self.size = 2
+        self.queue_limit = 16
+        self.timeout = 5.0
+        self.rounds = 12
+        self.shed = 0
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.size + self.queue_limit)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.size = app.config.get('PASSWORD_POOL_SIZE', self.size)
+        self.queue_limit = app.config.get('PASSWORD_QUEUE_LIMIT', self.queue_limit)
+        self.timeout = app.config.get('PASSWORD_TIMEOUT', self.timeout)
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self._slots = threading.BoundedSemaphore(max(self.size, 1) + self.queue_limit)
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.rounds)
+
+    def check(self, password_hash, password):
+        return self._run(check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.shed += 1
+            raise PasswordPoolBusy('Password queue is full')
+        if self.size <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A timed-out hash keeps its process busy until it finishes, so its
+        # slot is only freed then; otherwise timeouts would let the backlog grow
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            self.shed += 1
+            raise PasswordPoolBusy('Password hashing timed out')
+
+    def _pool(self):
+        # Pools do not survive a fork, so each gunicorn worker starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Forked children only run bcrypt; spawn would re-import
+                    # unguarded entry scripts such as seed_jobs.py
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                    self._executor = ProcessPoolExecutor(max_workers=self.size, mp_context=context)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def stats(self):
+        return {'size': self.size, 'queue_limit': self.queue_limit, 'rounds': self.rounds, 'shed': self.shed}
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._pid = None
+
+
+passwords = PasswordHasher()
@@ -0,0 +1,75 @@
+from app import db
+from app.models import User, UserSkill
+from app.services.changes import on_flush
+from sqlalchemy import bindparam, exists, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+PROFILE_COMPLETION_COLUMNS = set(User.PROFILE_COMPLETION_COLUMNS)
+
+
+def _completion_rows(connection, where):
+    """Yield (user_id, completion) for the users matching `where`, from one query"""
+    has_skills = exists().where(UserSkill.user_id == User.id).correlate(User)
+    columns = [getattr(User, column) for column in User.PROFILE_COMPLETION_COLUMNS]
+    for row in connection.execute(select(User.id, has_skills.label('has_skills'), *columns).where(where)):
+        values = {column: row._mapping[column] for column in User.PROFILE_COMPLETION_COLUMNS}
+        yield row.id, User.compute_profile_completion(values, lambda: row.has_skills)
+
+
+def _store(connection, completions):
+    if completions:
+        connection.execute(
+            update(User)
+            .where(User.id == bindparam('_id'))
+            # Derived data, not a profile edit
+            .values(profile_completion=bindparam('_completion'), updated_at=User.updated_at),
+            [{'_id': user_id, '_completion': completion} for user_id, completion in completions.items()]
+        )
+
+
+def refresh(connection, user_ids):
+    """Recompute and store completion for the given users; returns {user_id: completion}"""
+    completions = dict(_completion_rows(connection, User.id.in_(list(user_ids))))
+    _store(connection, completions)
+    return completions
+
+
+def backfill(batch_size=1000, recompute=False):
+    """Populate profile_completion in id-ordered batches; returns the number of users written"""
+    written = 0
+    last_id = 0
+    while True:
+        with db.engine.begin() as connection:
+            where = User.id > last_id
+            if not recompute:
+                where = where & User.profile_completion.is_(None)
+            ids = connection.execute(
+                select(User.id).where(where).order_by(User.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return written
+            written += len(refresh(connection, ids))
+            last_id = ids[-1]
+
+
+@on_flush(User, UserSkill)
+def _refresh_completion(session, changes):
+    user_ids = set()
+    for change in changes:
+        if change.model is User:
+            if change.op == 'new' or change.changed & PROFILE_COMPLETION_COLUMNS:
+                user_ids.add(change.id)
+        else:
+            user_ids.add(change.values.get('user_id'))
+            if 'user_id' in change.changed:
+                user_ids.add(change.previous['user_id'])
+    user_ids.discard(None)
+    if not user_ids:
+        return
+
+    completions = refresh(session.connection(), user_ids)
+    # Keep loaded instances in step without marking them dirty
+    for user_id, completion in completions.items():
+        user = session.identity_map.get(session.identity_key(User, user_id))
+        if user is not None:
+            set_committed_value(user, 'profile_completion', completion)
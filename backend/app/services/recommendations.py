@@ -0,0 +1,316 @@
+from app import db
+from app.models import Job, JobSkill, Skill, User, UserSkill, JobRecommendation, RecommendationState
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.changes import on_commit
+from app.services.matching import MATCH_COLUMNS, load_profiles, match_engine, score_job
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+import atexit
+import logging
+import numpy as np
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# User columns that feed the match profile
+PROFILE_COLUMNS = {'city', 'latitude', 'longitude', 'job_seeker_profile'}
+
+# Jobs updated this long before a catalog snapshot was read are re-scored
+# from the database too, covering writes flushed before it and committed after
+CATCH_UP_MARGIN = timedelta(seconds=60)
+
+
+class RecommendationStore:
+    """Materialized per-user ranking of the best RECOMMENDATION_LIMIT matches
+
+    A full refresh scores the user against the whole catalog and stores the
+    top rows plus the positive-match total and the lowest stored score (the
+    floor). The catalog comes from the shared snapshot, which may predate
+    other workers' writes; jobs updated since it was read are scored from the
+    database instead. Between refreshes a job change is scored against every
+    materialized user and only that job's rows are inserted, updated or
+    deleted, so every job scoring above the floor stays stored. That fan-out
+    grows with the number of materialized users, so commits only queue the
+    job ids and a background thread per worker applies them; a profile or
+    skill change just marks the user's ranking stale for its next read.
+    Reads are an index range scan; a page reaching below the floor of an
+    incomplete ranking is scored live instead. Writes go through their own
+    connection so they can run outside the request.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.limit = 100
+        self.max_age = timedelta(days=1)
+        self.bulk_threshold = 50
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.drain)
+        self.limit = app.config.get('RECOMMENDATION_LIMIT', self.limit)
+        self.max_age = timedelta(seconds=app.config.get('RECOMMENDATION_MAX_AGE', self.max_age.total_seconds()))
+        self.bulk_threshold = app.config.get('RECOMMENDATION_BULK_THRESHOLD', self.bulk_threshold)
+
+    def page(self, user, profile, limit=10, offset=0):
+        """Return ([(job_id, score), ...], total) for one page of a user's ranking"""
+        try:
+            with db.engine.begin() as connection:
+                state = self._state(connection, user.id)
+                if state is None or state.stale or state.refreshed_at < datetime.utcnow() - self.max_age:
+                    state = self._refresh(connection, user.id, profile)
+
+                rows = connection.execute(
+                    select(JobRecommendation.job_id, JobRecommendation.score)
+                    .where(JobRecommendation.user_id == user.id)
+                    .order_by(JobRecommendation.score.desc(), JobRecommendation.job_id)
+                    .offset(offset).limit(limit)
+                ).all()
+        except IntegrityError:
+            # Another worker refreshed the same user concurrently
+            return match_engine.top_matches(profile, limit=limit, offset=offset)
+
+        complete = state.total <= state.stored
+        if not complete and (len(rows) < limit or any(score <= state.floor for _, score in rows)):
+            return match_engine.top_matches(profile, limit=limit, offset=offset)
+        return [(job_id, score) for job_id, score in rows], state.total
+
+    def _state(self, connection, user_id):
+        return connection.execute(
+            select(RecommendationState).where(RecommendationState.user_id == user_id)
+        ).first()
+
+    def _refresh(self, connection, user_id, profile):
+        matrix = match_engine.matrix
+        changed = self._changed_since(connection, matrix)
+        if len(changed) > self.bulk_threshold:
+            # Too many jobs to re-score one by one; rank from a fresh snapshot
+            catalog_snapshot.refresh()
+            matrix = match_engine.matrix
+            changed = self._changed_since(connection, matrix)
+
+        # The snapshot can be older than this worker's view of the catalog, so
+        # jobs written since it was read are scored from the database instead
+        scores = matrix.score(profile)
+        changed_ids = np.array([job.id for job in changed], dtype=np.int64)
+        rows = np.searchsorted(matrix.job_ids, changed_ids)
+        known = rows < matrix.size
+        known[known] &= matrix.job_ids[rows[known]] == changed_ids[known]
+        scores[rows[known]] = 0
+        live = self._score_jobs(connection, changed, profile)
+        ranked = [(int(matrix.job_ids[row]), int(scores[row])) for row in matrix.top(scores, self.limit)]
+        top = sorted(ranked + list(live.items()), key=lambda item: (-item[1], item[0]))[:self.limit]
+        total = int((scores > 0).sum()) + len(live)
+
+        connection.execute(delete(JobRecommendation).where(JobRecommendation.user_id == user_id))
+        if top:
+            connection.execute(
+                insert(JobRecommendation),
+                [{'user_id': user_id, 'job_id': job_id, 'score': score} for job_id, score in top]
+            )
+        connection.execute(delete(RecommendationState).where(RecommendationState.user_id == user_id))
+        connection.execute(insert(RecommendationState).values(
+            user_id=user_id,
+            total=total,
+            stored=len(top),
+            floor=top[-1][1] if top else 0,
+            stale=False,
+            refreshed_at=self._snapshot_time(matrix)
+        ))
+        return self._state(connection, user_id)
+
+    @staticmethod
+    def _snapshot_time(matrix):
+        return datetime.utcfromtimestamp(matrix.snapshot.built_at)
+
+    def _changed_since(self, connection, matrix):
+        """Jobs written since the matrix's snapshot was read, with the columns score_job needs"""
+        return connection.execute(
+            select(Job.id, Job.status, Job.visibility, Job.experience_level,
+                   Job.city, Job.latitude, Job.longitude, Job.allows_remote, Job.work_mode)
+            .where(Job.updated_at > self._snapshot_time(matrix) - CATCH_UP_MARGIN)
+        ).all()
+
+    def _score_jobs(self, connection, jobs, profile):
+        """{job_id: score} of the listed jobs that are open and match at all"""
+        jobs = [job for job in jobs if job.status == 'active' and job.visibility == 'public']
+        if not jobs:
+            return {}
+        job_skills = {}
+        for job_id, skill_id, weight, level in connection.execute(
+            select(JobSkill.job_id, JobSkill.skill_id, JobSkill.weight, JobSkill.proficiency_level)
+            .join(Skill, Skill.id == JobSkill.skill_id).where(JobSkill.job_id.in_([job.id for job in jobs]))
+        ):
+            job_skills.setdefault(job_id, []).append((skill_id, weight, level))
+        scores = {job.id: int(score_job(job, job_skills.get(job.id, []), [profile])[0]) for job in jobs}
+        return {job_id: score for job_id, score in scores.items() if score > 0}
+
+    def mark_stale(self, user_ids=None):
+        """Have every ranking, or the given users' rankings, fully re-scored on its next read"""
+        statement = update(RecommendationState).where(RecommendationState.stale.is_(False))
+        if user_ids is not None:
+            statement = statement.where(RecommendationState.user_id.in_(list(user_ids)))
+        with db.engine.begin() as connection:
+            connection.execute(statement.values(stale=True))
+
+    def enqueue(self, job_ids, new_job_ids=()):
+        """Queue changed jobs for the background thread to apply to every ranking"""
+        with self._lock:
+            for job_id in job_ids:
+                self._pending.setdefault(job_id, False)
+            for job_id in new_job_ids:
+                self._pending[job_id] = True
+        self._ensure_thread()
+        self._wake.set()
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._pid == os.getpid() or self.app is None:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='recommendation-refresh', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.drain()
+
+    def drain(self):
+        """Apply every queued job change to the materialized rankings"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        if self.app is not None:
+            with self.app.app_context():
+                self._apply(pending)
+        else:
+            self._apply(pending)
+
+    def _apply(self, pending):
+        try:
+            if len(pending) > self.bulk_threshold:
+                # One scan per job stops paying off for bulk imports; re-score lazily instead
+                self.mark_stale()
+                return
+            for job_id, is_new in pending.items():
+                self.refresh_job(job_id, is_new=is_new)
+        except Exception:
+            logger.exception('Applying %d job changes to rankings failed, marking them stale', len(pending))
+            try:
+                self.mark_stale()
+            except Exception:
+                logger.exception('Marking rankings stale failed')
+
+    def refresh_job(self, job_id, is_new=False):
+        """Apply one job's new scores to every materialized ranking"""
+        with db.engine.begin() as connection:
+            states = {row.user_id: row for row in connection.execute(
+                select(RecommendationState.user_id, RecommendationState.total,
+                       RecommendationState.stored, RecommendationState.floor)
+                .where(RecommendationState.stale.is_(False))
+            )}
+            if not states:
+                return
+
+            existing = dict(connection.execute(
+                select(JobRecommendation.user_id, JobRecommendation.score)
+                .where(JobRecommendation.job_id == job_id)
+            ).all())
+
+            job = connection.execute(
+                select(Job.id, Job.status, Job.visibility, Job.experience_level,
+                       Job.city, Job.latitude, Job.longitude, Job.allows_remote, Job.work_mode)
+                .where(Job.id == job_id)
+            ).first()
+            scores = {}
+            if job is not None and job.status == 'active' and job.visibility == 'public':
+                job_skills = connection.execute(
+                    select(JobSkill.skill_id, JobSkill.weight, JobSkill.proficiency_level)
+                    .join(Skill, Skill.id == JobSkill.skill_id).where(JobSkill.job_id == job_id)
+                ).all()
+                profiles = load_profiles(
+                    connection,
+                    select(RecommendationState.user_id).where(RecommendationState.stale.is_(False)),
+                    skill_ids=[skill_id for skill_id, _, _ in job_skills]
+                )
+                user_ids = list(profiles)
+                values = score_job(job, job_skills, [profiles[user_id] for user_id in user_ids])
+                scores = dict(zip(user_ids, values.tolist()))
+
+            inserts, updates, deletes, state_updates = [], [], [], []
+            for user_id, state in states.items():
+                score = scores.get(user_id, 0)
+                old = existing.get(user_id)
+                stored, total = state.stored, state.total
+                if old is not None and score <= 0:
+                    deletes.append({'_user_id': user_id})
+                    stored, total = stored - 1, total - 1
+                elif old is not None and score != old:
+                    updates.append({'_user_id': user_id, '_score': score})
+                elif old is None and score > 0:
+                    if stored < self.limit or score > state.floor:
+                        inserts.append({'user_id': user_id, 'job_id': job_id, 'score': score})
+                        stored += 1
+                    # Only a new job is known not to have been counted already
+                    if is_new:
+                        total += 1
+                if (stored, total) != (state.stored, state.total):
+                    state_updates.append({
+                        '_user_id': user_id, '_stored': stored, '_total': max(total, stored),
+                        '_stale': stored > 2 * self.limit
+                    })
+
+            match = (JobRecommendation.job_id == job_id) & (JobRecommendation.user_id == bindparam('_user_id'))
+            if deletes:
+                connection.execute(delete(JobRecommendation).where(match), deletes)
+            if updates:
+                connection.execute(update(JobRecommendation).where(match).values(score=bindparam('_score')), updates)
+            if inserts:
+                connection.execute(insert(JobRecommendation), inserts)
+            if state_updates:
+                connection.execute(
+                    update(RecommendationState)
+                    .where(RecommendationState.user_id == bindparam('_user_id'))
+                    .values(stored=bindparam('_stored'), total=bindparam('_total'), stale=bindparam('_stale')),
+                    state_updates
+                )
+
+
+recommendations = RecommendationStore()
+
+
+@on_commit(Job, JobSkill, UserSkill, User)
+def _refresh_recommendations(changes):
+    job_ids, new_job_ids, user_ids = set(), set(), set()
+    for change in changes:
+        if change.model is Job:
+            if change.op == 'new':
+                new_job_ids.add(change.id)
+            elif change.op == 'deleted' or change.changed & MATCH_COLUMNS:
+                job_ids.add(change.id)
+        elif change.model is JobSkill:
+            job_ids.add(change.values.get('job_id'))
+        elif change.model is UserSkill:
+            user_ids.add(change.values.get('user_id'))
+        elif change.model is User and change.op == 'dirty' and change.changed & PROFILE_COLUMNS:
+            user_ids.add(change.id)
+
+    # Skills added with a new job are part of its first scoring
+    job_ids -= new_job_ids
+    job_ids.discard(None)
+    if job_ids or new_job_ids:
+        recommendations.enqueue(job_ids, new_job_ids)
+    user_ids.discard(None)
+    if user_ids:
+        recommendations.mark_stale(user_ids)
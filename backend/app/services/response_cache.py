@@ -0,0 +1,150 @@
+from app.models import Job, JobSkill, Skill, User
+from app.services.changes import on_commit
+from app.services.fragments import dumps
+from app.services.listing import LISTING_COLUMNS, parse_filters
+from collections import OrderedDict
+from flask import Response
+import hashlib
+import threading
+import time
+
+# Parameters besides the filters that change the response
+PAGE_PARAMS = ('page', 'per_page', 'cursor', 'facets')
+
+
+class ResponseCache:
+    """LRU/TTL cache of encoded public listing responses with dependency tracking
+
+    Each entry remembers the job, employer and skill ids it serialized, so a
+    commit touching one of them evicts only the pages that contain it. Changes
+    that can move listing membership or order (a new job, a status change, a
+    retitle, any change to a job's required skills) clear every entry.
+    Entries in other workers expire after the TTL.
+    """
+
+    def __init__(self, app=None):
+        self.maxsize = 512
+        self.ttl = 30
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._dependents = {'job': {}, 'employer': {}, 'skill': {}}
+        self._lock = threading.RLock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('JOB_RESPONSE_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('JOB_RESPONSE_CACHE_TTL', self.ttl)
+
+    def key_for(self, args):
+        """Cache key from the filter and paging parameters, ignoring anything else"""
+        filters = parse_filters(args)
+        paging = tuple((name, args.get(name, '').strip()) for name in PAGE_PARAMS if name in args)
+        return tuple(sorted(filters.items())) + paging
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+
+    def store(self, key, payload, jobs):
+        """Encode payload once and cache it with the ids the serialized Job objects depend on"""
+        body = dumps(payload).encode()
+        entry = {
+            'body': body,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'expires_at': time.monotonic() + self.ttl,
+            'deps': {
+                'job': {job.id for job in jobs},
+                'employer': {job.employer_id for job in jobs},
+                'skill': {js.skill_id for job in jobs for js in job.required_skills}
+            }
+        }
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            for kind, ids in entry['deps'].items():
+                for dep_id in ids:
+                    self._dependents[kind].setdefault(dep_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def respond(self, entry, request):
+        """Build a response for an entry, answering 304 when the client's ETag matches"""
+        response = Response(entry['body'], mimetype='application/json')
+        response.set_etag(entry['etag'])
+        return response.make_conditional(request)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for kind, ids in entry['deps'].items():
+            dependents = self._dependents[kind]
+            for dep_id in ids:
+                keys = dependents.get(dep_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del dependents[dep_id]
+
+    def invalidate(self, kind, ids):
+        with self._lock:
+            for dep_id in ids:
+                for key in list(self._dependents[kind].get(dep_id, ())):
+                    self._discard(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            for dependents in self._dependents.values():
+                dependents.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+job_responses = ResponseCache()
+
+
+@on_commit(Job, JobSkill, Skill, User)
+def _invalidate_responses(changes):
+    job_ids, employer_ids, skill_ids = set(), set(), set()
+    for change in changes:
+        if change.model is Job:
+            if change.op != 'dirty' or change.changed & LISTING_COLUMNS:
+                job_responses.clear()
+                return
+            job_ids.add(change.id)
+        elif change.model is JobSkill:
+            # Skill filters match on these rows, so any listing may gain or lose the job
+            job_responses.clear()
+            return
+        elif change.model is Skill:
+            skill_ids.add(change.id)
+        elif change.model is User:
+            employer_ids.add(change.id)
+    job_responses.invalidate('job', job_ids)
+    job_responses.invalidate('employer', employer_ids)
+    job_responses.invalidate('skill', skill_ids)
@@ -0,0 +1,328 @@
+from app import db
+from app.models import Job
+from app.services.changes import on_commit
+from bisect import bisect_left
+from sqlalchemy import case, false, func, literal_column, text
+from sqlalchemy.exc import OperationalError
+import logging
+import math
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Relative weight of each searchable column when ranking
+FIELD_WEIGHTS = (('title', 10.0), ('company_name', 5.0), ('description', 1.0))
+SEARCH_COLUMNS = {name for name, _ in FIELD_WEIGHTS}
+
+MAX_TERMS = 8
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database objects a search backend relies on are not installed"""
+
+
+def tokenize(value):
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+
+def _load_rows(connection, job_ids=None):
+    query = db.select(Job.id, Job.title, Job.company_name, Job.description)
+    if job_ids is not None:
+        query = query.where(Job.id.in_(job_ids))
+    return connection.execute(query).all()
+
+
+class SqliteSearch:
+    """FTS5 table keyed by job id, ranked with column-weighted bm25
+
+    Triggers on jobs keep the table in sync with every insert, update and
+    delete, whichever process or statement makes them. A migration creates
+    the table and triggers; ensure() only checks they are installed, and
+    rebuild() (flask search-reindex) recreates and refills them.
+    """
+
+    name = 'fts5'
+
+    TRIGGERS = {
+        'jobs_fts_insert': (
+            "AFTER INSERT ON jobs BEGIN "
+            "INSERT INTO jobs_fts(rowid, title, company_name, description) "
+            "VALUES (new.id, new.title, new.company_name, new.description); END"
+        ),
+        'jobs_fts_update': (
+            "AFTER UPDATE OF title, company_name, description ON jobs BEGIN "
+            "DELETE FROM jobs_fts WHERE rowid = old.id; "
+            "INSERT INTO jobs_fts(rowid, title, company_name, description) "
+            "VALUES (new.id, new.title, new.company_name, new.description); END"
+        ),
+        'jobs_fts_delete': "AFTER DELETE ON jobs BEGIN DELETE FROM jobs_fts WHERE rowid = old.id; END",
+    }
+
+    def __init__(self):
+        self.ready = False
+
+    def ensure(self):
+        if self.ready:
+            return
+        with db.engine.connect() as connection:
+            installed = set(connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE name = 'jobs_fts' "
+                "OR (type = 'trigger' AND name LIKE 'jobs_fts_%')"
+            )).scalars())
+        missing = ({'jobs_fts'} | set(self.TRIGGERS)) - installed
+        if missing:
+            raise SearchUnavailable(f"{', '.join(sorted(missing))} missing; run flask db upgrade")
+        self.ready = True
+
+    def apply(self, query, terms):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for _, weight in FIELD_WEIGHTS)
+        fts = text(
+            f"SELECT rowid AS job_id, bm25(jobs_fts, {weights}) AS rank "
+            "FROM jobs_fts WHERE jobs_fts MATCH :match"
+        ).bindparams(match=match).columns(job_id=db.Integer, rank=db.Float).subquery('fts')
+        return query.join(fts, fts.c.job_id == Job.id).order_by(fts.c.rank)
+
+    def sync(self, job_ids):
+        pass
+
+    def rebuild(self):
+        with db.engine.begin() as connection:
+            for name in self.TRIGGERS:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            connection.execute(text("DROP TABLE IF EXISTS jobs_fts"))
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE jobs_fts USING fts5("
+                "title, company_name, description, tokenize='unicode61 remove_diacritics 2')"
+            ))
+            connection.execute(text(
+                "INSERT INTO jobs_fts(rowid, title, company_name, description) "
+                "SELECT id, title, company_name, description FROM jobs"
+            ))
+            for name, body in self.TRIGGERS.items():
+                connection.execute(text(f"CREATE TRIGGER {name} {body}"))
+        self.ready = True
+
+
+class PostgresSearch:
+    """Weighted tsvector expression served by a GIN index
+
+    The index is on the expression itself, so PostgreSQL keeps it in sync
+    with every insert and update without triggers or an extra column. A
+    migration builds it concurrently; ensure() only checks it exists.
+    """
+
+    name = 'tsvector'
+
+    def __init__(self):
+        self.ready = False
+        labels = {'title': 'A', 'company_name': 'B', 'description': 'D'}
+        # Kept as literal SQL so the query expression is textually identical
+        # to the indexed one and the planner can match them
+        self.vector_sql = ' || '.join(
+            f"setweight(to_tsvector('simple', coalesce({column}, '')), '{labels[column]}')"
+            for column, _ in FIELD_WEIGHTS
+        )
+        self.vector = literal_column(f'({self.vector_sql})')
+
+    def ensure(self):
+        if self.ready:
+            return
+        with db.engine.connect() as connection:
+            installed = connection.execute(text(
+                "SELECT 1 FROM pg_indexes WHERE tablename = 'jobs' AND indexname = 'ix_jobs_search_vector'"
+            )).first()
+        if installed is None:
+            raise SearchUnavailable('ix_jobs_search_vector missing; run flask db upgrade')
+        self.ready = True
+
+    def apply(self, query, terms):
+        tsquery = func.to_tsquery(literal_column("'simple'"), ' & '.join(f'{term}:*' for term in terms))
+        return query.filter(self.vector.op('@@')(tsquery)).order_by(
+            func.ts_rank(self.vector, tsquery).desc()
+        )
+
+    def sync(self, job_ids):
+        pass
+
+    def rebuild(self):
+        with db.engine.begin() as connection:
+            connection.execute(text('REINDEX INDEX ix_jobs_search_vector'))
+
+
+class InvertedIndex:
+    """In-process inverted index for databases without native full-text search
+
+    Postings map a token to {job_id: weighted term frequency}. Prefix terms
+    are expanded against a sorted vocabulary with bisect, and documents are
+    ranked by a tf-idf sum across all query terms (every term must match).
+    """
+
+    name = 'python'
+
+    def __init__(self, limit=1000):
+        self.limit = limit
+        self.ready = False
+        self.postings = {}
+        self.documents = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._lock = threading.RLock()
+
+    def ensure(self):
+        if self.ready:
+            return
+        with self._lock:
+            if not self.ready:
+                with db.engine.connect() as connection:
+                    for row in _load_rows(connection):
+                        self._add(row)
+                self.ready = True
+
+    def _add(self, row):
+        job_id = row[0]
+        frequencies = {}
+        for (_, weight), value in zip(FIELD_WEIGHTS, row[1:]):
+            for token in tokenize(value):
+                frequencies[token] = frequencies.get(token, 0) + weight
+        for token, frequency in frequencies.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                self._vocabulary_dirty = True
+            postings[job_id] = frequency
+        self.documents[job_id] = list(frequencies)
+
+    def _remove(self, job_id):
+        for token in self.documents.pop(job_id, ()):
+            postings = self.postings[token]
+            postings.pop(job_id, None)
+            if not postings:
+                del self.postings[token]
+                self._vocabulary_dirty = True
+
+    def _expand(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            yield self._vocabulary[position]
+            position += 1
+
+    def search(self, terms):
+        with self._lock:
+            total = len(self.documents) or 1
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token in self._expand(term):
+                    postings = self.postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    for job_id, frequency in postings.items():
+                        term_scores[job_id] = term_scores.get(job_id, 0) + (1 + math.log(frequency)) * idf
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {job_id: score + term_scores[job_id]
+                              for job_id, score in scores.items() if job_id in term_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [job_id for job_id, _ in ranked[:self.limit]]
+
+    def apply(self, query, terms):
+        job_ids = self.search(terms)
+        if not job_ids:
+            return query.filter(false())
+        positions = {job_id: position for position, job_id in enumerate(job_ids)}
+        return query.filter(Job.id.in_(job_ids)).order_by(case(positions, value=Job.id))
+
+    def sync(self, job_ids):
+        if not self.ready:
+            return
+        with db.engine.connect() as connection:
+            rows = _load_rows(connection, job_ids)
+        with self._lock:
+            for job_id in job_ids:
+                self._remove(job_id)
+            for row in rows:
+                self._add(row)
+
+    def rebuild(self):
+        with self._lock:
+            self.postings, self.documents = {}, {}
+            self._vocabulary_dirty = True
+            self.ready = False
+        self.ensure()
+
+
+class JobSearch:
+    """Relevance-ranked job search on the best backend the database offers
+
+    SQLite uses FTS5, PostgreSQL a GIN-indexed tsvector, and anything else
+    (or SQLite built without FTS5) an in-process inverted index. Only the
+    in-process index needs commits synced to it; the database keeps the
+    other two current on its own.
+    """
+
+    def __init__(self, app=None):
+        self.fallback_limit = 1000
+        self._backend = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.fallback_limit = app.config.get('SEARCH_FALLBACK_LIMIT', self.fallback_limit)
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._select_backend()
+        return self._backend
+
+    def _select_backend(self):
+        dialect = db.engine.dialect.name
+        candidates = []
+        if dialect == 'sqlite':
+            candidates.append(SqliteSearch())
+        elif dialect == 'postgresql':
+            candidates.append(PostgresSearch())
+        candidates.append(InvertedIndex(self.fallback_limit))
+        for backend in candidates:
+            try:
+                backend.ensure()
+                return backend
+            except (OperationalError, SearchUnavailable) as e:
+                logger.warning('Search backend %s unavailable, falling back: %s', backend.name, e)
+        return candidates[-1]
+
+    def apply(self, query, search):
+        """Restrict a Job query to matches for `search`, ordered by relevance"""
+        terms = tokenize(search)[:MAX_TERMS]
+        if not terms:
+            return query
+        return self.backend.apply(query, terms)
+
+    def sync(self, job_ids):
+        if self._backend is not None and job_ids:
+            self._backend.sync(job_ids)
+
+    def rebuild(self):
+        self.backend.rebuild()
+
+
+job_search = JobSearch()
+
+
+@on_commit(Job)
+def _sync_search_index(changes):
+    job_ids = {change.id for change in changes
+               if change.op != 'dirty' or change.changed & SEARCH_COLUMNS}
+    job_search.sync(job_ids)
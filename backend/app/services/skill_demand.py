@@ -0,0 +1,217 @@
+from app import db
+from app.models import Job, JobSkill, Skill, SkillDemand
+from app.services.changes import on_flush
+from datetime import datetime
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Job columns deciding whether a job counts towards demand
+ACTIVE_COLUMNS = ('status', 'visibility')
+
+
+def _is_active(status, visibility):
+    return status == 'active' and visibility == 'public'
+
+
+def job_states(connection, job_ids):
+    """Return {job_id: (active, {skill_id, ...})} as currently visible to the connection"""
+    if not job_ids:
+        return {}
+    states = {
+        job_id: (_is_active(status, visibility), set())
+        for job_id, status, visibility in connection.execute(
+            select(Job.id, Job.status, Job.visibility).where(Job.id.in_(job_ids))
+        )
+    }
+    for job_id, skill_id in connection.execute(
+        select(JobSkill.job_id, JobSkill.skill_id)
+        .join(Skill, Skill.id == JobSkill.skill_id)
+        .where(JobSkill.job_id.in_(job_ids))
+    ):
+        if job_id in states:
+            states[job_id][1].add(skill_id)
+    return states
+
+
+def apply_deltas(connection, deltas):
+    """Add {skill_id: delta} to the demand table, creating missing rows"""
+    deltas = {skill_id: delta for skill_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        # Gains are upserted so concurrent first postings of a skill both count;
+        # a missing row has nothing to take a loss from
+        gains = [{'skill_id': skill_id, 'active_jobs': delta, 'updated_at': now}
+                 for skill_id, delta in deltas.items() if delta > 0]
+        if gains:
+            statement = dialect.insert(SkillDemand)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=['skill_id'],
+                set_={'active_jobs': SkillDemand.active_jobs + statement.excluded.active_jobs,
+                      'updated_at': statement.excluded.updated_at}
+            ), gains)
+        losses = [{'_skill_id': skill_id, '_delta': delta} for skill_id, delta in deltas.items() if delta < 0]
+        if losses:
+            connection.execute(
+                update(SkillDemand)
+                .where(SkillDemand.skill_id == bindparam('_skill_id'))
+                .values(active_jobs=SkillDemand.active_jobs + bindparam('_delta'), updated_at=now),
+                losses
+            )
+        return
+
+    existing = set(connection.execute(
+        select(SkillDemand.skill_id).where(SkillDemand.skill_id.in_(list(deltas)))
+    ).scalars())
+    if existing:
+        connection.execute(
+            update(SkillDemand)
+            .where(SkillDemand.skill_id == bindparam('_skill_id'))
+            .values(active_jobs=SkillDemand.active_jobs + bindparam('_delta'), updated_at=now),
+            [{'_skill_id': skill_id, '_delta': deltas[skill_id]} for skill_id in existing]
+        )
+    missing = [skill_id for skill_id in deltas if skill_id not in existing]
+    if missing:
+        connection.execute(
+            insert(SkillDemand),
+            [{'skill_id': skill_id, 'active_jobs': max(deltas[skill_id], 0), 'updated_at': now}
+             for skill_id in missing]
+        )
+
+
+def sync_jobs(connection, before, job_ids):
+    """Apply the demand change of jobs from their `before` states (_job_states) to their current ones"""
+    after = job_states(connection, job_ids)
+    deltas = {}
+    for job_id in job_ids:
+        was_active, old_skills = before.get(job_id, (False, set()))
+        is_active, new_skills = after.get(job_id, (False, set()))
+        for skill_id in old_skills if was_active else ():
+            deltas[skill_id] = deltas.get(skill_id, 0) - 1
+        for skill_id in new_skills if is_active else ():
+            deltas[skill_id] = deltas.get(skill_id, 0) + 1
+    apply_deltas(connection, deltas)
+
+
+def rebuild(connection=None):
+    """Recompute the whole demand table with a single aggregate query"""
+    aggregate = select(
+        JobSkill.skill_id, func.count(JobSkill.id), func.now()
+    ).join(Job, Job.id == JobSkill.job_id).join(Skill, Skill.id == JobSkill.skill_id).where(
+        Job.status == 'active', Job.visibility == 'public'
+    ).group_by(JobSkill.skill_id)
+
+    def run(conn):
+        conn.execute(delete(SkillDemand))
+        conn.execute(insert(SkillDemand).from_select(['skill_id', 'active_jobs', 'updated_at'], aggregate))
+
+    if connection is not None:
+        run(connection)
+    else:
+        with db.engine.begin() as conn:
+            run(conn)
+
+
+def catalog_gaps(user_skill_ids, limit=10, examples=5):
+    """Most demanded skills across the active catalog that the user lacks"""
+    rows = db.session.query(Skill, SkillDemand.active_jobs).join(
+        SkillDemand, SkillDemand.skill_id == Skill.id
+    ).filter(
+        SkillDemand.active_jobs > 0, Skill.id.notin_(user_skill_ids)
+    ).order_by(SkillDemand.active_jobs.desc(), Skill.id).limit(limit).all()
+
+    titles = example_titles([skill.id for skill, _ in rows], examples)
+    return [{
+        'skill_id': skill.id,
+        'name': skill.display_name or skill.name,
+        'count': count,
+        'jobs': titles.get(skill.id, [])
+    } for skill, count in rows]
+
+
+def match_gaps(matches, user_skill_ids, limit=10):
+    """Skills the user lacks among their top matches, weighted by match score"""
+    scores = dict(matches)
+    if not scores:
+        return []
+    gaps = {}
+    rows = db.session.query(JobSkill.job_id, Skill, Job.title).join(
+        Skill, Skill.id == JobSkill.skill_id
+    ).join(Job, Job.id == JobSkill.job_id).filter(
+        JobSkill.job_id.in_(list(scores)), Skill.id.notin_(user_skill_ids)
+    ).all()
+    for job_id, skill, title in rows:
+        gap = gaps.setdefault(skill.id, {
+            'skill_id': skill.id,
+            'name': skill.display_name or skill.name,
+            'count': 0,
+            'weight': 0,
+            'jobs': []
+        })
+        gap['count'] += 1
+        gap['weight'] += scores[job_id]
+        gap['jobs'].append(title)
+    return sorted(gaps.values(), key=lambda gap: (-gap['weight'], gap['skill_id']))[:limit]
+
+
+def example_titles(skill_ids, per_skill):
+    """Newest active job titles for each skill, fetched in one windowed query"""
+    if not skill_ids:
+        return {}
+    ranked = select(
+        JobSkill.skill_id,
+        Job.title,
+        func.row_number().over(
+            partition_by=JobSkill.skill_id,
+            order_by=(Job.published_at.desc(), Job.id.desc())
+        ).label('position')
+    ).join(Job, Job.id == JobSkill.job_id).where(
+        JobSkill.skill_id.in_(skill_ids), Job.status == 'active', Job.visibility == 'public'
+    ).subquery()
+    titles = {}
+    for skill_id, title in db.session.execute(
+        select(ranked.c.skill_id, ranked.c.title)
+        .where(ranked.c.position <= per_skill)
+        .order_by(ranked.c.skill_id, ranked.c.position)
+    ):
+        titles.setdefault(skill_id, []).append(title)
+    return titles
+
+
+@event.listens_for(Session, 'before_flush')
+def _capture_demand_before(session, flush_context, instances):
+    # Jobs whose active state or skill links this flush may change, read
+    # before the flush so the delta is exact regardless of attribute history
+    job_ids = set()
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Job):
+            state = inspect(obj)
+            if obj in session.deleted or any(state.attrs[key].history.has_changes() for key in ACTIVE_COLUMNS):
+                job_ids.add(obj.id)
+        elif isinstance(obj, JobSkill):
+            job_ids.update(inspect(obj).attrs.job_id.history.sum())
+    for obj in session.new:
+        if isinstance(obj, JobSkill):
+            job_id = obj.job_id if obj.job_id is not None else (obj.job.id if obj.job is not None else None)
+            if job_id is not None:
+                job_ids.add(job_id)
+    job_ids.discard(None)
+    session.info['skill_demand_before'] = job_states(session.connection(), job_ids)
+    session.info['skill_demand_touched'] = job_ids
+
+
+@on_flush(Job, JobSkill)
+def _apply_demand_changes(session, changes):
+    before = session.info.pop('skill_demand_before', {})
+    job_ids = session.info.pop('skill_demand_touched', set())
+    for change in changes:
+        if change.model is Job and change.op == 'new':
+            job_ids.add(change.id)
+        elif change.model is JobSkill and change.op == 'new':
+            job_ids.add(change.values.get('job_id'))
+    job_ids.discard(None)
+    if job_ids:
+        sync_jobs(session.connection(), before, job_ids)
@@ -0,0 +1,188 @@
+from app import db
+from app.models import JobSkill, Skill, SkillTrendBucket, UserSkill
+from app.services.changes import on_flush
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+# trending_score is an integer column, so decayed demand is stored scaled
+TREND_SCALE = 100
+
+
+class SkillStats:
+    """Maintains Skill.job_count, user_count, trending_score and is_popular
+
+    Counts move by the exact delta of each flushed JobSkill/UserSkill insert,
+    delete or re-pointing, in the same transaction as the change. Every new
+    job skill link also adds one demand event to the skill's bucket for the
+    current UTC day and TREND_SCALE to its trending_score (an event of age
+    zero has full weight). refresh_trending() re-derives the score from the
+    buckets with exponential decay and drops buckets past the window;
+    reconcile() additionally repairs count drift from bulk writes and
+    recomputes is_popular. Run it periodically (flask skill-stats-reconcile).
+    """
+
+    def __init__(self, app=None):
+        self.half_life = 7.0
+        self.window = 90
+        self.popular_limit = 20
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.half_life = app.config.get('SKILL_TREND_HALF_LIFE', self.half_life)
+        self.window = app.config.get('SKILL_TREND_WINDOW', self.window)
+        self.popular_limit = app.config.get('POPULAR_SKILL_LIMIT', self.popular_limit)
+
+    def apply(self, connection, job_deltas, user_deltas, demand, day=None):
+        """Add count deltas and today's demand events, all keyed by skill id"""
+        skill_ids = {skill_id for deltas in (job_deltas, user_deltas, demand)
+                     for skill_id, delta in deltas.items() if delta}
+        if not skill_ids:
+            return
+        connection.execute(
+            update(Skill)
+            .where(Skill.id == bindparam('_id'))
+            .values(
+                job_count=func.coalesce(Skill.job_count, 0) + bindparam('_jobs'),
+                user_count=func.coalesce(Skill.user_count, 0) + bindparam('_users'),
+                trending_score=func.coalesce(Skill.trending_score, 0) + bindparam('_trend'),
+                # Statistics are not edits of the skill itself
+                updated_at=Skill.updated_at
+            ),
+            [{
+                '_id': skill_id,
+                '_jobs': job_deltas.get(skill_id, 0),
+                '_users': user_deltas.get(skill_id, 0),
+                '_trend': demand.get(skill_id, 0) * TREND_SCALE
+            } for skill_id in skill_ids]
+        )
+        demand = {skill_id: events for skill_id, events in demand.items() if events > 0}
+        if demand:
+            self._add_demand(connection, day or datetime.utcnow().date(), demand)
+
+    def _add_demand(self, connection, day, demand):
+        rows = [{'skill_id': skill_id, 'day': day, 'demand': events} for skill_id, events in demand.items()]
+        dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+        if dialect is not None:
+            statement = dialect.insert(SkillTrendBucket)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=['skill_id', 'day'],
+                set_={'demand': SkillTrendBucket.demand + statement.excluded.demand}
+            ), rows)
+            return
+
+        existing = set(connection.execute(
+            select(SkillTrendBucket.skill_id)
+            .where(SkillTrendBucket.day == day, SkillTrendBucket.skill_id.in_(list(demand)))
+        ).scalars())
+        if existing:
+            connection.execute(
+                update(SkillTrendBucket)
+                .where(SkillTrendBucket.skill_id == bindparam('_skill_id'), SkillTrendBucket.day == day)
+                .values(demand=SkillTrendBucket.demand + bindparam('_demand')),
+                [{'_skill_id': row['skill_id'], '_demand': row['demand']} for row in rows
+                 if row['skill_id'] in existing]
+            )
+        missing = [row for row in rows if row['skill_id'] not in existing]
+        if missing:
+            connection.execute(SkillTrendBucket.__table__.insert(), missing)
+
+    def decay(self, age_days):
+        return 0.5 ** (age_days / self.half_life)
+
+    def refresh_trending(self, connection, today=None):
+        """Recompute every trending_score from the decayed demand buckets"""
+        today = today or datetime.utcnow().date()
+        cutoff = today - timedelta(days=self.window)
+        connection.execute(delete(SkillTrendBucket).where(SkillTrendBucket.day < cutoff))
+
+        scores = {}
+        for skill_id, day, events in connection.execute(
+            select(SkillTrendBucket.skill_id, SkillTrendBucket.day, SkillTrendBucket.demand)
+        ):
+            scores[skill_id] = scores.get(skill_id, 0.0) + events * self.decay(max((today - day).days, 0))
+
+        connection.execute(
+            update(Skill)
+            .where(Skill.trending_score != 0, Skill.id.notin_(list(scores)))
+            .values(trending_score=0, updated_at=Skill.updated_at)
+        )
+        if scores:
+            connection.execute(
+                update(Skill)
+                .where(Skill.id == bindparam('_id'))
+                .values(trending_score=bindparam('_score'), updated_at=Skill.updated_at),
+                [{'_id': skill_id, '_score': round(score * TREND_SCALE)} for skill_id, score in scores.items()]
+            )
+
+    def reconcile(self):
+        """Repair count drift in bulk, refresh trending and popular flags; returns repaired skill count"""
+        with db.engine.begin() as connection:
+            # Two grouped scans instead of per-skill correlated counts, which
+            # would each scan the link tables since they lead with job/user id
+            jobs = dict(connection.execute(
+                select(JobSkill.skill_id, func.count(JobSkill.id)).group_by(JobSkill.skill_id)
+            ).all())
+            users = dict(connection.execute(
+                select(UserSkill.skill_id, func.count(UserSkill.id)).group_by(UserSkill.skill_id)
+            ).all())
+            repairs = [
+                {'_id': skill_id, '_jobs': jobs.get(skill_id, 0), '_users': users.get(skill_id, 0)}
+                for skill_id, job_count, user_count in connection.execute(
+                    select(Skill.id, Skill.job_count, Skill.user_count)
+                )
+                if (job_count, user_count) != (jobs.get(skill_id, 0), users.get(skill_id, 0))
+            ]
+            if repairs:
+                connection.execute(
+                    update(Skill)
+                    .where(Skill.id == bindparam('_id'))
+                    .values(job_count=bindparam('_jobs'), user_count=bindparam('_users'), updated_at=Skill.updated_at),
+                    repairs
+                )
+            repaired = len(repairs)
+
+            self.refresh_trending(connection)
+
+            popular = select(Skill.id).where(
+                func.coalesce(Skill.job_count, 0) + func.coalesce(Skill.user_count, 0) > 0
+            ).order_by(
+                (func.coalesce(Skill.job_count, 0) + func.coalesce(Skill.user_count, 0)).desc(), Skill.id
+            ).limit(self.popular_limit)
+            popular_ids = connection.execute(popular).scalars().all()
+            connection.execute(
+                update(Skill).where(Skill.id.in_(popular_ids)).values(is_popular=True, updated_at=Skill.updated_at)
+            )
+            connection.execute(
+                update(Skill)
+                .where(Skill.id.notin_(popular_ids), or_(Skill.is_popular.is_(True), Skill.is_popular.is_(None)))
+                .values(is_popular=False, updated_at=Skill.updated_at)
+            )
+        return repaired
+
+
+skill_stats = SkillStats()
+
+
+@on_flush(JobSkill, UserSkill)
+def _apply_skill_counts(session, changes):
+    job_deltas, user_deltas, demand = {}, {}, {}
+    for change in changes:
+        deltas = job_deltas if change.model is JobSkill else user_deltas
+        skill_id = change.values.get('skill_id')
+        if change.op == 'new':
+            deltas[skill_id] = deltas.get(skill_id, 0) + 1
+            if change.model is JobSkill:
+                demand[skill_id] = demand.get(skill_id, 0) + 1
+        elif change.op == 'deleted':
+            deltas[skill_id] = deltas.get(skill_id, 0) - 1
+        elif 'skill_id' in change.changed:
+            old_skill_id = change.previous['skill_id']
+            deltas[old_skill_id] = deltas.get(old_skill_id, 0) - 1
+            deltas[skill_id] = deltas.get(skill_id, 0) + 1
+            if change.model is JobSkill:
+                demand[skill_id] = demand.get(skill_id, 0) + 1
+    for deltas in (job_deltas, user_deltas, demand):
+        deltas.pop(None, None)
+    skill_stats.apply(session.connection(), job_deltas, user_deltas, demand)
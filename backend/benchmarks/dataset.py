@@ -0,0 +1,310 @@
+"""Deterministic synthetic dataset for load and latency testing
+
+Bulk-loads skills, employers, job seekers, jobs with their skills and
+applications into the configured database (SQLite or PostgreSQL) with
+executemany inserts, then rebuilds every derived table the ORM listeners
+would otherwise maintain. The same seed, sizes and --today always
+produce the same rows; timestamps are laid out backwards from that day
+so trending and recency behave as on a live catalog. Skill popularity, employer size and applications per job
+follow Zipf-like curves; jobs cluster around weighted cities and skew
+towards recent postings.
+
+    DATABASE_URL=postgresql://... python benchmarks/dataset.py --jobs 100000 --applications 1000000 --skills 10000
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = {'skills': 10000, 'employers': 2000, 'seekers': 50000, 'jobs': 100000, 'applications': 1000000}
+PASSWORD = 'bench-password'
+CHUNK = 5000
+
+# (city, state, country, latitude, longitude, weight)
+CITIES = [
+    ('New York', 'New York', 'United States', 40.7128, -74.006, 8.3),
+    ('San Francisco', 'California', 'United States', 37.7749, -122.4194, 4.5),
+    ('Austin', 'Texas', 'United States', 30.2672, -97.7431, 2.2),
+    ('Seattle', 'Washington', 'United States', 47.6062, -122.3321, 3.1),
+    ('Chicago', 'Illinois', 'United States', 41.8781, -87.6298, 2.7),
+    ('Boston', 'Massachusetts', 'United States', 42.3601, -71.0589, 2.0),
+    ('Toronto', 'Ontario', 'Canada', 43.6532, -79.3832, 2.8),
+    ('London', 'England', 'United Kingdom', 51.5074, -0.1278, 7.0),
+    ('Paris', 'Ile-de-France', 'France', 48.8566, 2.3522, 5.0),
+    ('Berlin', 'Berlin', 'Germany', 52.52, 13.405, 3.6),
+    ('Amsterdam', 'North Holland', 'Netherlands', 52.3676, 4.9041, 1.6),
+    ('Madrid', 'Madrid', 'Spain', 40.4168, -3.7038, 3.3),
+    ('Warsaw', 'Masovia', 'Poland', 52.2297, 21.0122, 1.8),
+    ('Bangalore', 'Karnataka', 'India', 12.9716, 77.5946, 6.0),
+    ('Singapore', None, 'Singapore', 1.3521, 103.8198, 2.5),
+    ('Sydney', 'New South Wales', 'Australia', -33.8688, 151.2093, 2.3),
+    ('Sao Paulo', 'Sao Paulo', 'Brazil', -23.5505, -46.6333, 4.0),
+    ('Lagos', 'Lagos', 'Nigeria', 6.5244, 3.3792, 2.0),
+]
+SKILL_STEMS = [
+    'python', 'javascript', 'typescript', 'java', 'go', 'rust', 'c++', 'c#', 'sql', 'postgresql',
+    'react', 'vue', 'angular', 'node.js', 'django', 'flask', 'spring', 'kubernetes', 'docker', 'aws',
+    'azure', 'gcp', 'terraform', 'machine learning', 'pandas', 'spark', 'kafka', 'graphql', 'figma',
+    'excel', 'salesforce', 'seo', 'copywriting', 'accounting', 'negotiation', 'project management',
+    'scrum', 'customer support', 'recruiting', 'data analysis', 'tableau', 'linux', 'networking', 'security'
+]
+SKILL_CATEGORIES = ['programming', 'framework', 'cloud', 'data', 'design', 'business', 'soft-skill']
+INDUSTRIES = [('Technology', 6), ('Finance', 2), ('Healthcare', 1.5), ('Retail', 1), ('Education', 0.8),
+              ('Manufacturing', 0.8), ('Media', 0.5)]
+CATEGORIES = ['Software Development', 'Data Science', 'DevOps', 'Design', 'Sales', 'Marketing',
+              'Customer Success', 'Finance', 'Operations', 'Human Resources']
+JOB_TYPES = [('full-time', 0.75), ('part-time', 0.1), ('contract', 0.1), ('internship', 0.05)]
+WORK_MODES = [('onsite', 0.45), ('hybrid', 0.35), ('remote', 0.2)]
+LEVELS = [('entry', 0.15, 45000), ('junior', 0.2, 60000), ('mid', 0.35, 85000),
+          ('senior', 0.22, 120000), ('lead', 0.08, 150000)]
+JOB_STATUSES = [('active', 0.8), ('closed', 0.1), ('paused', 0.05), ('draft', 0.05)]
+APPLICATION_STATUSES = [('submitted', 0.55), ('reviewed', 0.2), ('shortlisted', 0.1),
+                        ('interview', 0.06), ('rejected', 0.07), ('hired', 0.02)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, default in DEFAULT_SIZES.items():
+        parser.add_argument(f'--{name}', type=int, default=default, help=f'rows to generate (default {default})')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--today', type=datetime.fromisoformat, help='day the data ends on (default today)')
+    parser.add_argument('--no-create', action='store_true', help='tables already exist')
+    return parser.parse_args()
+
+
+def zipf_weights(count, exponent=1.07):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def pick(rng, choices, size):
+    """Draw `size` indexes into (label, weight, ...) tuples by weight"""
+    weights = np.array([choice[1] for choice in choices], dtype=float)
+    return rng.choice(len(choices), size=size, p=weights / weights.sum())
+
+
+def draw(rng, cdf, size):
+    """Draw `size` indexes from a cumulative distribution; unlike rng.choice(p=...) this is O(log n) per draw"""
+    return np.minimum(np.searchsorted(cdf, rng.random(size)), len(cdf) - 1)
+
+
+def insert_chunks(connection, table, rows):
+    """Execute one executemany per CHUNK rows of an iterable of dicts"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            connection.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(table.insert(), chunk)
+
+
+def sync_sequences(connection, tables):
+    """Move PostgreSQL id sequences past the explicit ids just inserted"""
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1)) FROM {table.name}"
+        )
+
+
+def generate(db, sizes, seed=1, now=None):
+    """Load a synthetic dataset into empty tables; returns the number of rows written per table"""
+    from app.models import Application, Job, JobSkill, Skill, SkillTrendBucket, User, UserSkill
+    from app.services.geo import encode
+    from app.services.passwords import hash_password
+
+    rng = np.random.default_rng(seed)
+    now = now or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    password_hash = hash_password(PASSWORD, 4)
+    counts = {}
+
+    with db.engine.begin() as connection:
+        if connection.execute(db.select(db.func.count(User.id))).scalar():
+            raise RuntimeError('The synthetic dataset is loaded into an empty database')
+
+        # Skills: real stems first, numbered variants after, popularity by rank
+        skill_count = sizes['skills']
+
+        def skills():
+            for i in range(skill_count):
+                stem = SKILL_STEMS[i % len(SKILL_STEMS)]
+                name = stem if i < len(SKILL_STEMS) else f'{stem} {i // len(SKILL_STEMS)}'
+                yield {'id': i + 1, 'name': name,
+                       'display_name': name.title(), 'category': SKILL_CATEGORIES[i % len(SKILL_CATEGORIES)],
+                       'synonyms': [], 'is_verified': i < len(SKILL_STEMS), 'status': 'active',
+                       'created_at': now, 'updated_at': now}
+        insert_chunks(connection, Skill.__table__, skills())
+        counts['skills'] = skill_count
+        skill_cdf = np.cumsum(zipf_weights(skill_count, 0.8))
+
+        # Users: employers then job seekers, all sharing one cheap password hash
+        employer_ids = np.arange(1, sizes['employers'] + 1)
+        seeker_ids = np.arange(sizes['employers'] + 1, sizes['employers'] + sizes['seekers'] + 1)
+        city_p = np.array([city[5] for city in CITIES])
+        city_p = city_p / city_p.sum()
+        seeker_cities = rng.choice(len(CITIES), size=len(seeker_ids), p=city_p)
+        seeker_levels = pick(rng, LEVELS, len(seeker_ids))
+
+        def users():
+            for i, user_id in enumerate(employer_ids):
+                yield {'id': int(user_id), 'email': f'employer{i}@bench.local', 'password_hash': password_hash,
+                       'role': 'employer', 'first_name': 'Employer', 'last_name': str(i),
+                       'employer_profile': {'company_name': f'Company {i}', 'industry': INDUSTRIES[i % len(INDUSTRIES)][0]},
+                       'job_seeker_profile': None, 'city': None, 'latitude': None, 'longitude': None,
+                       'is_active': True, 'created_at': now, 'updated_at': now}
+            for i, user_id in enumerate(seeker_ids):
+                city = CITIES[seeker_cities[i]]
+                level = LEVELS[seeker_levels[i]]
+                yield {'id': int(user_id), 'email': f'seeker{i}@bench.local', 'password_hash': password_hash,
+                       'role': 'jobseeker', 'first_name': 'Seeker', 'last_name': str(i),
+                       'employer_profile': None,
+                       'job_seeker_profile': {'headline': f'{level[0].title()} professional',
+                                              'experience': int(seeker_levels[i]) * 3,
+                                              'expected_salary': {'min': level[2]}},
+                       'city': city[0], 'latitude': city[3] + float(rng.normal(0, 0.1)),
+                       'longitude': city[4] + float(rng.normal(0, 0.1)),
+                       'is_active': True, 'created_at': now, 'updated_at': now}
+        insert_chunks(connection, User.__table__, users())
+        counts['users'] = len(employer_ids) + len(seeker_ids)
+
+        def user_skills():
+            for user_id in seeker_ids:
+                for skill in np.unique(draw(rng, skill_cdf, int(rng.integers(3, 16)))):
+                    yield {'user_id': int(user_id), 'skill_id': int(skill) + 1,
+                           'proficiency_level': int(rng.integers(1, 6)),
+                           'years_of_experience': float(rng.integers(0, 11)), 'created_at': now}
+        insert_chunks(connection, UserSkill.__table__, user_skills())
+
+        # Jobs: big employers post most, postings skew recent
+        job_count = sizes['jobs']
+        job_employers = rng.choice(employer_ids, size=job_count, p=zipf_weights(len(employer_ids), 0.9))
+        job_cities = rng.choice(len(CITIES), size=job_count, p=city_p)
+        job_levels = pick(rng, LEVELS, job_count)
+        job_statuses = pick(rng, JOB_STATUSES, job_count)
+        job_types = pick(rng, JOB_TYPES, job_count)
+        job_modes = pick(rng, WORK_MODES, job_count)
+        job_industries = pick(rng, INDUSTRIES, job_count)
+        job_ages = np.minimum(rng.exponential(20, size=job_count), 365)
+        demand = Counter()
+
+        def jobs():
+            for i in range(job_count):
+                city = CITIES[job_cities[i]]
+                level = LEVELS[job_levels[i]]
+                status = JOB_STATUSES[job_statuses[i]][0]
+                salary_min = int(level[2] * rng.lognormal(0, 0.2) // 1000 * 1000)
+                latitude = city[3] + float(rng.normal(0, 0.15))
+                longitude = city[4] + float(rng.normal(0, 0.2))
+                published_at = now - timedelta(days=float(job_ages[i]))
+                yield {
+                    'id': i + 1, 'employer_id': int(job_employers[i]),
+                    'title': f'{level[0].title()} {CATEGORIES[i % len(CATEGORIES)]} role {i}',
+                    'description': f'{level[0].title()} position in {CATEGORIES[i % len(CATEGORIES)]}. ' * 8,
+                    'company_name': f'Company {int(job_employers[i]) - 1}',
+                    'job_type': JOB_TYPES[job_types[i]][0],
+                    'work_mode': WORK_MODES[job_modes[i]][0],
+                    'experience_level': level[0],
+                    'industry': INDUSTRIES[job_industries[i]][0],
+                    'category': CATEGORIES[i % len(CATEGORIES)],
+                    'city': city[0], 'state': city[1], 'country': city[2],
+                    'latitude': latitude, 'longitude': longitude, 'geohash': encode(latitude, longitude),
+                    'allows_remote': bool(rng.random() < 0.25),
+                    'salary_min': salary_min, 'salary_max': int(salary_min * 1.3),
+                    'salary_currency': 'USD', 'salary_period': 'year', 'show_salary': bool(rng.random() < 0.8),
+                    'benefits': [], 'responsibilities': [], 'requirements': {},
+                    'number_of_openings': int(rng.integers(1, 4)),
+                    'status': status, 'visibility': 'private' if rng.random() < 0.03 else 'public',
+                    'featured': bool(rng.random() < 0.03), 'urgent': bool(rng.random() < 0.05),
+                    'views': int(rng.geometric(0.01)), 'applications_count': 0,
+                    'created_at': published_at - timedelta(hours=1), 'updated_at': published_at,
+                    'published_at': published_at if status != 'draft' else None,
+                    'closed_at': now if status == 'closed' else None
+                }
+        insert_chunks(connection, Job.__table__, jobs())
+        counts['jobs'] = job_count
+
+        def job_skills():
+            for i in range(job_count):
+                day = (now - timedelta(days=float(job_ages[i]))).date()
+                for skill in np.unique(draw(rng, skill_cdf, int(rng.integers(3, 11)))):
+                    demand[(int(skill) + 1, day)] += 1
+                    yield {'job_id': i + 1, 'skill_id': int(skill) + 1,
+                           'required': bool(rng.random() < 0.8), 'weight': int(rng.choice([3, 5, 5, 8, 10])),
+                           'proficiency_level': int(rng.integers(1, 6)) if rng.random() < 0.5 else None}
+        insert_chunks(connection, JobSkill.__table__, job_skills())
+        insert_chunks(connection, SkillTrendBucket.__table__, (
+            {'skill_id': skill_id, 'day': day, 'demand': events} for (skill_id, day), events in demand.items()
+        ))
+
+        # Applications: recent, featured and active jobs draw most of them
+        job_p = np.exp(-job_ages / 30) * np.where(job_statuses == 0, 1.0, 0.2) * rng.pareto(2.0, job_count)
+        per_job = np.minimum(rng.multinomial(sizes['applications'], job_p / job_p.sum()), len(seeker_ids))
+        app_statuses = [status for status, _ in APPLICATION_STATUSES]
+        app_p = np.array([weight for _, weight in APPLICATION_STATUSES])
+        app_p = app_p / app_p.sum()
+
+        def applications():
+            for i in np.flatnonzero(per_job):
+                applicants = np.unique(rng.integers(0, len(seeker_ids), size=int(per_job[i])))
+                statuses = rng.choice(len(app_statuses), size=len(applicants), p=app_p)
+                ages = rng.uniform(0, job_ages[i], size=len(applicants))
+                for applicant, status, age in zip(applicants, statuses, ages):
+                    counts['applications'] += 1
+                    created_at = now - timedelta(days=float(age))
+                    yield {'job_id': int(i) + 1, 'applicant_id': int(seeker_ids[applicant]),
+                           'employer_id': int(job_employers[i]), 'status': app_statuses[status],
+                           'status_history': [], 'ai_match_score': None,
+                           'is_viewed': status > 0, 'is_favorite': False,
+                           'created_at': created_at, 'updated_at': created_at}
+        counts['applications'] = 0
+        insert_chunks(connection, Application.__table__, applications())
+
+        sync_sequences(connection, [Skill.__table__, User.__table__, Job.__table__])
+
+    rebuild_derived(db)
+    return counts
+
+
+def rebuild_derived(db):
+    """Recompute what the flush and commit listeners maintain for ORM writes"""
+    from app.services import funnel, job_stats, profiles, skill_demand
+    from app.services.catalog_snapshot import catalog_snapshot
+    from app.services.search import job_search
+    from app.services.skill_stats import skill_stats
+
+    skill_demand.rebuild()
+    skill_stats.reconcile()
+    profiles.backfill(batch_size=5000, recompute=True)
+    job_search.rebuild()
+    job_stats.reconcile()
+    funnel.rebuild()
+    catalog_snapshot.rebuild()
+
+
+def main():
+    args = parse_args()
+    from app import create_app, db
+
+    app = create_app()
+    sizes = {name: getattr(args, name) for name in DEFAULT_SIZES}
+    with app.app_context():
+        if not args.no_create:
+            db.create_all()
+        started = time.perf_counter()
+        counts = generate(db, sizes, seed=args.seed, now=args.today)
+        print(json.dumps({'seed': args.seed, 'rows': counts,
+                          'seconds': round(time.perf_counter() - started, 1)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
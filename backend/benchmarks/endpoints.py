@@ -0,0 +1,285 @@
+"""Per-route latency, query count and memory benchmark
+
+Loads the synthetic dataset (benchmarks/dataset.py) into a throwaway
+SQLite database, or uses an already loaded one from --database-url, then
+drives every route through the Flask test client with seeded, varied
+parameters. Each scenario records p50/p95/p99/mean latency, SQL
+statements per request and, in a separate tracemalloc pass so tracing
+does not skew the timings, peak Python memory per request. The JSON
+report carries the dataset sizes, seed and git revision; pass an older
+report as --compare to add per-scenario deltas.
+
+    python benchmarks/endpoints.py --jobs 100000 --applications 1000000 --skills 10000 --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset  # noqa: E402
+
+BULK_ROWS = 100
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, default in dataset.DEFAULT_SIZES.items():
+        parser.add_argument(f'--{name}', type=int, default=default, help=f'generated rows (default {default})')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='benchmark an already generated database instead')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per scenario first')
+    parser.add_argument('--memory-requests', type=int, default=5, help='traced requests per scenario')
+    parser.add_argument('--only', action='append', help='run only these scenarios (repeatable)')
+    parser.add_argument('--bcrypt-rounds', type=int, default=4, help='work factor logins verify and rehash at')
+    parser.add_argument('--output', help='write the report here as well as to stdout')
+    parser.add_argument('--compare', help='earlier report to diff against')
+    return parser.parse_args()
+
+
+def percentile(samples, q):
+    return round(float(np.percentile(samples, q)), 2) if samples else None
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Scenarios:
+    """Seeded request factories, one per route and interesting parameter mix"""
+
+    def __init__(self, app, rng):
+        from flask_jwt_extended import create_access_token
+        from app.models import Job, User
+
+        self.rng = rng
+        with app.app_context():
+            employer_ids = [row[0] for row in User.query.with_entities(User.id).filter_by(role='employer').limit(100)]
+            seeker_ids = [row[0] for row in User.query.with_entities(User.id).filter_by(role='jobseeker').limit(1000)]
+            self.seeker_emails = [row[0] for row in
+                                  User.query.with_entities(User.email).filter_by(role='jobseeker').limit(1000)]
+            self.job_ids = [row[0] for row in Job.query.with_entities(Job.id).filter_by(status='active').limit(5000)]
+            # Tokens are minted directly so only the login scenario pays for bcrypt
+            self.employer_tokens = [create_access_token(identity=str(user_id), additional_claims={'role': 'employer'})
+                                    for user_id in employer_ids]
+            self.seeker_tokens = [create_access_token(identity=str(user_id), additional_claims={'role': 'jobseeker'})
+                                  for user_id in seeker_ids]
+        self.cursor = ''
+        self.created = 0
+
+    def choice(self, items):
+        return items[int(self.rng.integers(len(items)))]
+
+    def employer(self):
+        return {'Authorization': f'Bearer {self.choice(self.employer_tokens)}'}
+
+    def seeker(self):
+        return {'Authorization': f'Bearer {self.choice(self.seeker_tokens)}'}
+
+    def health(self):
+        return 'GET', '/health', {}
+
+    def jobs_list(self):
+        return 'GET', f'/api/jobs?page={int(self.rng.integers(1, 51))}', {}
+
+    def jobs_filtered(self):
+        level = self.choice([level for level, _, _ in dataset.LEVELS])
+        mode = self.choice([mode for mode, _ in dataset.WORK_MODES])
+        return 'GET', f'/api/jobs?experience_level={level}&work_mode={mode}&page={int(self.rng.integers(1, 6))}', {}
+
+    def jobs_search(self):
+        return 'GET', f'/api/jobs?search={self.choice(dataset.SKILL_STEMS[:20])}', {}
+
+    def jobs_near(self):
+        city = self.choice(dataset.CITIES)
+        return 'GET', f'/api/jobs?near={city[3]},{city[4]}&radius_km={int(self.rng.integers(5, 51))}', {}
+
+    def jobs_cursor(self):
+        return 'GET', f'/api/jobs?cursor={self.cursor}', {}
+
+    def job_detail(self):
+        return 'GET', f'/api/jobs/{self.choice(self.job_ids)}', {}
+
+    def jobs_mine(self):
+        return 'GET', '/api/jobs/mine?per_page=200', {'headers': self.employer()}
+
+    def job_create(self):
+        self.created += 1
+        return 'POST', '/api/jobs', {'headers': self.employer(), 'json': {
+            'title': f'Benchmark posting {self.created}', 'description': 'Created by the benchmark suite',
+            'job_type': 'full-time', 'experience_level': 'mid', 'industry': 'Technology',
+            'category': 'Software Development', 'country': 'United States', 'status': 'active'
+        }}
+
+    def jobs_bulk(self):
+        self.created += 1
+        rows = [json.dumps({
+            'external_id': f'bench-{self.created}-{i}', 'title': f'Imported posting {i}',
+            'description': 'Imported by the benchmark suite', 'job_type': 'full-time', 'experience_level': 'mid',
+            'industry': 'Technology', 'category': 'Software Development', 'country': 'United States',
+            'skills': [self.choice(dataset.SKILL_STEMS) for _ in range(3)]
+        }) for i in range(BULK_ROWS)]
+        headers = dict(self.employer(), **{'Content-Type': 'application/x-ndjson'})
+        return 'POST', '/api/jobs/bulk', {'headers': headers, 'data': '\n'.join(rows)}
+
+    def auth_login(self):
+        return 'POST', '/api/auth/login', {'json': {'email': self.choice(self.seeker_emails),
+                                                    'password': dataset.PASSWORD}}
+
+    def auth_register(self):
+        self.created += 1
+        return 'POST', '/api/auth/register', {'json': {
+            'email': f'bench-register-{self.created}@bench.local', 'password': dataset.PASSWORD,
+            'first_name': 'Bench', 'last_name': 'Register', 'role': 'jobseeker'
+        }}
+
+    def auth_me(self):
+        return 'GET', '/api/auth/me', {'headers': self.seeker()}
+
+    def auth_profile(self):
+        return 'PUT', '/api/auth/profile', {'headers': self.seeker(), 'json': {'city': self.choice(dataset.CITIES)[0]}}
+
+    def ai_match_jobs(self):
+        return 'GET', f'/api/ai/match-jobs?limit=10&offset={int(self.rng.integers(0, 3)) * 10}', {
+            'headers': self.seeker()}
+
+    def ai_skill_gap(self):
+        return 'GET', '/api/ai/skill-gap', {'headers': self.seeker()}
+
+    def ai_skill_gap_matches(self):
+        return 'GET', '/api/ai/skill-gap?scope=matches', {'headers': self.seeker()}
+
+    def after(self, name, response):
+        if name == 'jobs_cursor':
+            self.cursor = (response.get_json() or {}).get('next_cursor') or ''
+
+    NAMES = ('health', 'jobs_list', 'jobs_filtered', 'jobs_search', 'jobs_near', 'jobs_cursor', 'job_detail',
+             'jobs_mine', 'job_create', 'jobs_bulk', 'auth_login', 'auth_register', 'auth_me', 'auth_profile',
+             'ai_match_jobs', 'ai_skill_gap', 'ai_skill_gap_matches')
+
+
+def run_scenario(client, scenarios, name, queries, args):
+    def call():
+        method, path, kwargs = getattr(scenarios, name)()
+        response = client.open(path, method=method, **kwargs)
+        scenarios.after(name, response)
+        return response.status_code
+
+    for _ in range(args.warmup):
+        call()
+
+    latencies, statements, statuses = [], [], {}
+    for _ in range(args.requests):
+        before = queries['count']
+        started = time.perf_counter()
+        status = call()
+        latencies.append((time.perf_counter() - started) * 1000)
+        statements.append(queries['count'] - before)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    peak = 0
+    tracemalloc.start()
+    for _ in range(args.memory_requests):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        call()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        'requests': len(latencies),
+        'statuses': statuses,
+        'latency_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                       'p99': percentile(latencies, 99), 'mean': round(float(np.mean(latencies)), 2)},
+        'queries': {'mean': round(float(np.mean(statements)), 2), 'max': int(max(statements))},
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+
+def compare(report, baseline):
+    """Per-scenario p50/p95/p99, query and memory changes against an earlier report"""
+    deltas = {}
+    for name, result in report['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        entry = {}
+        for key in ('p50', 'p95', 'p99'):
+            old, new = before['latency_ms'][key], result['latency_ms'][key]
+            entry[f'{key}_ms'] = {'before': old, 'after': new,
+                                  'change_pct': round((new - old) / old * 100, 1) if old else None}
+        entry['queries_mean'] = {'before': before['queries']['mean'], 'after': result['queries']['mean']}
+        entry['peak_memory_kb'] = {'before': before['peak_memory_kb'], 'after': result['peak_memory_kb']}
+        deltas[name] = entry
+    return {'baseline_revision': baseline.get('revision'), 'baseline_dataset': baseline.get('dataset'),
+            'scenarios': deltas}
+
+
+def main():
+    args = parse_args()
+    os.environ['BCRYPT_LOG_ROUNDS'] = str(args.bcrypt_rounds)
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        workdir = tempfile.mkdtemp(prefix='endpoint-bench-')
+        os.environ['DATABASE_URL'] = f'sqlite:///{workdir}/bench.db'
+
+    from sqlalchemy import event
+    from app import create_app, db
+
+    app = create_app()
+    sizes = {name: getattr(args, name) for name in dataset.DEFAULT_SIZES}
+    report = {'revision': git_revision(), 'python': platform.python_version(), 'seed': args.seed,
+              'requests_per_scenario': args.requests}
+    with app.app_context():
+        if args.database_url:
+            report['dataset'] = {'database': db.engine.dialect.name, 'generated': False}
+        else:
+            db.create_all()
+            started = time.perf_counter()
+            counts = dataset.generate(db, sizes, seed=args.seed)
+            report['dataset'] = {'database': db.engine.dialect.name, 'generated': True, 'rows': counts,
+                                 'seconds': round(time.perf_counter() - started, 1)}
+
+        queries = {'count': 0}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(*args):
+            queries['count'] += 1
+
+    scenarios = Scenarios(app, np.random.default_rng(args.seed))
+    client = app.test_client()
+    report['scenarios'] = {}
+    for name in Scenarios.NAMES:
+        if args.only and name not in args.only:
+            continue
+        report['scenarios'][name] = run_scenario(client, scenarios, name, queries, args)
+        print(f'{name}: p95 {report["scenarios"][name]["latency_ms"]["p95"]} ms', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            report['comparison'] = compare(report, json.load(baseline))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Login throughput against concurrent job listing latency
+
+Seeds a throwaway SQLite database, serves the app from a threaded server
+(like gunicorn's gthread workers) and, for inline hashing and for the
+process pool, hammers /api/auth/login from several threads while one
+thread keeps timing GET /api/jobs.
+
+    python benchmarks/login_load.py --rounds 12 --login-threads 8 --seconds 10
+"""
+from datetime import datetime
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt work factor')
+    parser.add_argument('--pool-size', type=int, default=2, help='password processes for the pooled run')
+    parser.add_argument('--queue-limit', type=int, default=1, help='password calls allowed to wait')
+    parser.add_argument('--login-threads', type=int, default=8, help='concurrent login clients')
+    parser.add_argument('--server-threads', type=int, default=4, help='request threads serving the app')
+    parser.add_argument('--seconds', type=float, default=10, help='duration of each run')
+    parser.add_argument('--jobs', type=int, default=200, help='seeded jobs')
+    return parser.parse_args()
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def seed(app, db, jobs, rounds):
+    from app.models import Job, User
+    from app.services.passwords import hash_password
+    with app.app_context():
+        db.create_all()
+        employer = User(email='employer@bench.local', first_name='Bench', last_name='Employer',
+                        role='employer', password_hash=hash_password('bench-password', rounds))
+        seeker = User(email='seeker@bench.local', first_name='Bench', last_name='Seeker',
+                      role='jobseeker', password_hash=hash_password('bench-password', rounds))
+        db.session.add_all([employer, seeker])
+        db.session.flush()
+        for i in range(jobs):
+            db.session.add(Job(
+                title=f'Benchmark job {i}', description='Benchmark job description', employer_id=employer.id,
+                company_name='Bench', job_type='full-time', work_mode='onsite', experience_level='mid',
+                industry='Tech', category='Engineering', country='US', status='active', visibility='public',
+                published_at=datetime.utcnow()
+            ))
+        db.session.commit()
+
+
+def run(base_url, args):
+    stop = time.monotonic() + args.seconds
+    statuses = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def login_client():
+        while time.monotonic() < stop:
+            status = request(base_url + '/api/auth/login',
+                             {'email': 'seeker@bench.local', 'password': 'bench-password'})
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    def listing_client():
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            request(base_url + '/api/jobs?per_page=20')
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=login_client) for _ in range(args.login_threads)]
+    threads.append(threading.Thread(target=listing_client))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'logins_per_sec': round(statuses.get(200, 0) / args.seconds, 1),
+        'shed_per_sec': round(statuses.get(503, 0) / args.seconds, 1),
+        'statuses': statuses,
+        'listing_ms': {
+            'requests': len(latencies),
+            'p50': round(statistics.median(latencies), 1) if latencies else None,
+            'p95': round(latencies[int(len(latencies) * 0.95) - 1], 1) if latencies else None,
+            'max': round(latencies[-1], 1) if latencies else None
+        }
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='login-bench-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir}/bench.db'
+    os.environ['BCRYPT_LOG_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_QUEUE_LIMIT'] = str(args.queue_limit)
+
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app, db
+    from app.services.passwords import passwords
+
+    app = create_app()
+    seed(app, db, args.jobs, args.rounds)
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    # Cap request threads so the server behaves like a fixed gthread worker
+    executor = ThreadPoolExecutor(max_workers=args.server_threads)
+    server.process_request = lambda req, addr: executor.submit(server.process_request_thread, req, addr)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    report = {'rounds': args.rounds, 'login_threads': args.login_threads,
+              'server_threads': args.server_threads, 'runs': {}}
+    for name, size in (('inline', 0), ('pool', args.pool_size)):
+        passwords.shutdown()
+        passwords.size = size
+        passwords.shed = 0
+        report['runs'][name] = run(base_url, args)
+
+    server.shutdown()
+    passwords.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
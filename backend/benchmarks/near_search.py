@@ -0,0 +1,111 @@
+"""Radius search through the geohash index against the city-string scan
+
+Seeds a throwaway SQLite database with jobs scattered around a set of
+cities and times, for each query point: the near filter (geohash prefix
+ranges plus the distance test), the same distance test without the
+index, and the old Job.city ILIKE '%city%' filter.
+
+    python benchmarks/near_search.py --jobs 100000 --radius-km 25
+"""
+from datetime import datetime
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = {
+    'Paris': (48.8566, 2.3522), 'Lyon': (45.764, 4.8357), 'Berlin': (52.52, 13.405),
+    'Madrid': (40.4168, -3.7038), 'London': (51.5074, -0.1278), 'Rome': (41.9028, 12.4964),
+    'Amsterdam': (52.3676, 4.9041), 'Warsaw': (52.2297, 21.0122), 'Lisbon': (38.7223, -9.1393),
+    'Vienna': (48.2082, 16.3738)
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=100000, help='seeded jobs')
+    parser.add_argument('--radius-km', type=float, default=25, help='search radius')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per query')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def seed(db, Job, User, jobs, rnd):
+    from app.services.geo import encode
+
+    employer = User(email='employer@bench.local', first_name='Bench', last_name='Employer',
+                    role='employer', password_hash='x')
+    db.session.add(employer)
+    db.session.flush()
+    names = list(CITIES)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(jobs):
+        city = rnd.choice(names)
+        latitude, longitude = CITIES[city]
+        # Roughly 60 km of spread around each city centre
+        rows.append({
+            'title': f'Benchmark job {i}', 'description': 'Benchmark job', 'employer_id': employer.id,
+            'company_name': 'Bench', 'job_type': 'full-time', 'work_mode': 'onsite',
+            'experience_level': 'mid', 'industry': 'Tech', 'category': 'Engineering',
+            'city': city, 'country': 'EU', 'latitude': latitude + rnd.gauss(0, 0.3),
+            'longitude': longitude + rnd.gauss(0, 0.4), 'status': 'active', 'visibility': 'public',
+            'created_at': now, 'updated_at': now, 'published_at': now
+        })
+    for row in rows:
+        row['geohash'] = encode(row['latitude'], row['longitude'])
+    db.session.execute(Job.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(query, column, repeat):
+    samples = []
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(query.with_entities(column).all())
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'rows': count, 'median_ms': round(statistics.median(samples), 2), 'min_ms': round(min(samples), 2)}
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='near-bench-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{workdir}/bench.db'
+
+    from app import create_app, db
+    from app.models import Job, User
+    from app.services import geo
+
+    app = create_app()
+    rnd = random.Random(args.seed)
+    report = {'jobs': args.jobs, 'radius_km': args.radius_km, 'queries': {}}
+    with app.app_context():
+        db.create_all()
+        seed(db, Job, User, args.jobs, rnd)
+        active = (Job.status == 'active', Job.visibility == 'public')
+        for city, (latitude, longitude) in list(CITIES.items())[:4]:
+            indexed = geo.apply_near(Job.query, latitude, longitude, args.radius_km, within=active)
+            # Same distance test with no geohash ranges to narrow the scan
+            cover = geo.covering_cells
+            geo.covering_cells = lambda *args: None
+            try:
+                unindexed = geo.apply_near(Job.query, latitude, longitude, args.radius_km, within=active)
+            finally:
+                geo.covering_cells = cover
+            report['queries'][city] = {
+                'near_geohash': timed(indexed, Job.id, args.repeat),
+                'near_full_scan': timed(unindexed, Job.id, args.repeat),
+                'city_ilike': timed(Job.query.filter(*active, Job.city.ilike(f'%{city}%')), Job.id, args.repeat)
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,75 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)
     UPLOAD_FOLDER = 'uploads'
+    
+    # Memory-mapped catalog snapshot shared by the match matrix and listing facets: directory
+    # of its versioned files (default: one per database under instance/catalog) and seconds
+    # before any worker rebuilds it
+    CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR')
+    CATALOG_SNAPSHOT_TTL = int(os.environ.get('CATALOG_SNAPSHOT_TTL', 300))
+    
+    # In-process listing bitmaps (rebuilt on each new catalog snapshot version): jobs changed
+    # in one commit beyond which they are rebuilt instead of patched
+    BITMAP_INDEX_BULK_THRESHOLD = int(os.environ.get('BITMAP_INDEX_BULK_THRESHOLD', 500))
+    
+    # Maximum ranked results the in-process search index returns when no native full-text search exists
+    SEARCH_FALLBACK_LIMIT = int(os.environ.get('SEARCH_FALLBACK_LIMIT', 1000))
+    
+    # Seconds a job listing total is reused for the same filter combination
+    JOB_TOTAL_CACHE_TTL = int(os.environ.get('JOB_TOTAL_CACHE_TTL', 60))
+    
+    # Write-behind counters (job views, last login): flush period in seconds,
+    # pending-row count that triggers an early flush, and rows kept after failed flushes
+    COUNTER_FLUSH_INTERVAL = float(os.environ.get('COUNTER_FLUSH_INTERVAL', 5))
+    COUNTER_FLUSH_THRESHOLD = int(os.environ.get('COUNTER_FLUSH_THRESHOLD', 500))
+    COUNTER_MAX_PENDING = int(os.environ.get('COUNTER_MAX_PENDING', 100000))
+    
+    # Cached GET /api/jobs responses per worker: entry bound and seconds to live
+    JOB_RESPONSE_CACHE_SIZE = int(os.environ.get('JOB_RESPONSE_CACHE_SIZE', 512))
+    JOB_RESPONSE_CACHE_TTL = int(os.environ.get('JOB_RESPONSE_CACHE_TTL', 30))
+    
+    # Pre-encoded static JSON of individual jobs kept per worker: entry bound and seconds
+    # to live, which bounds how long other workers' skill and employer edits take to show
+    JOB_FRAGMENT_CACHE_SIZE = int(os.environ.get('JOB_FRAGMENT_CACHE_SIZE', 5000))
+    JOB_FRAGMENT_CACHE_TTL = int(os.environ.get('JOB_FRAGMENT_CACHE_TTL', 60))
+    
+    # Stored matches per user and seconds before a full re-score repairs incremental drift
+    RECOMMENDATION_LIMIT = int(os.environ.get('RECOMMENDATION_LIMIT', 100))
+    RECOMMENDATION_MAX_AGE = int(os.environ.get('RECOMMENDATION_MAX_AGE', 86400))
+    # Queued job changes beyond which rankings are marked stale instead of patched per job
+    RECOMMENDATION_BULK_THRESHOLD = int(os.environ.get('RECOMMENDATION_BULK_THRESHOLD', 50))
+    
+    # Skill trending: days for demand to lose half its weight, days of buckets kept,
+    # and how many skills by job + user count are flagged popular
+    SKILL_TREND_HALF_LIFE = float(os.environ.get('SKILL_TREND_HALF_LIFE', 7))
+    SKILL_TREND_WINDOW = int(os.environ.get('SKILL_TREND_WINDOW', 90))
+    POPULAR_SKILL_LIMIT = int(os.environ.get('POPULAR_SKILL_LIMIT', 20))
+    
+    # bcrypt work factor; stored hashes with another factor are upgraded on login
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # Password hashing processes per worker (0 hashes inline), calls allowed to
+    # wait behind them before answering 503, and seconds before a call is shed
+    PASSWORD_POOL_SIZE = int(os.environ.get('PASSWORD_POOL_SIZE', 2))
+    PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', 16))
+    PASSWORD_TIMEOUT = float(os.environ.get('PASSWORD_TIMEOUT', 5))
+    
+    # Authenticated users and skill ids cached per worker: entry bound and seconds to live
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', 4096))
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    
+    # Bulk job imports: rows written per transaction and rows accepted per POST /api/jobs/bulk
+    BULK_INGEST_BATCH_SIZE = int(os.environ.get('BULK_INGEST_BATCH_SIZE', 500))
+    MAX_BULK_ROWS = int(os.environ.get('MAX_BULK_ROWS', 50000))
+    
+    # Prometheus /metrics: off installs no request or SQL hooks; a request running
+    # one statement shape more than the threshold is counted as a likely N+1
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    METRICS_N_PLUS_ONE_THRESHOLD = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', 10))
+    
+    # Application scoring runs: processes scoring in parallel (0 or 1 scores inline)
+    # and applications read and written per batch
+    SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', os.cpu_count() or 1))
+    SCORING_BATCH_SIZE = int(os.environ.get('SCORING_BATCH_SIZE', 2000))
 
 class DevelopmentConfig(Config):
     DEBUG = True
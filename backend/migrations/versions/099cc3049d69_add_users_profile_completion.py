@@ -0,0 +1,30 @@
+"""Add users profile completion
+
+Existing users are left empty, which to_dict computes on the fly, until
+flask profile-completion-backfill stores them; flushes keep the column
+current for users written from then on.
+
+Revision ID: 099cc3049d69
+Revises: cc4e8e1af154
+Create Date: 2026-10-17 18:44:45.153216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '099cc3049d69'
+down_revision = 'cc4e8e1af154'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_completion', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('profile_completion')
@@ -0,0 +1,28 @@
+"""Add jobs external id
+
+Revision ID: 1670d225233f
+Revises: 18b04c5fc69e
+Create Date: 2026-10-17 18:45:45.059626
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1670d225233f'
+down_revision = '18b04c5fc69e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('external_id', sa.String(length=100), nullable=True))
+        batch_op.create_index('ix_jobs_external_id', ['employer_id', 'external_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_external_id')
+        batch_op.drop_column('external_id')
@@ -0,0 +1,81 @@
+"""Add jobs geohash
+
+Existing located jobs are filled here with a copy of the encoder as it
+stood in this revision; flushes keep the column current after that
+(flask geohash-backfill repairs it).
+
+Revision ID: 18b04c5fc69e
+Revises: 099cc3049d69
+Create Date: 2026-10-17 18:45:17.800944
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '18b04c5fc69e'
+down_revision = '099cc3049d69'
+branch_labels = None
+depends_on = None
+
+
+PRECISION = 6
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BATCH_SIZE = 1000
+
+jobs = sa.table(
+    'jobs',
+    sa.column('id', sa.Integer),
+    sa.column('latitude', sa.Float),
+    sa.column('longitude', sa.Float),
+    sa.column('geohash', sa.String)
+)
+
+
+def encode(latitude, longitude):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    value, bits, even, chars = 0, 0, True, []
+    while len(chars) < PRECISION:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        batch_op.create_index('ix_jobs_nearby', ['status', 'visibility', 'geohash'], unique=False)
+
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(jobs.c.id, jobs.c.latitude, jobs.c.longitude)
+            .where(jobs.c.id > last_id, jobs.c.latitude.isnot(None), jobs.c.longitude.isnot(None))
+            .order_by(jobs.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            jobs.update().where(jobs.c.id == sa.bindparam('_id')).values(geohash=sa.bindparam('_geohash')),
+            [{'_id': row.id, '_geohash': encode(row.latitude, row.longitude)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_nearby')
+        batch_op.drop_column('geohash')
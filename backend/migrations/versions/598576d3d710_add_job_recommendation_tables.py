@@ -0,0 +1,57 @@
+"""Add job recommendation tables
+
+Revision ID: 598576d3d710
+Revises: 6514a80d158f
+Create Date: 2026-10-17 18:41:11.008997
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '598576d3d710'
+down_revision = '6514a80d158f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation_states',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('stored', sa.Integer(), nullable=False),
+    sa.Column('floor', sa.Integer(), nullable=False),
+    sa.Column('stale', sa.Boolean(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('job_recommendations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'job_id', name='unique_user_recommendation')
+    )
+    with op.batch_alter_table('job_recommendations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_recommendations_job_id'), ['job_id'], unique=False)
+        batch_op.create_index('ix_job_recommendations_ranking', ['user_id', 'score', 'job_id'], unique=False)
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_jobs_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jobs_updated_at'))
+
+    with op.batch_alter_table('job_recommendations', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_recommendations_ranking')
+        batch_op.drop_index(batch_op.f('ix_job_recommendations_job_id'))
+
+    op.drop_table('job_recommendations')
+    op.drop_table('recommendation_states')
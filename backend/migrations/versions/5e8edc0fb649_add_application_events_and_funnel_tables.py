@@ -0,0 +1,97 @@
+"""Add application events and funnel tables
+
+Existing applications get status_changed_at from when they reached their
+current status, as far as their timestamps tell. Their events and the
+funnel counts are backfilled by running `flask funnel-rebuild` after
+upgrading.
+
+Revision ID: 5e8edc0fb649
+Revises: bc94a06fed65
+Create Date: 2026-10-17 18:46:24.828808
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8edc0fb649'
+down_revision = 'bc94a06fed65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('application_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('application_id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('employer_id', sa.Integer(), nullable=False),
+    sa.Column('from_status', sa.String(length=50), nullable=True),
+    sa.Column('to_status', sa.String(length=50), nullable=False),
+    sa.Column('changed_by_id', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['application_id'], ['applications.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['changed_by_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['employer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('application_events', schema=None) as batch_op:
+        batch_op.create_index('ix_application_events_application', ['application_id', 'id'], unique=False)
+        batch_op.create_index('ix_application_events_employer', ['employer_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_application_events_job', ['job_id', 'created_at'], unique=False)
+
+    op.create_table('funnel_stages',
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('scope_id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=50), nullable=False),
+    sa.Column('entered', sa.Integer(), nullable=False),
+    sa.Column('exited', sa.Integer(), nullable=False),
+    sa.Column('current', sa.Integer(), nullable=False),
+    sa.Column('total_seconds', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('scope', 'scope_id', 'stage')
+    )
+    op.create_table('funnel_durations',
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('scope_id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=50), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'scope_id', 'stage', 'bucket')
+    )
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_changed_at', sa.DateTime(), nullable=True))
+
+    applications = sa.table(
+        'applications',
+        sa.column('status', sa.String),
+        sa.column('status_changed_at', sa.DateTime),
+        sa.column('created_at', sa.DateTime),
+        sa.column('updated_at', sa.DateTime)
+    )
+    op.execute(
+        applications.update()
+        .where(applications.c.status_changed_at.is_(None))
+        .values(status_changed_at=sa.case(
+            (applications.c.status == 'submitted', applications.c.created_at),
+            else_=sa.func.coalesce(applications.c.updated_at, applications.c.created_at)
+        ))
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_column('status_changed_at')
+
+    op.drop_table('funnel_durations')
+    op.drop_table('funnel_stages')
+    with op.batch_alter_table('application_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_application_events_job')
+        batch_op.drop_index('ix_application_events_employer')
+        batch_op.drop_index('ix_application_events_application')
+
+    op.drop_table('application_events')
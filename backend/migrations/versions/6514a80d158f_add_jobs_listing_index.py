@@ -0,0 +1,30 @@
+"""Add jobs listing index
+
+The first revision: it applies on top of the schema shipped in
+instance/recruitment_portal.db. Databases created with db.create_all()
+already match the models and only need `flask db stamp head`.
+
+Revision ID: 6514a80d158f
+Revises: 
+Create Date: 2026-10-17 18:40:12.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6514a80d158f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_listing', ['status', 'visibility', 'featured', 'published_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_listing')
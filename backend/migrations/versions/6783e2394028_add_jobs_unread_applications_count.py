@@ -0,0 +1,40 @@
+"""Add jobs unread applications count
+
+Existing jobs are counted here in plain SQL; flushes keep the column
+current after that (flask job-stats-reconcile repairs it).
+
+Revision ID: 6783e2394028
+Revises: 5e8edc0fb649
+Create Date: 2026-10-17 18:46:54.194571
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6783e2394028'
+down_revision = '5e8edc0fb649'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_applications_count', sa.Integer(), nullable=True))
+
+    jobs = sa.table('jobs', sa.column('id', sa.Integer), sa.column('unread_applications_count', sa.Integer))
+    applications = sa.table('applications', sa.column('job_id', sa.Integer), sa.column('is_viewed', sa.Boolean))
+    op.execute(
+        jobs.update().values(unread_applications_count=(
+            sa.select(sa.func.count())
+            .where(applications.c.job_id == jobs.c.id,
+                   sa.or_(applications.c.is_viewed.is_(None), applications.c.is_viewed == sa.false()))
+            .scalar_subquery()
+        ))
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('unread_applications_count')
@@ -0,0 +1,31 @@
+"""Add applications ai scoring timestamps
+
+Existing applications are left unscored, so the next flask
+applications-score run scores each of them once.
+
+Revision ID: bc94a06fed65
+Revises: 1670d225233f
+Create Date: 2026-10-17 18:46:01.047221
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bc94a06fed65'
+down_revision = '1670d225233f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ai_scored_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('ai_inputs_changed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_column('ai_inputs_changed_at')
+        batch_op.drop_column('ai_scored_at')
@@ -0,0 +1,79 @@
+"""Add job search index
+
+SQLite gets an FTS5 table filled from the existing jobs and triggers that
+keep it in sync; builds without FTS5 are skipped and search falls back to
+the in-process index. PostgreSQL gets a GIN index on the weighted tsvector
+expression, built concurrently so writes to jobs are not blocked.
+
+Revision ID: cafe9496c5fb
+Revises: 6783e2394028
+Create Date: 2026-10-17 18:58:48.602676
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cafe9496c5fb'
+down_revision = '6783e2394028'
+branch_labels = None
+depends_on = None
+
+
+# Must stay textually identical to PostgresSearch.vector_sql for the planner to use the index
+VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(company_name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'D')"
+)
+
+TRIGGERS = {
+    'jobs_fts_insert': (
+        "AFTER INSERT ON jobs BEGIN "
+        "INSERT INTO jobs_fts(rowid, title, company_name, description) "
+        "VALUES (new.id, new.title, new.company_name, new.description); END"
+    ),
+    'jobs_fts_update': (
+        "AFTER UPDATE OF title, company_name, description ON jobs BEGIN "
+        "DELETE FROM jobs_fts WHERE rowid = old.id; "
+        "INSERT INTO jobs_fts(rowid, title, company_name, description) "
+        "VALUES (new.id, new.title, new.company_name, new.description); END"
+    ),
+    'jobs_fts_delete': "AFTER DELETE ON jobs BEGIN DELETE FROM jobs_fts WHERE rowid = old.id; END",
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_search_vector ON jobs USING GIN (({VECTOR_SQL}))")
+    elif bind.dialect.name == 'sqlite':
+        options = {row[0] for row in bind.execute(sa.text('PRAGMA compile_options'))}
+        if 'ENABLE_FTS5' not in options:
+            return
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5("
+            "title, company_name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute("DELETE FROM jobs_fts")
+        op.execute(
+            "INSERT INTO jobs_fts(rowid, title, company_name, description) "
+            "SELECT id, title, company_name, description FROM jobs"
+        )
+        for name, body in TRIGGERS.items():
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+            op.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_jobs_search_vector")
+    elif bind.dialect.name == 'sqlite':
+        for name in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS jobs_fts")
@@ -0,0 +1,35 @@
+"""Add skill trend buckets table
+
+Revision ID: cc4e8e1af154
+Revises: f9d928ae4418
+Create Date: 2026-10-17 18:44:06.524111
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc4e8e1af154'
+down_revision = 'f9d928ae4418'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('skill_trend_buckets',
+    sa.Column('skill_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('demand', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('skill_id', 'day')
+    )
+    with op.batch_alter_table('skill_trend_buckets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_skill_trend_buckets_day'), ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('skill_trend_buckets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_skill_trend_buckets_day'))
+
+    op.drop_table('skill_trend_buckets')
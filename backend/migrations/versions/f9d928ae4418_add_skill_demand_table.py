@@ -0,0 +1,47 @@
+"""Add skill demand table
+
+The table is filled from the current catalog here; commits keep it
+current from then on.
+
+Revision ID: f9d928ae4418
+Revises: 598576d3d710
+Create Date: 2026-10-17 18:42:12.601656
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9d928ae4418'
+down_revision = '598576d3d710'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('skill_demand',
+    sa.Column('skill_id', sa.Integer(), nullable=False),
+    sa.Column('active_jobs', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('skill_id')
+    )
+    with op.batch_alter_table('skill_demand', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_skill_demand_active_jobs'), ['active_jobs'], unique=False)
+
+    # Same aggregate as skill_demand.rebuild, written against this revision's schema
+    op.execute(
+        "INSERT INTO skill_demand (skill_id, active_jobs, updated_at) "
+        "SELECT job_skills.skill_id, COUNT(job_skills.id), CURRENT_TIMESTAMP FROM job_skills "
+        "JOIN jobs ON jobs.id = job_skills.job_id JOIN skills ON skills.id = job_skills.skill_id "
+        "WHERE jobs.status = 'active' AND jobs.visibility = 'public' "
+        "GROUP BY job_skills.skill_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('skill_demand', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_skill_demand_active_jobs'))
+
+    op.drop_table('skill_demand')
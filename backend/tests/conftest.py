@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import os
+import tempfile
+
+import pytest
+
+# Configuration is read from the environment when config is first imported
+_workdir = tempfile.mkdtemp(prefix='recruitment-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    'CATALOG_SNAPSHOT_DIR': os.path.join(_workdir, 'catalog'),
+    'BCRYPT_LOG_ROUNDS': '4',
+    'PASSWORD_POOL_SIZE': '0',
+    # Per-worker caches off, so every request does its full work
+    'JOB_RESPONSE_CACHE_TTL': '0',
+    'JOB_FRAGMENT_CACHE_TTL': '0',
+    'IDENTITY_CACHE_TTL': '0',
+})
+
+from app import create_app, db  # noqa: E402
+from app.models import Job, JobSkill, Skill, User, UserSkill  # noqa: E402
+
+PASSWORD = 'test-password'
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def seed(jobs=60, skills=8):
+    employer = User(email='employer@example.com', role='employer', first_name='Erin', last_name='Employer')
+    seeker = User(email='seeker@example.com', role='jobseeker', first_name='Sam', last_name='Seeker', city='Berlin')
+    for user in (employer, seeker):
+        user.set_password(PASSWORD)
+    catalog = [Skill(name=f'skill-{i}', display_name=f'Skill {i}', category='programming') for i in range(skills)]
+    db.session.add_all([employer, seeker, *catalog])
+    db.session.flush()
+
+    seeker.skills.extend(UserSkill(skill_id=skill.id, proficiency_level=3) for skill in catalog[:4])
+    for i in range(jobs):
+        job = Job(
+            title=f'Engineer {i}', description='Build things', company_name='Acme', employer_id=employer.id,
+            job_type='full-time', work_mode='onsite', experience_level='mid', industry='Technology',
+            category='Software Development', country='Germany', city='Berlin', status='active',
+            visibility='public', published_at=datetime.utcnow() - timedelta(hours=i)
+        )
+        job.required_skills.extend(
+            JobSkill(skill_id=catalog[(i + offset) % skills].id, weight=5) for offset in range(3)
+        )
+        db.session.add(job)
+    db.session.commit()
+
+
+@pytest.fixture
+def seeker_headers(client):
+    response = client.post('/api/auth/login', json={'email': 'seeker@example.com', 'password': PASSWORD})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
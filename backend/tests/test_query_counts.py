@@ -0,0 +1,51 @@
+"""Serializing a page takes a fixed number of queries however large the page is"""
+from contextlib import contextmanager
+import threading
+
+from sqlalchemy import event
+
+from app import db
+
+
+@contextmanager
+def count_queries():
+    # Only this thread's statements; background flushers share the engine
+    thread = threading.get_ident()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def queries_per_size(client, url, sizes, **kwargs):
+    # The first request builds the in-process indexes and rankings
+    assert client.get(url.format(size=max(sizes)), **kwargs).status_code == 200
+    counts = {}
+    for size in sizes:
+        with count_queries() as statements:
+            response = client.get(url.format(size=size), **kwargs)
+        assert response.status_code == 200
+        counts[size] = len(statements)
+    return counts
+
+
+def test_job_listing_queries_do_not_grow_with_page_size(client):
+    counts = queries_per_size(client, '/api/jobs?per_page={size}', (5, 50))
+    assert counts[5] == counts[50]
+
+
+def test_job_listing_page_is_full(client):
+    response = client.get('/api/jobs?per_page=50')
+    assert len(response.get_json()['jobs']) == 50
+
+
+def test_match_jobs_queries_do_not_grow_with_limit(client, seeker_headers):
+    counts = queries_per_size(client, '/api/ai/match-jobs?limit={size}', (5, 50), headers=seeker_headers)
+    assert counts[5] == counts[50]